@@ -0,0 +1,280 @@
+# percentile bootstrap confidence intervals, resampled in batches with numpy:
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# bytes of resampled values held in memory at once
+MAX_BLOCK_BYTES = 256 * 1024 * 1024
+
+# sample size from which the resample means are drawn from their normal approximation
+NORMAL_MIN_SIZE = 100_000
+
+
+def statistic_quantile(name):
+    """
+    returns the quantile level of a quantile statistic, None for the mean
+
+    Parameters
+    ----------
+    name : str
+        "mean", "median" or "q" followed by a percentile, e.g. "q99" or "q99.5"
+
+    Returns
+    -------
+    float or None
+        quantile level between 0 and 1
+    """
+    if name == "mean":
+        return None
+    if name == "median":
+        return 0.5
+    if name.startswith("q"):
+        return float(name[1:]) / 100
+    raise ValueError(f"unknown statistic: {name}")
+
+
+def resampled_means(values, n_resamples, rng):
+    """
+    means of bootstrap resamples, drawn as 2d index arrays in blocks of rows, or from
+    their normal approximation for samples of at least NORMAL_MIN_SIZE values
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1d sample
+    n_resamples : int
+        number of resamples
+    rng : np.random.Generator
+        random generator
+
+    Returns
+    -------
+    np.ndarray
+        mean of each resample
+    """
+    if values.size >= NORMAL_MIN_SIZE:
+        # a resample mean has the sample mean as expectation and the sample variance
+        # over n as variance, and is normal to a good approximation at this size
+        return rng.normal(
+            values.mean(), values.std() / np.sqrt(values.size), n_resamples
+        )
+    block = max(1, MAX_BLOCK_BYTES // (values.size * 8))
+    means = []
+    for start in range(0, n_resamples, block):
+        rows = min(block, n_resamples - start)
+        means.append(
+            values[rng.integers(0, values.size, size=(rows, values.size))].mean(axis=1)
+        )
+    return np.concatenate(means)
+
+
+def resampled_cluster_means(sums, counts, n_resamples, rng):
+    """
+    means of bootstrap resamples of whole clusters, e.g. the events of a model run,
+    each resample draws clusters and divides the sum of their values by their count
+
+    Parameters
+    ----------
+    sums : np.ndarray
+        sum of the values of each cluster
+    counts : np.ndarray
+        number of values of each cluster
+    n_resamples : int
+        number of resamples
+    rng : np.random.Generator
+        random generator
+
+    Returns
+    -------
+    np.ndarray
+        mean of each resample
+    """
+    block = max(1, MAX_BLOCK_BYTES // (sums.size * 16))
+    means = []
+    for start in range(0, n_resamples, block):
+        rows = min(block, n_resamples - start)
+        draws = rng.integers(0, sums.size, size=(rows, sums.size))
+        means.append(sums[draws].sum(axis=1) / counts[draws].sum(axis=1))
+    return np.concatenate(means)
+
+
+def resampled_quantiles(sorted_values, q, n_resamples, rng):
+    """
+    quantiles of bootstrap resamples, drawn without materialising the resamples
+
+    the q quantile of a resample of size n is its k = ceil(q * n) smallest value,
+    which is at most the j-th smallest value of the sample when at least k draws fall on
+    the first j values, i.e. with probability P(Binomial(n, j / n) >= k); the order
+    statistic is drawn by inverting this distribution
+
+    Parameters
+    ----------
+    sorted_values : np.ndarray
+        1d sample sorted ascending
+    q : float
+        quantile level between 0 and 1
+    n_resamples : int
+        number of resamples
+    rng : np.random.Generator
+        random generator
+
+    Returns
+    -------
+    np.ndarray
+        quantile of each resample
+    """
+    from scipy import stats
+
+    n = sorted_values.size
+    k = max(int(np.ceil(q * n)), 1)
+    cdf = stats.binom.sf(k - 1, n, np.arange(1, n + 1) / n)
+    positions = np.searchsorted(cdf, rng.random(n_resamples))
+    return sorted_values[np.minimum(positions, n - 1)]
+
+
+def resample_statistics(values, statistics, n_resamples, seed, clusters=None):
+    """
+    evaluate statistics on bootstrap resamples of values
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1d sample
+    statistics : list
+        statistic names, see statistic_quantile
+    n_resamples : int
+        number of resamples
+    seed : int or np.random.SeedSequence
+        seed of the random generator
+    clusters : np.ndarray, optional
+        cluster label of each value, the mean resamples whole clusters when given,
+        by default None
+
+    Returns
+    -------
+    np.ndarray
+        statistics x resamples array of the resampled statistics
+    """
+    rng = np.random.default_rng(seed)
+    sorted_values = np.sort(values)
+    if clusters is not None:
+        codes = pd.factorize(clusters)[0]
+        sums = np.bincount(codes, weights=values)
+        counts = np.bincount(codes).astype(float)
+    resampled = []
+    for name in statistics:
+        q = statistic_quantile(name)
+        if q is None and clusters is not None:
+            resampled.append(resampled_cluster_means(sums, counts, n_resamples, rng))
+        elif q is None:
+            resampled.append(resampled_means(values, n_resamples, rng))
+        else:
+            resampled.append(resampled_quantiles(sorted_values, q, n_resamples, rng))
+    return np.array(resampled).reshape(len(statistics), n_resamples)
+
+
+def bootstrap_ci(
+    values,
+    statistics=("mean", "median", "q90", "q99"),
+    n_resamples=2000,
+    confidence=0.95,
+    seed=0,
+    n_jobs=1,
+    clusters=None,
+):
+    """
+    percentile bootstrap confidence intervals of statistics of a sample
+
+    Parameters
+    ----------
+    values : array-like
+        sample, missing values are dropped
+    statistics : tuple, optional
+        statistic names, see statistic_quantile, by default ("mean", "median", "q90", "q99")
+    n_resamples : int, optional
+        number of resamples, by default 2000
+    confidence : float, optional
+        confidence level of the intervals, by default 0.95
+    seed : int, optional
+        seed of the random generator, by default 0
+    n_jobs : int, optional
+        worker processes the resamples are split over, by default 1
+    clusters : array-like, optional
+        cluster label of each value, e.g. the run_id of model events, the mean is then
+        resampled over clusters from their sums and counts, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        statistic, estimate, lower and upper bound
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    values = values[present]
+    if clusters is not None:
+        clusters = np.asarray(clusters)[present]
+    statistics = list(statistics)
+    if values.size == 0:
+        return pd.DataFrame(
+            {
+                "statistic": statistics,
+                "estimate": np.nan,
+                "lower": np.nan,
+                "upper": np.nan,
+            }
+        )
+
+    if n_jobs > 1:
+        seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+        sizes = [len(part) for part in np.array_split(np.arange(n_resamples), n_jobs)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = pool.map(
+                resample_statistics,
+                [values] * n_jobs,
+                [statistics] * n_jobs,
+                sizes,
+                seeds,
+                [clusters] * n_jobs,
+            )
+            resampled = np.concatenate(list(parts), axis=1)
+    else:
+        resampled = resample_statistics(values, statistics, n_resamples, seed, clusters)
+
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(resampled, [alpha, 1 - alpha], axis=1)
+    estimates = [
+        values.mean() if q is None else np.quantile(values, q, method="inverted_cdf")
+        for q in map(statistic_quantile, statistics)
+    ]
+    return pd.DataFrame(
+        {"statistic": statistics, "estimate": estimates, "lower": lower, "upper": upper}
+    )
+
+
+def grouped_bootstrap_ci(df, value_column, group_column="source", **kwargs):
+    """
+    bootstrap confidence intervals of a column for each group, e.g. events and model
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        data containing the value and group columns
+    value_column : str
+        column holding the sample
+    group_column : str, optional
+        column identifying the groups, by default "source"
+    **kwargs
+        passed to bootstrap_ci
+
+    Returns
+    -------
+    pd.DataFrame
+        group, statistic, estimate, lower and upper bound
+    """
+    frames = [
+        bootstrap_ci(group[value_column], **kwargs).assign(**{group_column: name})
+        for name, group in df.groupby(group_column)
+    ]
+    return pd.concat(frames, ignore_index=True)
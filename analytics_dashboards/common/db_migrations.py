@@ -0,0 +1,191 @@
+# indexes and materialized views the dashboard queries rely on, applied to the staging database:
+
+import argparse
+
+import pandas as pd
+
+from analytics_dashboards.common.get_data import get_engine, relation_exists
+
+# applied in order and recorded in MIGRATIONS_TABLE, statements are idempotent
+MIGRATIONS = [
+    (
+        "001_event_indexes",
+        [
+            """
+            create index concurrently if not exists data_sources_events_company_instance_id_idx
+            on data_sources_events (company_instance_id)
+            """,
+            """
+            create index concurrently if not exists data_sources_events_event_start_date_idx
+            on data_sources_events (event_start_date)
+            """,
+            """
+            create index concurrently if not exists model_events_run_id_idx
+            on model_events (run_id)
+            """,
+        ],
+    ),
+    (
+        "002_f1k_events_mv",
+        [
+            """
+            create materialized view if not exists f1k_events_mv as
+            select
+                *,
+                date_part('year', event_start_date)::int as year_start,
+                left(company_sic::text,2)::int as sic2
+            from
+                data_sources_events
+            join
+                data_sources_entities
+                using (company_instance_id)
+            """,
+            """
+            create unique index if not exists f1k_events_mv_event_id_idx
+            on f1k_events_mv (event_id)
+            """,
+            """
+            create index if not exists f1k_events_mv_year_start_idx
+            on f1k_events_mv (year_start)
+            """,
+            """
+            create index if not exists f1k_events_mv_company_instance_id_idx
+            on f1k_events_mv (company_instance_id)
+            """,
+            "analyze f1k_events_mv",
+        ],
+    ),
+]
+
+MIGRATIONS_TABLE = "analytics_dashboards_migrations"
+
+
+def autocommit_connection(db_name="postgres"):
+    """
+    connection outside a transaction, required by create index concurrently
+    """
+    return (
+        get_engine(db_name=db_name)
+        .connect()
+        .execution_options(isolation_level="AUTOCOMMIT")
+    )
+
+
+def applied_migrations(db_name="postgres"):
+    """
+    returns the migrations already applied to a database
+
+    Parameters
+    ----------
+    db_name : str, optional
+        database to inspect, by default "postgres"
+
+    Returns
+    -------
+    pd.DataFrame
+        migration names and when they were applied
+    """
+    with autocommit_connection(db_name) as conn:
+        conn.exec_driver_sql(
+            f"""
+            create table if not exists {MIGRATIONS_TABLE} (
+                name text primary key,
+                applied_at timestamptz not null default now()
+            )
+            """
+        )
+        return pd.read_sql(
+            f"select name, applied_at from {MIGRATIONS_TABLE} order by name", conn
+        )
+
+
+def migrate(db_name="postgres"):
+    """
+    apply the migrations that have not been applied yet
+
+    Parameters
+    ----------
+    db_name : str, optional
+        database to migrate, by default "postgres"
+
+    Returns
+    -------
+    list
+        names of the migrations applied
+    """
+    done = set(applied_migrations(db_name)["name"])
+    applied = []
+    with autocommit_connection(db_name) as conn:
+        for name, statements in MIGRATIONS:
+            if name in done:
+                continue
+            for statement in statements:
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(
+                f"insert into {MIGRATIONS_TABLE} (name) values (%(name)s)",
+                {"name": name},
+            )
+            applied.append(name)
+    relation_exists.cache_clear()
+    return applied
+
+
+def refresh_f1k_view(concurrently=True, db_name="postgres"):
+    """
+    refresh the f1k events materialized view and drop the cached query results read from it
+
+    Parameters
+    ----------
+    concurrently : bool, optional
+        keep the view readable while it refreshes, by default True
+    db_name : str, optional
+        database holding the view, by default "postgres"
+
+    Returns
+    -------
+    int
+        number of query cache entries dropped
+    """
+    from analytics_dashboards.common.result_cache import list_entries, purge
+
+    mode = "concurrently " if concurrently else ""
+    with autocommit_connection(db_name) as conn:
+        conn.exec_driver_sql(f"refresh materialized view {mode}f1k_events_mv")
+        conn.exec_driver_sql("analyze f1k_events_mv")
+    entries = list_entries()
+    stale = entries.loc[entries["query"].str.contains("f1k_events_mv", na=False)]
+    return purge(keys=list(stale["key"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="manage the staging database indexes and materialized views"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="list the applied migrations")
+    subparsers.add_parser("migrate", help="apply the pending migrations")
+    refresh_parser = subparsers.add_parser(
+        "refresh", help="refresh the f1k events materialized view"
+    )
+    refresh_parser.add_argument(
+        "--blocking",
+        action="store_true",
+        help="refresh without concurrently, the view is locked while it refreshes",
+    )
+    args = parser.parse_args()
+
+    if args.command == "status":
+        done = applied_migrations()
+        pending = [name for name, _ in MIGRATIONS if name not in set(done["name"])]
+        print(done.to_string(index=False))
+        print(f"\npending: {', '.join(pending) or 'none'}")
+    elif args.command == "migrate":
+        applied = migrate()
+        print(f"applied: {', '.join(applied) or 'none'}")
+    else:
+        purged = refresh_f1k_view(concurrently=not args.blocking)
+        print(f"f1k_events_mv refreshed, {purged} cached results dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+# incremental sync of the fortune 1000 events into the local datastore:
+# only events above the event_id high-watermark (or updated since the last sync) are fetched,
+# merged into the stored table, and the count aggregates are adjusted by the difference;
+# the frequency charts re-filter the aggregates by revenue and year instead of the events
+
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+import sqlalchemy as sa
+
+from analytics_dashboards.common.get_data import (datastore_path, load_config,
+                                                  read_query, write_parquet)
+from analytics_dashboards.common.queries import F1K_DEFAULTS, bind, run_query
+from analytics_dashboards.common.validation import validate
+
+# revenue floor of the stored companies, below the default cohort floor so the dashboard
+# revenue filter can be lowered without querying the database; changing it forces a full
+# reload
+STORE_REVENUE_FLOOR = 0
+
+# aggregates kept up to date by the sync: name -> grouping columns of the event counts,
+# counted per company so they can be re-filtered by the company revenue; the yearly
+# frequency and the events per company-year are roll-ups of event_counts
+AGGREGATES = {
+    "event_counts": [
+        "company_instance_id",
+        "year_start",
+        "impact_type_confidentiality",
+        "impact_type_integrity",
+        "impact_type_availability",
+        "impact_type_extortion",
+    ],
+}
+
+
+def sync_path(name):
+    """
+    returns the location of a file of the synced store
+    """
+    return datastore_path("f1k_sync", name)
+
+
+def load_state():
+    """
+    returns the watermarks and the fingerprint of the last sync, empty if the store
+    was never synced
+    """
+    path = sync_path("state.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(sync_path("state.json"), "w") as f:
+        json.dump(state, f, default=str)
+
+
+def read_store(name):
+    """
+    returns a stored table, None if it does not exist
+    """
+    path = sync_path(f"{name}.parquet")
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def write_store(df, name):
+    path = sync_path(f"{name}.parquet")
+    write_parquet(df, path)
+
+
+def store_fingerprint(events, entities):
+    """
+    returns a hash identifying the content of the stored events and entities, kept in
+    the sync state so cached datasets can tell a sync that changed the store
+    """
+    digest = hashlib.sha1()
+    for df in [events, entities]:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def changed_events_query(updated_column=None):
+    """
+    statement fetching the events of fortune 1000 entities above the event_id watermark,
+    or updated since the last sync when updated_column is given
+
+    Parameters
+    ----------
+    updated_column : str, optional
+        timestamp column marking changed events, by default None
+
+    Returns
+    -------
+    tuple
+        (statement, bind parameters without the watermarks)
+    """
+    query, params = bind("f1k_new_events", revenue_floor=STORE_REVENUE_FLOOR)
+    changed = "event_id > :watermark"
+    if updated_column is not None:
+        changed += f" or {updated_column} > :updated_watermark"
+    return sa.text(f"{query.text}\n            and ({changed})"), params
+
+
+def align_dtypes(df, reference):
+    """
+    cast the columns of newly fetched rows to the dtypes of the stored table,
+    small and large fetches can be read with different dtypes
+    """
+    df = df.copy()
+    for col, dtype in reference.dtypes.items():
+        if col in df.columns and df[col].dtype != dtype:
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def join_f1k(events, entities):
+    """
+    join the stored events and entities into the layout of read_f1k_table(date_limits=False)
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        stored fortune 1000 events
+    entities : pd.DataFrame
+        stored fortune 1000 entities
+
+    Returns
+    -------
+    pd.DataFrame
+        events joined with their entity
+    """
+    df = events.merge(entities, on="company_instance_id", how="inner")
+    columns = ["company_instance_id"] + [
+        col for col in df.columns if col != "company_instance_id"
+    ]
+    df = df[columns]
+    df["year_start"] = pd.to_datetime(df["event_start_date"]).dt.year
+    return df.sort_values("event_id").reset_index(drop=True)
+
+
+def aggregate_events(events):
+    """
+    compute the count aggregates of a set of events, without the events quarantined
+    by validation.RULES
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        fortune 1000 events
+
+    Returns
+    -------
+    dict
+        aggregate name -> event counts by the aggregate's grouping columns
+    """
+    events = validate(events, "f1k_events", store=False)
+    events = events.assign(
+        year_start=pd.to_datetime(events["event_start_date"]).dt.year
+    )
+    return {
+        name: events.groupby(columns, dropna=False)
+        .size()
+        .rename("event_count")
+        .reset_index()
+        for name, columns in AGGREGATES.items()
+    }
+
+
+def update_aggregates(aggregates, added, removed):
+    """
+    adjust the count aggregates by the added and removed events
+
+    Parameters
+    ----------
+    aggregates : dict
+        current aggregates as returned by aggregate_events
+    added : pd.DataFrame
+        events added to the store, including the new versions of changed events
+    removed : pd.DataFrame
+        events removed from the store, including the old versions of changed events
+
+    Returns
+    -------
+    dict
+        updated aggregates
+    """
+    deltas_added = aggregate_events(added)
+    deltas_removed = aggregate_events(removed)
+    updated = {}
+    for name, columns in AGGREGATES.items():
+        removed_counts = deltas_removed[name].assign(
+            event_count=-deltas_removed[name]["event_count"]
+        )
+        counts = (
+            pd.concat([aggregates[name], deltas_added[name], removed_counts])
+            .groupby(columns, dropna=False)["event_count"]
+            .sum()
+            .reset_index()
+        )
+        updated[name] = counts.loc[counts["event_count"] != 0].reset_index(drop=True)
+    return updated
+
+
+def read_aggregates():
+    """
+    returns the stored count aggregates, None if the store was never synced
+    """
+    aggregates = {name: read_store(name) for name in AGGREGATES}
+    if any(df is None for df in aggregates.values()):
+        return None
+    return aggregates
+
+
+def store_entities(revenue_floor=F1K_DEFAULTS["revenue_floor"]):
+    """
+    entities of the synced store above a revenue floor, the store is synced first if
+    it was never synced
+
+    Parameters
+    ----------
+    revenue_floor : int, optional
+        minimum company revenue in millions of USD, by default 2000
+
+    Returns
+    -------
+    pd.DataFrame
+        stored fortune 1000 entities
+    """
+    entities = read_store("entities")
+    if entities is None:
+        sync_f1k()
+        entities = read_store("entities")
+    return entities.loc[entities["company_revenue_millions_usd"] >= revenue_floor]
+
+
+def event_counts(
+    columns,
+    revenue_floor=F1K_DEFAULTS["revenue_floor"],
+    year_range=F1K_DEFAULTS["year_range"],
+):
+    """
+    events of the synced store counted from the stored aggregates, for the companies
+    above a revenue floor and the events starting in a year range
+
+    Parameters
+    ----------
+    columns : list
+        grouping columns, columns of AGGREGATES["event_counts"] or of the entities
+    revenue_floor : int, optional
+        minimum company revenue in millions of USD, by default 2000
+    year_range : tuple, optional
+        inclusive (first, last) event start years, no year filter if None,
+        by default (2010, 2020)
+
+    Returns
+    -------
+    pd.DataFrame
+        the grouping columns and event_count
+    """
+    aggregates = read_aggregates()
+    if aggregates is None:
+        sync_f1k()
+        aggregates = read_aggregates()
+    counts = aggregates["event_counts"].merge(
+        store_entities(revenue_floor), on="company_instance_id", how="inner"
+    )
+    if year_range is not None:
+        counts = counts.loc[counts["year_start"].between(year_range[0], year_range[1])]
+    return (
+        counts.groupby(list(columns), dropna=False)["event_count"].sum().reset_index()
+    )
+
+
+def sync_f1k(full=False):
+    """
+    bring the local fortune 1000 store up to date with the database
+
+    new events are fetched above the event_id watermark, and when f1k_updated_at_column
+    is configured, events updated since the last sync are fetched too; companies joining
+    the fortune 1000 list bring their earlier events and companies leaving it drop theirs;
+    the companies are stored down to STORE_REVENUE_FLOOR
+
+    Parameters
+    ----------
+    full : bool, optional
+        discard the store and reload everything, by default False
+
+    Returns
+    -------
+    dict
+        number of added, changed and removed events and the new watermark
+    """
+    state = {} if full else load_state()
+    if state.get("revenue_floor") != STORE_REVENUE_FLOOR:
+        state, full = {}, True
+    events = None if full else read_store("events")
+    aggregates = None if full else read_aggregates()
+    updated_column = load_config().get("f1k_updated_at_column")
+
+    entities = run_query(
+        "f1k_entities", cached=False, revenue_floor=STORE_REVENUE_FLOOR
+    )
+    if events is None or aggregates is None or "watermark" not in state:
+        events = run_query(
+            "f1k_new_events", cached=False, revenue_floor=STORE_REVENUE_FLOOR
+        )
+        aggregates = aggregate_events(events)
+        summary = {"added": len(events), "changed": 0, "removed": 0}
+    else:
+        watermark = state["watermark"]
+        updated_watermark = state.get("updated_watermark")
+        if updated_watermark is None:
+            query, params = changed_events_query()
+        else:
+            query, params = changed_events_query(updated_column)
+            params["updated_watermark"] = updated_watermark
+        params["watermark"] = watermark
+        fetched = align_dtypes(read_query(query, params=params), events)
+        joined_ids = set(entities["company_instance_id"]) - set(
+            events["company_instance_id"]
+        )
+        if joined_ids:
+            history = run_query(
+                "company_events",
+                cached=False,
+                company_ids=sorted(int(company_id) for company_id in joined_ids),
+                watermark=watermark,
+            )
+            fetched = pd.concat(
+                [fetched, align_dtypes(history, events)], ignore_index=True
+            )
+        fetched = fetched.drop_duplicates("event_id", keep="last")
+
+        left = ~events["company_instance_id"].isin(entities["company_instance_id"])
+        replaced = events["event_id"].isin(fetched["event_id"])
+        removed = events.loc[left | replaced]
+        events = pd.concat([events.loc[~(left | replaced)], fetched], ignore_index=True)
+        aggregates = update_aggregates(aggregates, added=fetched, removed=removed)
+        summary = {
+            "added": int((~fetched["event_id"].isin(removed["event_id"])).sum()),
+            "changed": int(replaced.sum()),
+            "removed": int((left & ~replaced).sum()),
+        }
+
+    if len(events):
+        state["watermark"] = max(
+            int(events["event_id"].max()), state.get("watermark", 0)
+        )
+    if updated_column is not None and len(events):
+        state["updated_watermark"] = events[updated_column].max()
+    state["revenue_floor"] = STORE_REVENUE_FLOOR
+    state["fingerprint"] = store_fingerprint(events, entities)
+    write_store(events, "events")
+    write_store(entities, "entities")
+    for name, df in aggregates.items():
+        write_store(df, name)
+    save_state(state)
+    return dict(summary, watermark=state.get("watermark"))
+
+
+def f1k_table(sync=True):
+    """
+    fortune 1000 events table from the local store, in the layout of
+    read_f1k_table(date_limits=False, revenue_floor=STORE_REVENUE_FLOOR), see
+    get_data.filter_f1k_table for the default cohort
+
+    Parameters
+    ----------
+    sync : bool, optional
+        fetch the changes since the last sync first, by default True
+
+    Returns
+    -------
+    pd.DataFrame
+        events joined with their entity, without the rows quarantined by
+        validation.RULES
+    """
+    if sync or read_store("events") is None:
+        sync_f1k()
+    return validate(
+        join_f1k(read_store("events"), read_store("entities")), "f1k_events"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sync the fortune 1000 events")
+    parser.add_argument("--full", action="store_true", help="reload everything")
+    args = parser.parse_args()
+    print(sync_f1k(full=args.full))
+
+
+if __name__ == "__main__":
+    main()
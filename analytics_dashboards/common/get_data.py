@@ -2,28 +2,22 @@
 
 import json
 import os
+import threading
+from functools import lru_cache
 
-import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
-import seaborn as sns
 import sqlalchemy as sa
 from sqlalchemy import create_engine
-from sshtunnel import SSHTunnelForwarder
 
 # setup connection
 secrets_path = os.path.join(
     os.path.dirname(__file__), "../../../", "secrets", "analytics_staging_db.json"
 )
-with open(secrets_path) as f:
-    secret_analytics_staging_db = json.load(f)
 
 # load config
 config_path = os.path.join(
     os.path.dirname(__file__), "../../", "configuration", "config.json"
 )
-with open(config_path) as config_file:
-    config = json.load(config_file)
 
 # ssh private-key
 ssh_private_key_path = os.path.join(
@@ -31,6 +25,34 @@ ssh_private_key_path = os.path.join(
 )
 
 
+@lru_cache(maxsize=None)
+def load_secrets():
+    """
+    read the staging database credentials, only on first use
+
+    Returns
+    -------
+    dict
+        database and ssh credentials
+    """
+    with open(secrets_path) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_config():
+    """
+    read the dashboard configuration, only on first use
+
+    Returns
+    -------
+    dict
+        dashboard configuration
+    """
+    with open(config_path) as config_file:
+        return json.load(config_file)
+
+
 def select_connection(db_name, local_connection=False):
     """
     connect to the staging database
@@ -45,7 +67,10 @@ def select_connection(db_name, local_connection=False):
     sqlalchemy.engine.url.URL
         sqlalchemy connection object
     """
+    secret_analytics_staging_db = load_secrets()
     if local_connection:
+        from sshtunnel import SSHTunnelForwarder
+
         try:
             tunnel = SSHTunnelForwarder(
                 (
@@ -85,123 +110,377 @@ def select_connection(db_name, local_connection=False):
         return conn
 
 
-def read_f1k_table(date_limits=True):
-    """get all events related to the fortune 1000 proxy-list entities"""
-    engine = create_engine(
-        select_connection(
-            db_name="postgres", local_connection=config["local_connection"]
-        )
+def read_f1k_table(date_limits=True, **params):
+    """
+    get all events related to the fortune 1000 proxy-list entities
+
+    the events are cached per start year, changing the year range only queries
+    the years that are not cached yet
+
+    Parameters
+    ----------
+    date_limits : bool, optional
+        only keep events starting between 2010 and 2020, by default True
+    **params
+        overrides of the f1k_events query parameters: revenue_floor, country,
+        sic_ceiling and year_range, a year_range overrides date_limits
+
+    Returns
+    -------
+    pd.DataFrame
+        fortune 1000 events joined with their entity, without the rows quarantined
+        by validation.RULES
+    """
+    from analytics_dashboards.common.queries import F1K_DEFAULTS, run_query
+    from analytics_dashboards.common.result_cache import cached_year_partitions
+    from analytics_dashboards.common.validation import validate
+
+    year_range = params.pop(
+        "year_range", F1K_DEFAULTS["year_range"] if date_limits else None
     )
-    query = """
-    select 
-        *,
-        date_part('year', event_start_date)::int as year_start
-    from 
-        data_sources_events
-    join
-        data_sources_entities
-        on data_sources_events.company_instance_id = data_sources_entities.company_instance_id
-    where 
-        company_revenue_millions_usd >= 2000
-        and company_country_code = 'US'
-        and left(company_sic::text,2)::int < 90
-        and date_part('year', event_start_date) >= 2010
-        and date_part('year', event_start_date) <= 2020
-    """
-
-    if date_limits == False:
-        query = """
-        select 
-            *,
-            date_part('year', event_start_date)::int as year_start
-        from 
-            data_sources_events
-        join
-            data_sources_entities
-            on data_sources_events.company_instance_id = data_sources_entities.company_instance_id
-        where 
-            company_revenue_millions_usd >= 2000
-            and company_country_code = 'US'
-            and left(company_sic::text,2)::int < 90
-        --    and date_part('year', event_start_date) >= 2010
-        --    and date_part('year', event_start_date) <= 2020
-        """
-
-    df = pd.read_sql_query(query, engine)
-
-    return df
-
-
-def read_f1k_entities():
-    """get the entities table for the fortune 1000 proxy-list, no events"""
-    engine = engine = create_engine(
-        select_connection(
-            db_name="postgres", local_connection=config["local_connection"]
+    if year_range is None:
+        bounds = run_query("f1k_year_bounds", cached=False).iloc[0]
+        year_range = (
+            (0, -1)
+            if bounds.isna().any()
+            else (bounds["first_year"], bounds["last_year"])
         )
+    name = "f1k_events_mv" if relation_exists("f1k_events_mv") else "f1k_events"
+    df = cached_year_partitions(
+        name, range(int(year_range[0]), int(year_range[1]) + 1), **params
     )
-    query = """
-    select 
-        *
-    from 
-        data_sources_entities
-    where 
-        company_revenue_millions_usd >= 2000
-        and company_country_code = 'US'
-        and left(company_sic::text,2)::int < 90
---        and date_part('year', event_start_date) >= 2010
---        and date_part('year', event_start_date) <= 2020
+    # the synced f1k_table is the canonical load of the events, see validation.validate
+    return validate(df.drop(columns="sic2", errors="ignore"), "f1k_events", store=False)
+
+
+def read_f1k_entities(**params):
+    """get the entities table for the fortune 1000 proxy-list, no events"""
+    from analytics_dashboards.common.queries import run_query
+
+    return run_query("f1k_entities", **params)
+
+
+def filter_f1k_table(df, revenue_floor=2000, year_range=(2010, 2020)):
     """
-    return pd.read_sql_query(query, engine)
+    re-filter an already loaded fortune 1000 events table without querying the database
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        events table as returned by read_f1k_table(date_limits=False)
+    revenue_floor : int, optional
+        minimum company revenue in millions of USD, by default 2000
+    year_range : tuple, optional
+        inclusive (first, last) event start years, no year filter if None, by default (2010, 2020)
+
+    Returns
+    -------
+    pd.DataFrame
+        filtered events table
+    """
+    mask = df["company_revenue_millions_usd"] >= revenue_floor
+    if year_range is not None:
+        mask &= df["year_start"].between(year_range[0], year_range[1])
+    return df.loc[mask].copy()
 
 
 def read_vcdb_events():
-    """get availability duration data from vcdb"""
-    engine = create_engine(
+    """get availability duration data from vcdb, events without a duration unit are quarantined"""
+    from analytics_dashboards.common.queries import run_query
+
+    return run_query("vcdb_availability")
+
+
+@lru_cache(maxsize=None)
+def get_engine(db_name="postgres"):
+    """
+    get the engine for a staging database, created on first use and reused afterwards
+
+    Parameters
+    ----------
+    db_name : str, optional
+        database to connect to, by default "postgres"
+
+    Returns
+    -------
+    sqlalchemy.engine.Engine
+        sqlalchemy engine
+    """
+    return create_engine(
         select_connection(
-            db_name="data_sources", local_connection=config["local_connection"]
+            db_name=db_name, local_connection=load_config()["local_connection"]
         )
     )
-    query = """
-    select
-    incident_id,
-    victim_victim_id,
-    victim_country,
-    victim_government,
-    victim_industry,
-    victim_state,
-    action_misuse_variety,
-    attribute_availability_variety,
-    attribute_confidentiality_data,
-    attribute_confidentiality_data_disclosure,
-    timeline_incident_year,
-    timeline_containment_unit,
-    timeline_containment_value,
-    attribute_availability_duration_value,
-    attribute_availability_duration_unit,
-    attribute_availability_notes,
-    summary
-    from vcdb
-    where attribute_availability_duration_value is not null;
-    """
-    return pd.read_sql_query(query, engine)
-
-
-def get_engine():
-    return create_engine(
-        select_connection(
-            db_name="postgres", local_connection=config["local_connection"]
+
+
+@lru_cache(maxsize=None)
+def relation_exists(name, db_name="postgres"):
+    """
+    check whether a table or view exists, checked once per process
+
+    Parameters
+    ----------
+    name : str
+        table or view name
+    db_name : str, optional
+        database to look in, by default "postgres"
+
+    Returns
+    -------
+    bool
+        True if the relation exists
+    """
+    with get_engine(db_name=db_name).connect() as conn:
+        return (
+            conn.execute(sa.text("select to_regclass(:name)"), {"name": name}).scalar()
+            is not None
         )
+
+
+def literal_sql(query, params, engine):
+    """
+    render bind parameters into the sql text, for statements that cannot take
+    bind parameters such as COPY
+
+    Parameters
+    ----------
+    query : str
+        sql query with :name bind parameters
+    params : dict
+        bind parameter values
+    engine : sqlalchemy.engine.Engine
+        engine whose driver quotes the values
+
+    Returns
+    -------
+    str
+        sql query with the values inlined
+    """
+    compiled = sa.text(query).compile(dialect=engine.dialect)
+    raw_conn = engine.raw_connection()
+    try:
+        sql = raw_conn.cursor().mogrify(
+            str(compiled), compiled.construct_params(params)
+        )
+    finally:
+        raw_conn.close()
+    return sql.decode() if isinstance(sql, bytes) else sql
+
+
+def read_sql_copy(query, engine, block_size=16 << 20):
+    """
+    bulk read a query with COPY (query) TO STDOUT, the csv stream is decoded into
+    typed arrow columns block by block while it is still being transferred
+
+    Parameters
+    ----------
+    query : str
+        sql query without a trailing semicolon
+    engine : sqlalchemy.engine.Engine
+        engine to run the query on, must use the psycopg2 driver
+    block_size : int, optional
+        bytes of csv decoded per block, by default 16MB
+
+    Returns
+    -------
+    pd.DataFrame
+        query result
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    # arrow types for the postgres type oids that csv inference would get wrong
+    oid_types = {
+        16: pa.bool_(),
+        19: pa.string(),
+        20: pa.int64(),
+        21: pa.int64(),
+        23: pa.int64(),
+        25: pa.string(),
+        700: pa.float64(),
+        701: pa.float64(),
+        1042: pa.string(),
+        1043: pa.string(),
+        1082: pa.date32(),
+        1700: pa.float64(),
+    }
+    copy_sql = f"copy ({query}) to stdout with (format csv, header true)"
+    raw_conn = engine.raw_connection()
+    cursor = raw_conn.cursor()
+    cursor.execute(f"select * from ({query}) as result limit 0")
+    column_types = {
+        column.name: oid_types[column.type_code]
+        for column in cursor.description
+        if column.type_code in oid_types
+    }
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def copy_to_pipe():
+        try:
+            with os.fdopen(write_fd, "wb") as sink:
+                cursor.copy_expert(copy_sql, sink)
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=copy_to_pipe, daemon=True)
+    writer.start()
+    try:
+        with os.fdopen(read_fd, "rb") as source:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=block_size),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=column_types,
+                    true_values=["t"],
+                    false_values=["f"],
+                    strings_can_be_null=True,
+                    # a quoted "" is an empty string, as read_sql returns it
+                    quoted_strings_can_be_null=False,
+                ),
+            )
+            table = reader.read_all()
+    except Exception:
+        # a failed copy ends the stream early, report the database error instead
+        writer.join()
+        if errors:
+            raise errors[0]
+        raise
+    finally:
+        writer.join()
+        raw_conn.close()
+    if errors:
+        raise errors[0]
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_query(query, db_name="postgres", params=None, bulk=False):
+    """
+    read a query, bulk extracts are pulled with COPY and other queries with read_sql,
+    the query waits for a free slot when max_concurrent_queries are already running
+
+    Parameters
+    ----------
+    query : str or sqlalchemy.sql.elements.TextClause
+        sql query without a trailing semicolon
+    db_name : str, optional
+        database to query, by default "postgres"
+    params : dict, optional
+        values of the :name bind parameters of the query, by default None
+    bulk : bool, optional
+        the query returns a large extract, pulled with COPY on psycopg2 engines,
+        by default False, see the bulk flag of queries.QUERIES
+
+    Returns
+    -------
+    pd.DataFrame
+        query result
+    """
+    from analytics_dashboards.common.query_coordinator import db_slot
+
+    if isinstance(query, sa.sql.elements.TextClause):
+        query = query.text
+    query = query.strip().rstrip(";")
+    engine = get_engine(db_name=db_name)
+    with db_slot():
+        if bulk and engine.dialect.driver == "psycopg2":
+            bulk_query = query if params is None else literal_sql(query, params, engine)
+            return read_sql_copy(bulk_query, engine)
+        if params is None:
+            return pd.read_sql(query, con=engine)
+        return pd.read_sql(sa.text(query), con=engine, params=params)
+
+
+def read_query_chunks(query, db_name="postgres", params=None, chunksize=100_000):
+    """
+    read a query in chunks through a server side cursor, only one chunk is held in memory
+
+    a database slot is held while a chunk is fetched and released while the consumer
+    processes it, so a slow or abandoned consumer never blocks other queries; its
+    connection stays open until the generator is exhausted or closed
+
+    Parameters
+    ----------
+    query : str or sqlalchemy.sql.elements.TextClause
+        sql query without a trailing semicolon
+    db_name : str, optional
+        database to query, by default "postgres"
+    params : dict, optional
+        values of the :name bind parameters of the query, by default None
+    chunksize : int, optional
+        rows per chunk, by default 100_000
+
+    Yields
+    ------
+    pd.DataFrame
+        chunk of the query result
+    """
+    from analytics_dashboards.common.query_coordinator import db_slot
+
+    if isinstance(query, sa.sql.elements.TextClause):
+        query = query.text
+    query = query.strip().rstrip(";")
+    engine = get_engine(db_name=db_name)
+    with engine.connect().execution_options(stream_results=True) as conn:
+        with db_slot():
+            chunks = pd.read_sql(
+                sa.text(query), con=conn, params=params or {}, chunksize=chunksize
+            )
+        while True:
+            with db_slot():
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+def datastore_path(*parts):
+    """
+    build a path inside the configured local datastore, creating its directory
+
+    Parameters
+    ----------
+    *parts : str
+        path components relative to the datastore directory
+
+    Returns
+    -------
+    str
+        absolute path inside the datastore
+    """
+    path = os.path.join(
+        os.path.dirname(__file__), "../../", load_config()["file_datastore"], *parts
     )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return os.path.abspath(path)
+
+
+def write_parquet(df, path, **kwargs):
+    """
+    write a dataframe to a parquet file of the datastore through a temporary file,
+    readers in other threads or worker processes never see a partial file
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        table to write, without its index
+    path : str
+        location of the parquet file
+    **kwargs
+        passed on to DataFrame.to_parquet
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_parquet(tmp_path, index=False, **kwargs)
+    os.replace(tmp_path, path)
 
 
 def model_version():
     """
     returns the model version number
     """
-    query = """
-    select value from model_metadata where item = 'model_version' 
-    """
-    df = pd.read_sql(query, con=get_engine())
+    from analytics_dashboards.common.queries import run_query
+
+    df = run_query("model_version", cached=False)
     model_version = df.iloc[0][0]
     return model_version
 
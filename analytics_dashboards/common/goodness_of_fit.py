@@ -0,0 +1,206 @@
+# two-sample goodness of fit statistics between the model and the events data:
+# samples are weighted empirical distributions, built either from the raw values or from
+# equally weighted quantiles, so the model side never has to be loaded row by row
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.queries import run_query
+
+# quantile points kept per model measure
+QUANTILE_POINTS = 2000
+
+# measures summarised by the model_event_quantiles query
+MODEL_MEASURES = [
+    "duration",
+    "event_impact",
+    "gu_liability",
+    "gu_regulatory",
+    "gu_privacy",
+    "gu_bi",
+    "gu_extortion",
+]
+
+
+def sample_distribution(values):
+    """
+    empirical distribution of a sample
+
+    Parameters
+    ----------
+    values : array-like
+        sample, missing values are dropped
+
+    Returns
+    -------
+    tuple
+        (sorted distinct values, count of each value)
+    """
+    values = np.asarray(values, dtype=float)
+    return np.unique(values[~np.isnan(values)], return_counts=True)
+
+
+def quantile_distribution(quantiles, count):
+    """
+    distribution represented by equally weighted quantiles of a sample
+
+    Parameters
+    ----------
+    quantiles : array-like
+        quantiles of the sample at equally spaced levels
+    count : int
+        size of the sample
+
+    Returns
+    -------
+    tuple
+        (sorted distinct values, weight of each value)
+    """
+    quantiles = np.asarray(quantiles, dtype=float)
+    values, counts = np.unique(quantiles[~np.isnan(quantiles)], return_counts=True)
+    if len(values) == 0:
+        return values, counts.astype(float)
+    return values, counts * (count / counts.sum())
+
+
+def cdfs(dist_a, dist_b):
+    """
+    evaluate both distribution functions on the union of their values
+
+    Returns
+    -------
+    tuple
+        (union values, cdf of a, cdf of b, pooled weight at each value)
+    """
+    values = np.union1d(dist_a[0], dist_b[0])
+    cdf_a = np.cumsum(
+        np.bincount(np.searchsorted(values, dist_a[0]), dist_a[1], len(values))
+    )
+    cdf_b = np.cumsum(
+        np.bincount(np.searchsorted(values, dist_b[0]), dist_b[1], len(values))
+    )
+    pooled = np.diff(cdf_a + cdf_b, prepend=0)
+    return values, cdf_a / cdf_a[-1], cdf_b / cdf_b[-1], pooled
+
+
+def compare_distributions(dist_a, dist_b, log_scale=False):
+    """
+    two-sample kolmogorov-smirnov, anderson-darling and wasserstein statistics
+
+    the anderson-darling statistic is the two-sample form
+    n m / N * sum((F - G)^2 / (H (1 - H)) dH) over the pooled distribution H,
+    the ks p-value uses the asymptotic kolmogorov distribution
+
+    Parameters
+    ----------
+    dist_a : tuple
+        (values, weights) as returned by sample_distribution or quantile_distribution
+    dist_b : tuple
+        (values, weights) of the second sample
+    log_scale : bool, optional
+        compute the wasserstein distance between log10 values, by default False;
+        ks and anderson-darling do not depend on the scale
+
+    Returns
+    -------
+    dict
+        sample sizes, ks, ks_pvalue, anderson_darling and wasserstein
+    """
+    from scipy import stats
+
+    n, m = float(np.sum(dist_a[1])), float(np.sum(dist_b[1]))
+    result = {"n_a": n, "n_b": m}
+    if n == 0 or m == 0:
+        return dict(
+            result,
+            ks=np.nan,
+            ks_pvalue=np.nan,
+            anderson_darling=np.nan,
+            wasserstein=np.nan,
+        )
+
+    values, cdf_a, cdf_b, pooled = cdfs(dist_a, dist_b)
+    diff = cdf_a - cdf_b
+    ks = np.abs(diff).max()
+    effective_n = n * m / (n + m)
+
+    pooled_cdf = np.cumsum(pooled) / (n + m)
+    inner = pooled_cdf < 1
+    anderson_darling = effective_n * np.sum(
+        diff[inner] ** 2
+        / (pooled_cdf[inner] * (1 - pooled_cdf[inner]))
+        * pooled[inner]
+        / (n + m)
+    )
+
+    if log_scale:
+        with np.errstate(divide="ignore"):
+            values = np.log10(values)
+        keep = np.isfinite(values)
+        values, diff = values[keep], diff[keep]
+    wasserstein = np.sum(np.abs(diff[:-1]) * np.diff(values))
+
+    return dict(
+        result,
+        ks=ks,
+        ks_pvalue=stats.kstwobign.sf(np.sqrt(effective_n) * ks),
+        anderson_darling=anderson_darling,
+        wasserstein=wasserstein,
+    )
+
+
+def model_distributions(points=QUANTILE_POINTS):
+    """
+    distributions of the model measures from quantiles computed by the database
+
+    Parameters
+    ----------
+    points : int, optional
+        quantiles per measure, by default QUANTILE_POINTS
+
+    Returns
+    -------
+    dict
+        measure -> (values, weights), see MODEL_MEASURES
+    """
+    levels = [(i + 0.5) / points for i in range(points)]
+    row = run_query("model_event_quantiles", levels=levels).iloc[0]
+    return {
+        measure: quantile_distribution(
+            row[measure] if row[measure] is not None else [], row[f"{measure}_count"]
+        )
+        for measure in MODEL_MEASURES
+    }
+
+
+def gof_table(comparisons):
+    """
+    summary table of goodness of fit statistics
+
+    Parameters
+    ----------
+    comparisons : list
+        (measure, source, reference distribution, source distribution, log_scale) tuples
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per measure and source compared with the reference
+    """
+    rows = []
+    for measure, source, reference, dist, log_scale in comparisons:
+        statistics = compare_distributions(reference, dist, log_scale=log_scale)
+        rows.append(
+            {
+                "measure": measure,
+                "source": source,
+                "n model": int(statistics["n_a"]),
+                "n source": int(statistics["n_b"]),
+                "ks": statistics["ks"],
+                "ks p-value": statistics["ks_pvalue"],
+                "anderson-darling": statistics["anderson_darling"],
+                "wasserstein": statistics["wasserstein"],
+                "wasserstein scale": "log10" if log_scale else "linear",
+            }
+        )
+    return pd.DataFrame(rows).round(4)
@@ -0,0 +1,171 @@
+# pre-aggregated summary of model_events used by the frequency and cia charts:
+
+import os
+
+import pandas as pd
+
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  model_version, read_query)
+
+CUBE_DIMENSIONS = [
+    "run_id",
+    "year_x",
+    "confidentiality",
+    "availability",
+    "integrity",
+    "extortion",
+    "event_type",
+    "targeted_event_type",
+]
+
+CUBE_MEASURES = [
+    "event_count",
+    "gu_mean",
+    "gu_bi",
+    "gu_cbi",
+    "gu_extortion",
+    "gu_liability",
+    "gu_privacy",
+    "gu_regulatory",
+]
+
+# simulation years stored per parquet row group, reading a year range skips the other groups
+YEARS_PER_ROW_GROUP = 500
+
+# cubes already loaded in this process, keyed by model version
+_cubes = {}
+
+
+def cube_query():
+    """
+    returns the query aggregating model_events to the cube grain
+    """
+    dimensions = ",\n        ".join(CUBE_DIMENSIONS)
+    return f"""
+    select
+        {dimensions},
+        count(*) as event_count,
+        sum(gu_mean) as gu_mean,
+        sum(gu_bi_ratio * gu_mean) as gu_bi,
+        sum(gu_contingent_bi_ratio * gu_mean) as gu_cbi,
+        sum(gu_extortion_ratio * gu_mean) as gu_extortion,
+        sum(gu_liability_ratio * gu_mean) as gu_liability,
+        sum(gu_privacy_ratio * gu_mean) as gu_privacy,
+        sum(gu_regulatory_ratio * gu_mean) as gu_regulatory
+    from
+        model_events
+    group by
+        {dimensions}
+    """
+
+
+def cube_path(version):
+    """
+    returns the location of the cube parquet file for a model version
+
+    Parameters
+    ----------
+    version : str
+        model version number
+
+    Returns
+    -------
+    str
+        path to the cube file
+    """
+    return datastore_path("model_cube", f"model_events_cube_{version}.parquet")
+
+
+def build_model_cube(version=None):
+    """
+    aggregate model_events in the database and store the result as a parquet file
+    partitioned into row groups by year_x
+
+    Parameters
+    ----------
+    version : str, optional
+        model version number the cube is stored under, by default the current model version
+
+    Returns
+    -------
+    pd.DataFrame
+        the model events cube
+    """
+    if version is None:
+        version = model_version()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cube = read_query(cube_query(), bulk=True).sort_values("year_x", ignore_index=True)
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    row_group = (cube["year_x"] - 1) // YEARS_PER_ROW_GROUP
+    bounds = row_group.searchsorted(row_group.unique()).tolist() + [len(cube)]
+    with pq.ParquetWriter(cube_path(version), table.schema) as writer:
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, stop - start))
+    _cubes[version] = cube
+    return cube
+
+
+def read_model_cube(year_range=None):
+    """
+    get the model events cube for the current model version, building it on first use
+
+    Parameters
+    ----------
+    year_range : tuple, optional
+        inclusive (first, last) simulation years, only the row groups of these years
+        are read if the cube is not loaded yet, by default all years
+
+    Returns
+    -------
+    pd.DataFrame
+        the model events cube
+    """
+    version = model_version()
+    path = cube_path(version)
+    if year_range is not None and version not in _cubes and os.path.exists(path):
+        return pd.read_parquet(
+            path,
+            filters=[("year_x", ">=", year_range[0]), ("year_x", "<=", year_range[1])],
+        )
+    if version not in _cubes:
+        if os.path.exists(path):
+            _cubes[version] = pd.read_parquet(path)
+        else:
+            build_model_cube(version)
+    cube = _cubes[version]
+    if year_range is not None:
+        return cube.loc[cube["year_x"].between(*year_range)]
+    return cube
+
+
+def rollup(dimensions, measures=("event_count",), year_range=None):
+    """
+    roll up the model events cube to a coarser set of dimensions
+
+    Parameters
+    ----------
+    dimensions : list
+        cube dimensions to keep
+    measures : tuple, optional
+        cube measures to sum, by default ("event_count",)
+    year_range : tuple, optional
+        inclusive (first, last) simulation years to roll up, by default all years
+
+    Returns
+    -------
+    pd.DataFrame
+        measures summed by the given dimensions
+    """
+    return (
+        read_model_cube(year_range)
+        .groupby(list(dimensions), dropna=False)[list(measures)]
+        .sum()
+        .reset_index()
+    )
+
+
+if __name__ == "__main__":
+    cube = build_model_cube()
+    print(f"model events cube built with {len(cube)} rows")
@@ -0,0 +1,339 @@
+# lightweight column profiles of tables too large for pandas-profiling:
+# one streaming pass over chunks of rows keeps, per column, the null, zero and "None"
+# string counts, a hyperloglog sketch of the distinct values, a quantile sketch of numeric
+# values and the most frequent values, all mergeable so chunks never have to be kept
+
+import html
+import json
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.sketches import (merge, new_sketch, quantiles,
+                                                  update)
+
+# hyperloglog registers are indexed by the first HLL_PRECISION bits of the hash,
+# the relative error of the distinct count is about 1.04 / sqrt(2 ** HLL_PRECISION)
+HLL_PRECISION = 12
+
+# string values counted as missing although they are not null
+NULL_STRINGS = ["", "None", "nan", "NaN", "null", "[None]", "[]"]
+
+# most frequent values reported per column
+TOP_K = 5
+
+# candidate values kept per column while streaming, the top k are exact when the
+# frequent values stay among the candidates
+TOP_CANDIDATES = 200
+
+PROFILE_QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+
+def leading_zeros(words):
+    """
+    number of leading zero bits of 64 bit unsigned integers, by binary search on the
+    bit length
+
+    Parameters
+    ----------
+    words : np.ndarray
+        uint64 values
+
+    Returns
+    -------
+    np.ndarray
+        leading zero count, 64 for zero
+    """
+    words = words.copy()
+    zeros = np.zeros(len(words), dtype=np.int64)
+    for shift in [32, 16, 8, 4, 2, 1]:
+        small = words < np.uint64(1) << np.uint64(64 - shift)
+        zeros += shift * small
+        words = np.where(small, words << np.uint64(shift), words)
+    return zeros + (words == 0)
+
+
+def hll_update(registers, values):
+    """
+    add values to hyperloglog registers
+
+    Parameters
+    ----------
+    registers : np.ndarray
+        2 ** HLL_PRECISION uint8 registers, updated in place
+    values : pd.Series
+        hashable values, nulls are skipped
+
+    Returns
+    -------
+    np.ndarray
+        the updated registers
+    """
+    values = values.dropna()
+    if len(values) == 0:
+        return registers
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(np.uint64)
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    remainder = hashes << np.uint64(HLL_PRECISION)
+    rank = np.minimum(leading_zeros(remainder) + 1, 64 - HLL_PRECISION + 1)
+    np.maximum.at(registers, index, rank.astype(np.uint8))
+    return registers
+
+
+def hll_count(registers):
+    """
+    estimated number of distinct values of hyperloglog registers, with the linear
+    counting correction for small counts
+    """
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m**2 / np.sum(2.0 ** -registers.astype(float))
+    empty = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and empty:
+        estimate = m * np.log(m / empty)
+    return int(round(estimate))
+
+
+def new_column_profile():
+    """
+    returns an empty column profile
+    """
+    return {
+        "dtype": None,
+        "count": 0,
+        "nulls": 0,
+        "zeros": 0,
+        "null_strings": 0,
+        "registers": np.zeros(2**HLL_PRECISION, dtype=np.uint8),
+        "sketch": None,
+        "top": pd.Series(dtype=float),
+    }
+
+
+def update_column_profile(profile, values):
+    """
+    add a chunk of a column to its profile
+
+    Parameters
+    ----------
+    profile : dict
+        column profile, see new_column_profile, updated in place
+    values : pd.Series
+        chunk of the column
+
+    Returns
+    -------
+    dict
+        the updated profile
+    """
+    profile["dtype"] = profile["dtype"] or str(values.dtype)
+    profile["count"] += len(values)
+    profile["nulls"] += int(values.isna().sum())
+    if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+        # lists, arrays and dicts are not hashable, they are profiled as text
+        values = values.where(values.isna(), values.astype(str))
+        profile["null_strings"] += int(values.isin(NULL_STRINGS).sum())
+    elif pd.api.types.is_bool_dtype(values):
+        profile["zeros"] += int((~values.fillna(True).astype(bool)).sum())
+    elif pd.api.types.is_numeric_dtype(values):
+        profile["zeros"] += int((values == 0).sum())
+        if profile["sketch"] is None:
+            profile["sketch"] = new_sketch()
+        update(profile["sketch"], values.to_numpy(dtype=float, na_value=np.nan))
+    hll_update(profile["registers"], values)
+    counts = values.value_counts().head(TOP_CANDIDATES)
+    profile["top"] = profile["top"].add(counts, fill_value=0).nlargest(TOP_CANDIDATES)
+    return profile
+
+
+def merge_profiles(*profiles):
+    """
+    merge the profiles of the same columns built on separate chunks or partitions
+
+    Parameters
+    ----------
+    *profiles : dict
+        column name -> column profile, see profile_chunks
+
+    Returns
+    -------
+    dict
+        merged column name -> column profile
+    """
+    merged = {}
+    for profile in profiles:
+        for column, part in profile.items():
+            if column not in merged:
+                merged[column] = new_column_profile()
+            target = merged[column]
+            target["dtype"] = target["dtype"] or part["dtype"]
+            for key in ["count", "nulls", "zeros", "null_strings"]:
+                target[key] += part[key]
+            target["registers"] = np.maximum(target["registers"], part["registers"])
+            if part["sketch"] is not None:
+                target["sketch"] = (
+                    part["sketch"]
+                    if target["sketch"] is None
+                    else merge(target["sketch"], part["sketch"])
+                )
+            target["top"] = (
+                target["top"].add(part["top"], fill_value=0).nlargest(TOP_CANDIDATES)
+            )
+    return merged
+
+
+def profile_chunks(chunks):
+    """
+    profile every column of a table in one pass over chunks of its rows
+
+    Parameters
+    ----------
+    chunks : iterable
+        dataframes with the same columns, e.g. from queries.iter_query
+
+    Returns
+    -------
+    dict
+        column name -> column profile
+    """
+    profiles = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            update_column_profile(
+                profiles.setdefault(column, new_column_profile()), chunk[column]
+            )
+    return profiles
+
+
+def profile_frame(df, chunksize=100_000):
+    """
+    profile every column of a loaded dataframe
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        table to profile
+    chunksize : int, optional
+        rows profiled at once, by default 100_000
+
+    Returns
+    -------
+    dict
+        column name -> column profile
+    """
+    return profile_chunks(
+        df.iloc[start : start + chunksize] for start in range(0, len(df), chunksize)
+    )
+
+
+def profile_query(name, chunksize=100_000, **params):
+    """
+    profile the result of a registered query while it is streamed from the database
+
+    Parameters
+    ----------
+    name : str
+        registered query name
+    chunksize : int, optional
+        rows per chunk, by default 100_000
+    **params
+        parameters overriding the query defaults
+
+    Returns
+    -------
+    dict
+        column name -> column profile
+    """
+    from analytics_dashboards.common.queries import iter_query
+
+    return profile_chunks(iter_query(name, chunksize=chunksize, **params))
+
+
+def profile_table(profiles, top_k=TOP_K):
+    """
+    one row summary per profiled column
+
+    Parameters
+    ----------
+    profiles : dict
+        column name -> column profile, see profile_chunks
+    top_k : int, optional
+        most frequent values reported, by default TOP_K
+
+    Returns
+    -------
+    pd.DataFrame
+        count, null, zero and "None" string percentages, approximate distinct count,
+        quantiles of numeric columns and the most frequent values
+    """
+    rows = []
+    for column, profile in profiles.items():
+        count = max(profile["count"], 1)
+        row = {
+            "column": column,
+            "dtype": profile["dtype"],
+            "count": profile["count"],
+            "null %": 100 * profile["nulls"] / count,
+            "zero %": 100 * profile["zeros"] / count,
+            "none string %": 100 * profile["null_strings"] / count,
+            "distinct": hll_count(profile["registers"]),
+        }
+        sketch = profile["sketch"]
+        values = (
+            quantiles(sketch, PROFILE_QUANTILES)
+            if sketch is not None and sketch["n"]
+            else [np.nan] * len(PROFILE_QUANTILES)
+        )
+        row.update(zip(["min", "q25", "median", "q75", "max"], values))
+        row["top values"] = ", ".join(
+            f"{value} ({int(n)})" for value, n in profile["top"].nlargest(top_k).items()
+        )
+        rows.append(row)
+    return pd.DataFrame(rows).round({"null %": 2, "zero %": 2, "none string %": 2})
+
+
+def profile_json(profiles, top_k=TOP_K):
+    """
+    profile summary as a json string
+    """
+    return profile_table(profiles, top_k=top_k).to_json(
+        orient="records", default_handler=str
+    )
+
+
+def profile_html(profiles, title="profile", top_k=TOP_K):
+    """
+    profile summary as a compact standalone html page
+    """
+    table = profile_table(profiles, top_k=top_k).to_html(
+        index=False, float_format="{:,.4g}".format, na_rep=""
+    )
+    return (
+        f"<html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:2px 6px;font-size:12px}</style>"
+        f"</head><body><h2>{html.escape(title)}</h2>{table}</body></html>"
+    )
+
+
+def write_profile(profiles, path, title="profile", top_k=TOP_K):
+    """
+    write a profile summary to an html or, for a .json path, a json file
+
+    Parameters
+    ----------
+    profiles : dict
+        column name -> column profile, see profile_chunks
+    path : str
+        output file
+    title : str, optional
+        title of the html page, by default "profile"
+    top_k : int, optional
+        most frequent values reported, by default TOP_K
+    """
+    if path.endswith(".json"):
+        content = json.dumps(json.loads(profile_json(profiles, top_k)), indent=1)
+    else:
+        content = profile_html(profiles, title=title, top_k=top_k)
+    with open(path, "w") as file:
+        file.write(content)
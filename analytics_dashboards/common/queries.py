@@ -0,0 +1,592 @@
+# registry of the named sql statements used by the dashboards:
+# statements take bind parameters, the optional filters of a query replace its {filters}
+# placeholder and are left out of the statement when their parameter is None
+
+from functools import lru_cache
+
+import sqlalchemy as sa
+
+# filters of the fortune 1000 cohort: parameter -> predicate
+F1K_FILTERS = {
+    "revenue_floor": "company_revenue_millions_usd >= :revenue_floor",
+    "country": "company_country_code = :country",
+    "sic_ceiling": "left(company_sic::text,2)::int < :sic_ceiling",
+    "year_from": "event_start_date >= make_date(:year_from, 1, 1)",
+    "year_to": "event_start_date < make_date(:year_to + 1, 1, 1)",
+}
+
+# the same filters on the f1k_events_mv materialized view, see db_migrations
+F1K_VIEW_FILTERS = dict(
+    F1K_FILTERS,
+    sic_ceiling="sic2 < :sic_ceiling",
+    year_from="year_start >= :year_from",
+    year_to="year_start <= :year_to",
+)
+
+F1K_DEFAULTS = {
+    "revenue_floor": 2000,
+    "country": "US",
+    "sic_ceiling": 90,
+    "year_range": (2010, 2020),
+}
+
+ENTITY_FILTERS = {
+    name: F1K_FILTERS[name] for name in ["revenue_floor", "country", "sic_ceiling"]
+}
+
+ENTITY_DEFAULTS = {name: F1K_DEFAULTS[name] for name in ENTITY_FILTERS}
+
+# name -> sql, database, optional filters and default parameters; bulk marks the
+# extracts large enough to be pulled with COPY, see get_data.read_query
+QUERIES = {
+    "model_version": {
+        "sql": """
+        select value from model_metadata where item = 'model_version'
+        """,
+    },
+    "f1k_events": {
+        "sql": """
+        select
+            *,
+            date_part('year', event_start_date)::int as year_start
+        from
+            data_sources_events
+        join
+            data_sources_entities
+            using (company_instance_id)
+        where
+            {filters}
+        """,
+        "filters": F1K_FILTERS,
+        "defaults": F1K_DEFAULTS,
+    },
+    "f1k_events_mv": {
+        "sql": """
+        select
+            *
+        from
+            f1k_events_mv
+        where
+            {filters}
+        """,
+        "filters": F1K_VIEW_FILTERS,
+        "defaults": F1K_DEFAULTS,
+    },
+    "f1k_year_bounds": {
+        "sql": """
+        select
+            date_part('year', min(event_start_date))::int as first_year,
+            date_part('year', max(event_start_date))::int as last_year
+        from
+            data_sources_events
+        """,
+    },
+    "f1k_entities": {
+        "sql": """
+        select
+            *
+        from
+            data_sources_entities
+        where
+            {filters}
+        """,
+        "filters": ENTITY_FILTERS,
+        "defaults": ENTITY_DEFAULTS,
+    },
+    "f1k_new_events": {
+        "sql": """
+        select
+            *
+        from
+            data_sources_events
+        where
+            company_instance_id in (
+                select company_instance_id from data_sources_entities
+                where company_revenue_millions_usd >= :revenue_floor
+                and company_country_code = :country
+                and left(company_sic::text,2)::int < :sic_ceiling
+            )
+            and {filters}
+        """,
+        "filters": {
+            "watermark": "event_id > :watermark",
+        },
+        "defaults": dict(ENTITY_DEFAULTS, watermark=None),
+    },
+    "f1k_entity_counts": {
+        "sql": """
+        select
+            left(company_sic::text,2)::int as sic2,
+            case
+                when company_revenue_millions_usd >= 50000 then '50B+'
+                when company_revenue_millions_usd >= 10000 then '10-50B'
+                when company_revenue_millions_usd >= 5000 then '5-10B'
+                else '2-5B'
+            end as revenue_band,
+            count(*) as entities
+        from
+            data_sources_entities
+        where
+            {filters}
+        group by
+            1,
+            2
+        """,
+        "filters": ENTITY_FILTERS,
+        "defaults": ENTITY_DEFAULTS,
+    },
+    "f1k_event_counts": {
+        "sql": """
+        select
+            left(company_sic::text,2)::int as sic2,
+            case
+                when company_revenue_millions_usd >= 50000 then '50B+'
+                when company_revenue_millions_usd >= 10000 then '10-50B'
+                when company_revenue_millions_usd >= 5000 then '5-10B'
+                else '2-5B'
+            end as revenue_band,
+            count(*) as event_count
+        from
+            data_sources_events
+        join
+            data_sources_entities
+            using (company_instance_id)
+        where
+            {filters}
+        group by
+            1,
+            2
+        """,
+        "filters": F1K_FILTERS,
+        "defaults": F1K_DEFAULTS,
+    },
+    "company_events": {
+        "sql": """
+        select
+            *
+        from
+            data_sources_events
+        where
+            company_instance_id = any(:company_ids)
+            and event_id <= :watermark
+        """,
+    },
+    "event_cost_components": {
+        "sql": """
+        select
+            impact_type_confidentiality,
+            impact_type_availability,
+            impact_type_integrity,
+            event_type,
+            1 as count
+        from
+            data_sources_events
+        """,
+    },
+    "vcdb_availability": {
+        "db_name": "data_sources",
+        "sql": """
+        select
+            incident_id,
+            victim_victim_id,
+            victim_country,
+            victim_government,
+            victim_industry,
+            victim_state,
+            action_misuse_variety,
+            attribute_availability_variety,
+            attribute_confidentiality_data,
+            attribute_confidentiality_data_disclosure,
+            timeline_incident_year,
+            timeline_containment_unit,
+            timeline_containment_value,
+            attribute_availability_duration_value,
+            attribute_availability_duration_unit,
+            attribute_availability_notes,
+            summary
+        from
+            vcdb
+        where
+            attribute_availability_duration_value is not null
+        """,
+    },
+    "model_event_severity": {
+        "bulk": True,
+        "sql": """
+        select
+            model_events.run_id::text as entity,
+            model_entities.revenue_band,
+            model_entities.sic_code as sic,
+            model_events.confidentiality,
+            model_events.targeted_event_type,
+            gu_mean as event_impact,
+            event_type as event_type,
+            gu_bi_ratio * gu_mean as gu_bi,
+            gu_contingent_bi_ratio * gu_mean as gu_cbi,
+            gu_extortion_ratio * gu_mean as gu_extortion,
+            gu_liability_ratio * gu_mean as gu_liability,
+            gu_privacy_ratio * gu_mean as gu_privacy,
+            gu_regulatory_ratio * gu_mean as gu_regulatory
+        from
+            model_events
+        join
+            model_entities
+            on model_entities.run_id = model_events.run_id
+        """,
+    },
+    "model_event_duration": {
+        "bulk": True,
+        "sql": """
+        select
+            run_id,
+            event_duration/(60*24) as duration,
+            event_type as event_type
+        from
+            model_events
+        """,
+    },
+    "model_event_quantiles": {
+        "sql": """
+        select
+            count(*) as duration_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by event_duration/(60*24)) as duration,
+            count(*) filter (where confidentiality = 1) as event_impact_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by gu_mean)
+                filter (where confidentiality = 1) as event_impact,
+            count(*) filter (where gu_liability_ratio > 0) as gu_liability_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by gu_liability_ratio * gu_mean)
+                filter (where gu_liability_ratio > 0) as gu_liability,
+            count(*) filter (where gu_regulatory_ratio > 0) as gu_regulatory_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by gu_regulatory_ratio * gu_mean)
+                filter (where gu_regulatory_ratio > 0) as gu_regulatory,
+            count(*) filter (where gu_privacy_ratio > 0) as gu_privacy_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by gu_privacy_ratio * gu_mean)
+                filter (where gu_privacy_ratio > 0) as gu_privacy,
+            count(*) filter (where gu_bi_ratio + gu_contingent_bi_ratio > 0) as gu_bi_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by (gu_bi_ratio + gu_contingent_bi_ratio) * gu_mean)
+                filter (where gu_bi_ratio + gu_contingent_bi_ratio > 0) as gu_bi,
+            count(*) filter (where gu_extortion_ratio > 0) as gu_extortion_count,
+            percentile_disc(cast(:levels as double precision[]))
+                within group (order by gu_extortion_ratio * gu_mean)
+                filter (where gu_extortion_ratio > 0) as gu_extortion
+        from
+            model_events
+        """,
+    },
+    "model_annual_losses": {
+        "sql": """
+        select
+            run_id,
+            year_x,
+            sum(gu_mean) as aggregate_loss,
+            max(gu_mean) as occurrence_loss
+        from
+            model_events
+        where
+            {filters}
+        group by
+            run_id,
+            year_x
+        """,
+        "filters": {
+            "year_from": "year_x >= :year_from",
+            "year_to": "year_x <= :year_to",
+        },
+        "defaults": {"year_range": None},
+    },
+    "model_entity_counts": {
+        "sql": """
+        select
+            left(sic_code::text,2)::int as sic2,
+            revenue_band,
+            count(*) as entities
+        from
+            model_entities
+        group by
+            1,
+            2
+        """,
+    },
+    "model_event_counts": {
+        "sql": """
+        select
+            left(model_entities.sic_code::text,2)::int as sic2,
+            model_entities.revenue_band,
+            count(*) as event_count
+        from
+            model_events
+        join
+            model_entities
+            on model_entities.run_id = model_events.run_id
+        group by
+            1,
+            2
+        """,
+    },
+    "model_simulation_years": {
+        "sql": """
+        select max(year_x) as simulation_years from model_events
+        """,
+    },
+    "model_entity_exposure": {
+        "sql": """
+        select
+            entity_name as company_name,
+            entity_revenue/1e6 as revenue,
+            sic_code as sic,
+            countries as geography
+        from
+            model_entities
+        """,
+    },
+    "model_records_histogram": {
+        "sql": """
+        select
+            split.data_type,
+            case
+                when records.impacted * split.share >= 1
+                then floor(log(records.impacted * split.share) / :bin_width)::int
+            end as bin,
+            count(*) as event_count
+        from
+            model_events
+        join
+            model_entities
+            on model_entities.run_id = model_events.run_id
+        cross join lateral (
+            select
+                (
+                    model_entities.number_of_data_records * model_events.data_scale
+                )::double precision as impacted
+        ) as records
+        cross join lateral (
+            values
+                ('ALL', 1.0::double precision),
+                ('PCI', model_entities.data_split_pci::double precision),
+                ('PHI', model_entities.data_split_phi::double precision),
+                ('PII', model_entities.data_split_pii::double precision),
+                ('OTHER', model_entities.data_split_other::double precision)
+        ) as split (data_type, share)
+        group by
+            1,
+            2
+        """,
+    },
+    "model_run_ids": {
+        "sql": """
+        select run_id from model_entities
+        """,
+    },
+    "model_entity_cohorts": {
+        "sql": """
+        select
+            run_id,
+            entity_name,
+            left(sic_code::text,2)::int as sic2,
+            revenue_band,
+            replace(countries, 'US-', '') as state
+        from
+            model_entities
+        """,
+    },
+    "model_signal_counts": {
+        "sql": """
+        select
+            model_events.targeted_event_type,
+            left(model_entities.sic_code::text,2)::int as sic2,
+            model_events.confidentiality,
+            model_events.integrity,
+            model_events.availability,
+            count(*) as event_count,
+            count(*) filter (where gu_mean > 0) as cost_count,
+            sum(log(gu_mean)) filter (where gu_mean > 0) as log_cost_sum,
+            sum(log(gu_mean) ^ 2) filter (where gu_mean > 0) as log_cost_sq_sum
+        from
+            model_events
+        join
+            model_entities
+            on model_entities.run_id = model_events.run_id
+        group by
+            1,
+            2,
+            3,
+            4,
+            5
+        """,
+    },
+    "model_run_event_counts": {
+        "sql": """
+        select
+            run_id,
+            count(*) as event_count,
+            count(*) filter (where confidentiality = 1) as confidentiality_count
+        from
+            model_events
+        group by
+            1
+        """,
+    },
+    "model_events_quality": {
+        "sql": """
+        select
+            count(*) as rows,
+            count(*) filter (where gu_mean < 0) as negative_impact,
+            count(*) filter (where gu_mean is null) as missing_impact,
+            count(*) filter (
+                where event_duration < 0 or event_duration is null
+            ) as invalid_duration,
+            count(*) filter (
+                where least(
+                    gu_bi_ratio,
+                    gu_contingent_bi_ratio,
+                    gu_extortion_ratio,
+                    gu_liability_ratio,
+                    gu_privacy_ratio,
+                    gu_regulatory_ratio
+                ) < 0
+                or greatest(
+                    gu_bi_ratio,
+                    gu_contingent_bi_ratio,
+                    gu_extortion_ratio,
+                    gu_liability_ratio,
+                    gu_privacy_ratio,
+                    gu_regulatory_ratio
+                ) > 1
+            ) as ratio_out_of_range,
+            count(*) filter (where data_scale < 0) as negative_data_scale
+        from
+            model_events
+        """,
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def statement(name, filters=()):
+    """
+    build the statement of a registered query with a set of its optional filters,
+    each shape is built once so the same statement object and compiled form are reused
+
+    Parameters
+    ----------
+    name : str
+        registered query name
+    filters : tuple, optional
+        names of the optional filters to apply, by default ()
+
+    Returns
+    -------
+    sqlalchemy.sql.elements.TextClause
+        statement with bind parameters
+    """
+    entry = QUERIES[name]
+    predicates = [entry["filters"][filter_name] for filter_name in filters]
+    sql = entry["sql"].strip()
+    if "filters" in entry:
+        sql = sql.replace("{filters}", "\n            and ".join(predicates) or "true")
+    return sa.text(sql)
+
+
+def bind(name, **params):
+    """
+    resolve a registered query and its bind parameters
+
+    filters left at None are omitted from the statement, year_range expands to
+    year_from and year_to
+
+    Parameters
+    ----------
+    name : str
+        registered query name
+    **params
+        parameters overriding the query defaults
+
+    Returns
+    -------
+    tuple
+        (statement, bind parameters)
+    """
+    entry = QUERIES[name]
+    params = dict(entry.get("defaults", {}), **params)
+    if "year_range" in params:
+        year_range = params.pop("year_range")
+        params["year_from"], params["year_to"] = year_range or (None, None)
+    optional = entry.get("filters", {})
+    filters = tuple(
+        filter_name for filter_name in optional if params.get(filter_name) is not None
+    )
+    params = {
+        key: value
+        for key, value in params.items()
+        if key not in optional or value is not None
+    }
+    return statement(name, filters), params
+
+
+def iter_query(name, chunksize=100_000, **params):
+    """
+    run a registered query and stream its result in chunks, bypassing the result cache
+
+    Parameters
+    ----------
+    name : str
+        registered query name
+    chunksize : int, optional
+        rows per chunk, by default 100_000
+    **params
+        parameters overriding the query defaults
+
+    Yields
+    ------
+    pd.DataFrame
+        chunk of the query result
+    """
+    from analytics_dashboards.common.get_data import read_query_chunks
+
+    query, bind_params = bind(name, **params)
+    db_name = QUERIES[name].get("db_name", "postgres")
+    yield from read_query_chunks(
+        query, db_name=db_name, params=bind_params, chunksize=chunksize
+    )
+
+
+def run_query(name, cached=True, **params):
+    """
+    run a registered query, the results of queries with validation rules are
+    checked and their quarantined rows left out, see validation.RULES
+
+    Parameters
+    ----------
+    name : str
+        registered query name
+    cached : bool, optional
+        read through the persistent result cache, by default True
+    **params
+        parameters overriding the query defaults
+
+    Returns
+    -------
+    pd.DataFrame
+        query result
+    """
+    from analytics_dashboards.common.get_data import read_query
+    from analytics_dashboards.common.result_cache import cached_query
+    from analytics_dashboards.common.validation import RULES, validate
+
+    query, bind_params = bind(name, **params)
+    db_name = QUERIES[name].get("db_name", "postgres")
+    bulk = QUERIES[name].get("bulk", False)
+    if cached:
+        df = cached_query(query, db_name=db_name, params=bind_params, bulk=bulk)
+    else:
+        df = read_query(query, db_name=db_name, params=bind_params, bulk=bulk)
+    if name in RULES:
+        # only the load with the default parameters is the canonical one
+        df = validate(df, name, store=not params)
+    return df
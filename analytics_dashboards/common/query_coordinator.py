@@ -0,0 +1,139 @@
+# coordinates database queries between dashboard sessions in a process:
+# identical in-flight requests share one execution and a fixed number of queries run at once
+
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pandas as pd
+
+from analytics_dashboards.common.get_data import load_config
+
+# requests being executed: key -> future holding the shared result
+_in_flight = {}
+# callers waiting for a request being executed: key -> count
+_followers = {}
+_lock = threading.Lock()
+_slots = None
+
+_metrics = {
+    "executed": 0,
+    "coalesced": 0,
+    "running": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "total_wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+}
+
+
+def db_slots():
+    """
+    returns the semaphore limiting concurrent database queries, sized by max_concurrent_queries
+    """
+    global _slots
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                load_config().get("max_concurrent_queries", 4)
+            )
+        return _slots
+
+
+@contextmanager
+def db_slot():
+    """
+    wait for a free database slot and hold it while the block runs,
+    the time spent queueing is recorded in the query metrics
+    """
+    slots = db_slots()
+    start = time.perf_counter()
+    with _lock:
+        _metrics["queued"] += 1
+        _metrics["max_queued"] = max(_metrics["max_queued"], _metrics["queued"])
+    slots.acquire()
+    wait = time.perf_counter() - start
+    with _lock:
+        _metrics["queued"] -= 1
+        _metrics["running"] += 1
+        _metrics["executed"] += 1
+        _metrics["total_wait_seconds"] += wait
+        _metrics["max_wait_seconds"] = max(_metrics["max_wait_seconds"], wait)
+    try:
+        yield
+    finally:
+        with _lock:
+            _metrics["running"] -= 1
+        slots.release()
+
+
+def single_flight(key, func, copy=True):
+    """
+    run func once for all concurrent callers with the same key, the callers arriving
+    while it runs wait for it and get the same result or exception; a dataframe shared
+    by several callers is copied for each of them, so a caller adding columns never
+    changes the frame of another session
+
+    Parameters
+    ----------
+    key : str
+        identifies the request, e.g. a query cache key
+    func : callable
+        function without arguments producing the result
+    copy : bool, optional
+        copy a shared dataframe result for each caller, by default True; off for
+        results the callers only read
+
+    Returns
+    -------
+    object
+        result of func
+    """
+    with _lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+            _followers[key] = 0
+        else:
+            _metrics["coalesced"] += 1
+            _followers[key] += 1
+    if not leader:
+        return shared_result(future.result(), copy)
+    try:
+        future.set_result(func())
+    except BaseException as e:
+        future.set_exception(e)
+    finally:
+        with _lock:
+            del _in_flight[key]
+            shared = _followers.pop(key) > 0
+    return shared_result(future.result(), copy and shared)
+
+
+def shared_result(result, copy):
+    """
+    returns a copy of a dataframe result when copy is set, the result itself otherwise
+    """
+    if copy and isinstance(result, pd.DataFrame):
+        return result.copy()
+    return result
+
+
+def query_metrics():
+    """
+    returns a snapshot of the query coordinator metrics
+
+    Returns
+    -------
+    dict
+        executed and coalesced query counts, running and queued queries,
+        peak queue length and mean and max queueing time in seconds
+    """
+    with _lock:
+        metrics = dict(_metrics, in_flight=len(_in_flight))
+    metrics["mean_wait_seconds"] = metrics["total_wait_seconds"] / max(
+        metrics["executed"], 1
+    )
+    return metrics
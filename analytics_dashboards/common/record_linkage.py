@@ -0,0 +1,245 @@
+# record linkage between two tables without comparing all pairs:
+# candidate pairs come from blocking keys (rows sharing the values of a key), the
+# candidates are scored with the cosine similarity of character trigram vectors held
+# in sparse matrices, so a batch of pairs is scored with a few sparse products
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# legal forms and filler words dropped from company names before they are compared
+NAME_STOPWORDS = [
+    "the",
+    "inc",
+    "incorporated",
+    "corp",
+    "corporation",
+    "co",
+    "company",
+    "companies",
+    "ltd",
+    "limited",
+    "llc",
+    "lp",
+    "plc",
+    "sa",
+    "ag",
+    "nv",
+    "holding",
+    "holdings",
+    "group",
+]
+
+STOPWORD_PATTERN = r"\b(?:" + "|".join(NAME_STOPWORDS) + r")\b"
+
+# candidate pairs scored per batch, bounds the memory of the gathered sparse rows
+PAIR_BATCH = 500_000
+
+
+def normalise_text(texts):
+    """
+    lower case texts without punctuation or repeated spaces
+
+    Parameters
+    ----------
+    texts : pd.Series
+        free texts, e.g. event summaries
+
+    Returns
+    -------
+    pd.Series
+        normalised texts, missing texts become empty strings
+    """
+    texts = texts.fillna("").astype(str).str.lower()
+    texts = texts.str.replace("&", " and ", regex=False)
+    texts = texts.str.replace(r"[^a-z0-9]+", " ", regex=True)
+    return texts.str.strip()
+
+
+def normalise_names(names):
+    """
+    lower case names without punctuation, legal forms or repeated spaces
+
+    Parameters
+    ----------
+    names : pd.Series
+        company or victim names
+
+    Returns
+    -------
+    pd.Series
+        normalised names, missing names become empty strings
+    """
+    names = normalise_text(names).str.replace(STOPWORD_PATTERN, " ", regex=True)
+    return names.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def trigram_matrices(*texts):
+    """
+    l2 normalised character trigram count vectors of texts sharing one vocabulary
+
+    Parameters
+    ----------
+    *texts : pd.Series
+        normalised texts, e.g. from normalise_names
+
+    Returns
+    -------
+    list
+        one scipy.sparse.csr_matrix per series with a row per text
+    """
+    from scipy import sparse
+
+    grams = [
+        pd.Series(
+            [
+                [f"  {text} "[i : i + 3] for i in range(len(text) + 1)] if text else []
+                for text in series
+            ],
+            dtype=object,
+        ).explode()
+        for series in texts
+    ]
+    codes, vocabulary = pd.factorize(pd.concat(grams, ignore_index=True))
+    matrices, start = [], 0
+    for series, gram in zip(texts, grams):
+        rows = gram.index.to_numpy()
+        cols = codes[start : start + len(gram)]
+        start += len(gram)
+        valid = cols >= 0
+        matrix = sparse.csr_matrix(
+            (np.ones(valid.sum()), (rows[valid], cols[valid])),
+            shape=(len(series), len(vocabulary)),
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        matrices.append(
+            sparse.diags(
+                np.divide(1.0, norms, where=norms > 0, out=np.zeros_like(norms))
+            )
+            @ matrix
+        )
+    return matrices
+
+
+def pair_similarity(left, right, left_rows, right_rows, batch=PAIR_BATCH):
+    """
+    cosine similarity of the rows of two l2 normalised sparse matrices for a list of
+    pairs, scored in batches of gathered rows
+
+    Parameters
+    ----------
+    left, right : scipy.sparse.csr_matrix
+        trigram matrices, see trigram_matrices
+    left_rows, right_rows : np.ndarray
+        row numbers of the pairs in left and right
+    batch : int, optional
+        pairs scored at once, by default PAIR_BATCH
+
+    Returns
+    -------
+    np.ndarray
+        similarity of each pair between 0 and 1
+    """
+    scores = [np.empty(0)]
+    for start in range(0, len(left_rows), batch):
+        stop = start + batch
+        product = left[left_rows[start:stop]].multiply(right[right_rows[start:stop]])
+        scores.append(np.asarray(product.sum(axis=1)).ravel())
+    return np.concatenate(scores)
+
+
+def text_similarity(left_texts, right_texts, left_rows, right_rows):
+    """
+    trigram cosine similarity of pairs of texts, the trigram vectors are only built for
+    the texts taking part in a pair
+
+    Parameters
+    ----------
+    left_texts, right_texts : pd.Series
+        normalised texts
+    left_rows, right_rows : np.ndarray
+        positions of the pairs in left_texts and right_texts
+
+    Returns
+    -------
+    np.ndarray
+        similarity of each pair between 0 and 1
+    """
+    left_used, left_index = np.unique(left_rows, return_inverse=True)
+    right_used, right_index = np.unique(right_rows, return_inverse=True)
+    left, right = trigram_matrices(
+        left_texts.iloc[left_used].reset_index(drop=True),
+        right_texts.iloc[right_used].reset_index(drop=True),
+    )
+    return pair_similarity(left, right, left_index, right_index)
+
+
+def candidate_pairs(left, right, blocking_keys):
+    """
+    pairs of rows sharing the values of at least one blocking key, rows with a missing
+    key value are not blocked on that key
+
+    Parameters
+    ----------
+    left, right : pd.DataFrame
+        tables to link, with the blocking columns
+    blocking_keys : list
+        lists of columns, each list is one blocking key
+
+    Returns
+    -------
+    pd.DataFrame
+        left_row and right_row positions of the candidate pairs and the number of
+        blocking keys each pair shares
+    """
+    frames = []
+    for key in blocking_keys:
+        left_key = left[key].reset_index(drop=True).dropna()
+        right_key = right[key].reset_index(drop=True).dropna()
+        frames.append(
+            left_key.rename_axis("left_row")
+            .reset_index()
+            .merge(right_key.rename_axis("right_row").reset_index(), on=key)[
+                ["left_row", "right_row"]
+            ]
+        )
+    if not frames:
+        return pd.DataFrame(columns=["left_row", "right_row", "blocks"])
+    pairs = pd.concat(frames, ignore_index=True)
+    return (
+        pairs.groupby(["left_row", "right_row"]).size().rename("blocks").reset_index()
+    )
+
+
+def one_to_one(pairs, left_column, right_column, score_column="score"):
+    """
+    keep the best scoring pair of every left and every right record, greedily from
+    the highest score
+
+    Returns
+    -------
+    pd.DataFrame
+        pairs in which each left and right record appears at most once
+    """
+    pairs = pairs.sort_values(score_column, ascending=False, kind="stable")
+    kept = []
+    left_seen, right_seen = set(), set()
+    for left_id, right_id in zip(pairs[left_column], pairs[right_column]):
+        keep = left_id not in left_seen and right_id not in right_seen
+        kept.append(keep)
+        if keep:
+            left_seen.add(left_id)
+            right_seen.add(right_id)
+    return pairs.loc[np.array(kept, dtype=bool)].reset_index(drop=True)
+
+
+def fingerprint(*frames):
+    """
+    returns a hash identifying the content of dataframes, used to cache linkage results
+    """
+    digest = hashlib.sha1()
+    for df in frames:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        digest.update(",".join(map(str, df.columns)).encode())
+    return digest.hexdigest()
@@ -0,0 +1,380 @@
+# persistent cache of query results under the local datastore:
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+from analytics_dashboards.common.get_data import (datastore_path, load_config,
+                                                  model_version, read_query,
+                                                  write_parquet)
+from analytics_dashboards.common.queries import QUERIES, bind
+from analytics_dashboards.common.query_coordinator import single_flight
+
+# model version read by this process and when it was read
+_version = {"value": None, "read_at": 0.0}
+
+
+def current_model_version():
+    """
+    returns the model version, read from the database at most once every
+    model_version_max_age_seconds per process so cache hits do not query the database
+
+    Returns
+    -------
+    str
+        current model version
+    """
+    max_age = load_config().get("model_version_max_age_seconds", 60)
+    now = time.time()
+    if _version["value"] is None or now - _version["read_at"] > max_age:
+        value = single_flight("model_version", model_version)
+        _version.update(value=value, read_at=now)
+    return _version["value"]
+
+
+def normalise_sql(query):
+    """
+    strip comments and collapse whitespace so formatting changes keep the same key
+
+    Parameters
+    ----------
+    query : str
+        sql query
+
+    Returns
+    -------
+    str
+        normalised sql query
+    """
+    query = re.sub(r"--[^\n]*", "", query)
+    return " ".join(query.split()).rstrip(";")
+
+
+def cache_key(query, db_name, version, params=None):
+    """
+    hash of the normalised query, its parameters, the database and the model version
+
+    Parameters
+    ----------
+    query : str
+        sql query
+    db_name : str
+        database the query runs on
+    version : str
+        current model version
+    params : dict, optional
+        bind parameters of the query, by default None
+
+    Returns
+    -------
+    str
+        hex digest identifying the query result
+    """
+    payload = json.dumps(
+        [normalise_sql(query), params or {}, db_name, version],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_dir():
+    """
+    returns the directory holding the cached query results
+    """
+    return os.path.dirname(datastore_path("query_cache", "_"))
+
+
+def entry_paths(key):
+    """
+    returns the data and metadata file paths of a cache entry
+    """
+    return (
+        os.path.join(cache_dir(), f"{key}.parquet"),
+        os.path.join(cache_dir(), f"{key}.json"),
+    )
+
+
+def read_entry(key):
+    """
+    read a cached result, marking it as recently used
+
+    Parameters
+    ----------
+    key : str
+        cache key
+
+    Returns
+    -------
+    pd.DataFrame or None
+        cached result, None if it is missing or older than the configured max age
+    """
+    data_path, meta_path = entry_paths(key)
+    if not os.path.exists(data_path) or not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    max_age = load_config().get("query_cache_max_age_hours", 24) * 3600
+    if time.time() - meta["created"] > max_age:
+        return None
+    df = pd.read_parquet(data_path)
+    os.utime(data_path)
+    return df
+
+
+def write_entry(key, df, meta):
+    """
+    store a result as a compressed parquet file with a json metadata sidecar
+
+    Parameters
+    ----------
+    key : str
+        cache key
+    df : pd.DataFrame
+        query result
+    meta : dict
+        description of the query stored alongside the result
+    """
+    data_path, meta_path = entry_paths(key)
+    with open(meta_path, "w") as f:
+        json.dump(dict(meta, created=time.time(), rows=len(df)), f, default=str)
+    write_parquet(df, data_path, compression="zstd")
+    evict_to_size()
+
+
+def list_entries():
+    """
+    describe the cached query results
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per entry with its size, last use and query metadata
+    """
+    rows = []
+    for file_name in os.listdir(cache_dir()):
+        if not file_name.endswith(".parquet"):
+            continue
+        key = file_name[: -len(".parquet")]
+        data_path, meta_path = entry_paths(key)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        rows.append(
+            dict(
+                meta,
+                key=key,
+                size_mb=os.path.getsize(data_path) / 1e6,
+                last_used=os.path.getmtime(data_path),
+            )
+        )
+    columns = ["key", "db_name", "model_version", "rows", "size_mb", "last_used"]
+    df = pd.DataFrame(rows, columns=columns + ["created", "query"])
+    for col in ["created", "last_used"]:
+        df[col] = pd.to_datetime(df[col], unit="s")
+    return df.sort_values("last_used", ascending=False).reset_index(drop=True)
+
+
+def purge(keys=None, older_than_hours=None):
+    """
+    delete cached query results
+
+    Parameters
+    ----------
+    keys : list, optional
+        entries to delete, by default all entries
+    older_than_hours : float, optional
+        only delete entries not used for this many hours, by default None
+
+    Returns
+    -------
+    int
+        number of entries deleted
+    """
+    entries = list_entries()
+    if keys is not None:
+        entries = entries.loc[entries["key"].isin(keys)]
+    if older_than_hours is not None:
+        cutoff = pd.Timestamp.now() - pd.Timedelta(hours=older_than_hours)
+        entries = entries.loc[entries["last_used"] < cutoff]
+    for key in entries["key"]:
+        for path in entry_paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+    return len(entries)
+
+
+def evict_to_size(max_mb=None):
+    """
+    delete the least recently used entries until the cache fits its size limit
+
+    Parameters
+    ----------
+    max_mb : float, optional
+        size limit in MB, by default the configured query_cache_max_mb
+    """
+    if max_mb is None:
+        max_mb = load_config().get("query_cache_max_mb", 2048)
+    entries = list_entries()
+    evict = entries.loc[entries["size_mb"].cumsum() > max_mb, "key"]
+    if len(evict):
+        purge(keys=list(evict))
+
+
+def cached_query(query, db_name="postgres", params=None, bulk=False):
+    """
+    read a query through the persistent result cache, concurrent sessions asking
+    for the same result share a single execution
+
+    Parameters
+    ----------
+    query : str or sqlalchemy.sql.elements.TextClause
+        sql query without a trailing semicolon
+    db_name : str, optional
+        database to query, by default "postgres"
+    params : dict, optional
+        values of the :name bind parameters of the query, by default None
+    bulk : bool, optional
+        pull the result with COPY, see get_data.read_query, by default False
+
+    Returns
+    -------
+    pd.DataFrame
+        query result
+    """
+    version = current_model_version()
+    sql = getattr(query, "text", query)
+    key = cache_key(sql, db_name, version, params)
+
+    def load():
+        df = read_entry(key)
+        if df is None:
+            df = read_query(query, db_name=db_name, params=params, bulk=bulk)
+            write_entry(
+                key,
+                df,
+                {
+                    "db_name": db_name,
+                    "model_version": version,
+                    "query": normalise_sql(sql),
+                    "params": params,
+                },
+            )
+        return df
+
+    return single_flight(key, load)
+
+
+def year_runs(years):
+    """
+    split years into runs of consecutive years
+
+    Parameters
+    ----------
+    years : list
+        sorted years
+
+    Returns
+    -------
+    list
+        (first, last) year of each run
+    """
+    runs = []
+    for year in years:
+        if runs and year == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], year)
+        else:
+            runs.append((year, year))
+    return runs
+
+
+def cached_year_partitions(name, years, partition_column="year_start", **params):
+    """
+    read a registered query with a year_range filter as one cached partition per year,
+    only the years missing from the cache are queried, one query per run of
+    consecutive missing years
+
+    Parameters
+    ----------
+    name : str
+        registered query name, the query must take a year_range parameter
+    years : iterable
+        years to read
+    partition_column : str, optional
+        result column holding the year, by default "year_start"
+    **params
+        parameters overriding the query defaults, except year_range
+
+    Returns
+    -------
+    pd.DataFrame
+        the partitions of the requested years, rows without a year are not in any partition
+    """
+    version = current_model_version()
+    db_name = QUERIES[name].get("db_name", "postgres")
+    bulk = QUERIES[name].get("bulk", False)
+
+    def partition_key(first, last):
+        query, bind_params = bind(name, year_range=(first, last), **params)
+        return cache_key(query.text, db_name, version, bind_params)
+
+    years = sorted(set(years))
+    if not years:
+        query, bind_params = bind(name, year_range=(1, 0), **params)
+        return read_query(query, db_name=db_name, params=bind_params)
+    partitions = {year: read_entry(partition_key(year, year)) for year in years}
+    missing = [year for year, df in partitions.items() if df is None]
+    for first, last in year_runs(missing):
+
+        def load():
+            query, bind_params = bind(name, year_range=(first, last), **params)
+            df = read_query(query, db_name=db_name, params=bind_params, bulk=bulk)
+            for year in range(first, last + 1):
+                query, bind_params = bind(name, year_range=(year, year), **params)
+                write_entry(
+                    partition_key(year, year),
+                    df.loc[df[partition_column] == year].reset_index(drop=True),
+                    {
+                        "db_name": db_name,
+                        "model_version": version,
+                        "query": normalise_sql(query.text),
+                        "params": bind_params,
+                    },
+                )
+            return df
+
+        df = single_flight(partition_key(first, last), load)
+        # read back from the cache so fetched and cached partitions have the same dtypes
+        for year in range(first, last + 1):
+            partitions[year] = read_entry(partition_key(year, year))
+            if partitions[year] is None:
+                partitions[year] = df.loc[df[partition_column] == year]
+    return pd.concat([partitions[year] for year in years], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="inspect and purge the query cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="list the cached query results")
+    purge_parser = subparsers.add_parser("purge", help="delete cached query results")
+    purge_parser.add_argument("keys", nargs="*", help="entries to delete, default all")
+    purge_parser.add_argument("--older-than-hours", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        entries = list_entries()
+        print(entries.drop(columns="query").to_string(index=False))
+        print(f"\n{len(entries)} entries, {entries['size_mb'].sum():,.1f} MB")
+    else:
+        deleted = purge(keys=args.keys or None, older_than_hours=args.older_than_hours)
+        print(f"deleted {deleted} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# datasets shared read-only between panel worker processes, with a per-process memory budget:
+# datasets are stored per data version, the model version and the content of the synced
+# fortune 1000 store, so a model run or a sync that changed the store reloads them
+
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from analytics_dashboards.common.f1k_sync import load_state
+from analytics_dashboards.common.get_data import datastore_path, load_config
+from analytics_dashboards.common.query_coordinator import single_flight
+from analytics_dashboards.common.result_cache import current_model_version
+
+# datasets held by this process:
+# name -> {"value", "version", "loaded_at", "nbytes", "last_access"}
+_datasets = {}
+_lock = threading.RLock()
+
+# entries not used for this long are considered cold and are evicted first
+COLD_AFTER_SECONDS = 300
+
+
+def data_version():
+    """
+    returns the version of the data behind the datasets, a hash of the model version
+    and of the fingerprint of the last fortune 1000 sync
+    """
+    payload = json.dumps(
+        [str(current_model_version()), load_state().get("fingerprint")]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def max_age_seconds():
+    """
+    returns the configured age after which a dataset is reloaded
+    """
+    return load_config().get("shared_dataset_max_age_hours", 24) * 3600
+
+
+def shared_path(name, version):
+    """
+    returns the location of the shared arrow file for a dataset
+
+    Parameters
+    ----------
+    name : str
+        dataset identifier
+    version : str
+        data version, see data_version
+
+    Returns
+    -------
+    str
+        path to the arrow ipc file
+    """
+    return datastore_path("shared", f"{name}.{version}.arrow")
+
+
+def write_shared(df, name, version):
+    """
+    write a dataframe to an arrow ipc file that other workers can memory-map, the files
+    of the other versions of the dataset are removed
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        dataset to share
+    name : str
+        dataset identifier
+    version : str
+        data version, see data_version
+
+    Returns
+    -------
+    bool
+        True if the dataset was written, False if it cannot be represented in arrow
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except (ValueError, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return False
+    path = shared_path(name, version)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    for stale_path in glob.glob(shared_path(name, "*")):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return True
+
+
+def read_shared(name, version):
+    """
+    memory-map a shared dataset, numeric columns are zero-copy read-only views of the file
+
+    Parameters
+    ----------
+    name : str
+        dataset identifier
+    version : str
+        data version, see data_version
+
+    Returns
+    -------
+    pd.DataFrame or None
+        the shared dataset, None if it does not exist or is older than the configured max age
+    """
+    import pyarrow as pa
+
+    path = shared_path(name, version)
+    if (
+        not os.path.exists(path)
+        or time.time() - os.path.getmtime(path) > max_age_seconds()
+    ):
+        return None
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def value_nbytes(value):
+    """
+    estimate the memory held by a cached value
+
+    Parameters
+    ----------
+    value : object
+        cached dataframe, series or container of them
+
+    Returns
+    -------
+    int
+        estimated size in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sum(value_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(item) for item in value)
+    return 0
+
+
+def memory_budget_bytes():
+    """
+    returns the per-process memory budget for cached datasets
+    """
+    return load_config().get("memory_budget_mb", 2048) * 1024 * 1024
+
+
+def evict_to_budget(budget=None):
+    """
+    evict cached datasets until the process is within its memory budget,
+    the largest cold entries go first, then the least recently used
+
+    Parameters
+    ----------
+    budget : int, optional
+        budget in bytes, by default the configured memory budget
+
+    Returns
+    -------
+    list
+        names of the evicted datasets
+    """
+    if budget is None:
+        budget = memory_budget_bytes()
+    evicted = []
+    with _lock:
+        total = sum(entry["nbytes"] for entry in _datasets.values())
+        now = time.time()
+
+        def eviction_order(item):
+            entry = item[1]
+            if now - entry["last_access"] >= COLD_AFTER_SECONDS:
+                return (0, -entry["nbytes"])
+            return (1, entry["last_access"])
+
+        candidates = sorted(_datasets.items(), key=eviction_order)
+        for name, entry in candidates:
+            if total <= budget:
+                break
+            total -= entry["nbytes"]
+            del _datasets[name]
+            evicted.append(name)
+    return evicted
+
+
+def get_dataset(name, data_func):
+    """
+    get a dataset from this process, the shared store or by loading it, in that order,
+    datasets of another data version or older than the configured max age are reloaded
+
+    Parameters
+    ----------
+    name : str
+        dataset identifier
+    data_func : callable
+        function without arguments that loads the dataset
+
+    Returns
+    -------
+    object
+        the dataset, dataframes loaded from the shared store are read-only
+    """
+    version = data_version()
+    with _lock:
+        entry = _datasets.get(name)
+        if (
+            entry is not None
+            and entry["version"] == version
+            and time.time() - entry["loaded_at"] <= max_age_seconds()
+        ):
+            entry["last_access"] = time.time()
+            return entry["value"]
+
+    def load():
+        value = read_shared(name, version)
+        if value is None:
+            value = data_func()
+            if isinstance(value, pd.DataFrame) and write_shared(value, name, version):
+                value = read_shared(name, version)
+        return value
+
+    # datasets are read-only and shared by every session of the process anyway
+    value = single_flight(f"dataset:{name}:{version}", load, copy=False)
+    now = time.time()
+    with _lock:
+        _datasets[name] = {
+            "value": value,
+            "version": version,
+            "loaded_at": now,
+            "nbytes": value_nbytes(value),
+            "last_access": now,
+        }
+    evict_to_budget()
+    return value
+
+
+def clear_datasets(shared=False):
+    """
+    drop the datasets held by this process
+
+    Parameters
+    ----------
+    shared : bool, optional
+        also delete the shared arrow files, by default False
+    """
+    with _lock:
+        _datasets.clear()
+    if shared:
+        shared_dir = os.path.dirname(shared_path("_", "_"))
+        for file_name in os.listdir(shared_dir):
+            if file_name.endswith(".arrow"):
+                os.remove(os.path.join(shared_dir, file_name))
@@ -0,0 +1,362 @@
+# mergeable KLL quantile sketches:
+# a sketch keeps a few hundred items per compaction level, an item on level h stands for
+# 2^h observations, so memory is bounded whatever the number of observations while the
+# rank error stays around 1 / k; sketches built on chunks or partitions merge exactly
+# like one sketch built on all of them
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  model_version, write_parquet)
+
+# capacity of the top level, the rank error is roughly 1.7 / K_DEFAULT
+K_DEFAULT = 400
+
+# ratio between the capacities of consecutive levels
+CAPACITY_DECAY = 2 / 3
+
+# weight of a level 0 item of weighted sketches, observation weights are rounded to it
+WEIGHT_UNIT = 1 / 64
+
+
+def new_sketch(k=K_DEFAULT, unit=1.0):
+    """
+    returns an empty sketch
+
+    Parameters
+    ----------
+    k : int, optional
+        capacity of the top level, by default K_DEFAULT
+    unit : float, optional
+        weight of a level 0 item, by default 1.0; WEIGHT_UNIT for weighted observations
+
+    Returns
+    -------
+    dict
+        k, unit, the items of each level, the total weight in units and the exact
+        min and max
+    """
+    return {"k": k, "unit": unit, "levels": [], "n": 0, "min": np.inf, "max": -np.inf}
+
+
+def level_capacity(k, height, level):
+    """
+    returns the number of items a level can hold before it is compacted
+    """
+    return max(2, int(np.ceil(k * CAPACITY_DECAY ** (height - level - 1))))
+
+
+def compress(sketch):
+    """
+    compact the levels over capacity: the level is sorted and every other item,
+    starting at a random offset, is promoted to the next level with double weight
+    """
+    levels = sketch["levels"]
+    level = 0
+    while level < len(levels):
+        if len(levels[level]) > level_capacity(sketch["k"], len(levels), level):
+            if level + 1 == len(levels):
+                levels.append(np.empty(0))
+            items = np.sort(levels[level])
+            # an odd item stays on its level so the total weight is unchanged
+            kept, items = items[: len(items) % 2], items[len(items) % 2 :]
+            # offsets drawn from the sketch state, rebuilding a sketch gives the same items
+            offset = np.random.default_rng([sketch["n"], level]).integers(2)
+            levels[level + 1] = np.concatenate([levels[level + 1], items[offset::2]])
+            levels[level] = kept
+            # compacting can push a lower level over its reduced capacity
+            level = 0
+        else:
+            level += 1
+    return sketch
+
+
+def update(sketch, values, weights=None):
+    """
+    add a batch of observations to a sketch
+
+    a weighted observation is rounded to a whole number of units and inserted on the
+    levels of the binary digits of that number, so it is never duplicated
+
+    Parameters
+    ----------
+    sketch : dict
+        sketch to update in place
+    values : array-like
+        observations, missing values are dropped
+    weights : array-like, optional
+        weight of each observation, by default every observation weighs one
+
+    Returns
+    -------
+    dict
+        the updated sketch
+    """
+    values = np.asarray(values, dtype=float)
+    if weights is None:
+        units = np.full(len(values), int(round(1 / sketch["unit"])), dtype=np.int64)
+    else:
+        units = np.rint(np.asarray(weights, dtype=float) / sketch["unit"])
+        units = np.nan_to_num(units).astype(np.int64)
+    keep = ~np.isnan(values) & (units > 0)
+    values, units = values[keep], units[keep]
+    if len(values) == 0:
+        return sketch
+    for level in range(int(units.max()).bit_length()):
+        if level == len(sketch["levels"]):
+            sketch["levels"].append(np.empty(0))
+        on_level = (units >> level) & 1 == 1
+        sketch["levels"][level] = np.concatenate(
+            [sketch["levels"][level], values[on_level]]
+        )
+    sketch["n"] += int(units.sum())
+    sketch["min"] = min(sketch["min"], values.min())
+    sketch["max"] = max(sketch["max"], values.max())
+    return compress(sketch)
+
+
+def merge(*sketches):
+    """
+    merge sketches into a new sketch, as if it was built from all their observations
+
+    Parameters
+    ----------
+    *sketches : dict
+        sketches with the same k and unit
+
+    Returns
+    -------
+    dict
+        merged sketch
+    """
+    merged = new_sketch(k=sketches[0]["k"], unit=sketches[0]["unit"])
+    height = max(len(sketch["levels"]) for sketch in sketches)
+    merged["levels"] = [
+        np.concatenate(
+            [np.empty(0)]
+            + [
+                sketch["levels"][level]
+                for sketch in sketches
+                if level < len(sketch["levels"])
+            ]
+        )
+        for level in range(height)
+    ]
+    merged["n"] = sum(sketch["n"] for sketch in sketches)
+    merged["min"] = min(sketch["min"] for sketch in sketches)
+    merged["max"] = max(sketch["max"] for sketch in sketches)
+    return compress(merged)
+
+
+def weighted_items(sketch):
+    """
+    the items of a sketch and the number of observations each stands for
+
+    the exact minimum and maximum are included with a weight of 0
+
+    Returns
+    -------
+    tuple
+        (sorted values, weights)
+    """
+    if sketch["n"] == 0:
+        return np.empty(0), np.empty(0)
+    values = np.concatenate(sketch["levels"] + [[sketch["min"], sketch["max"]]])
+    weights = np.concatenate(
+        [
+            np.full(len(items), sketch["unit"] * 2.0**level)
+            for level, items in enumerate(sketch["levels"])
+        ]
+        + [np.zeros(2)]
+    )
+    order = np.argsort(values, kind="stable")
+    return values[order], weights[order]
+
+
+def quantiles(sketch, q):
+    """
+    approximate quantiles of the observations
+
+    Parameters
+    ----------
+    sketch : dict
+        sketch
+    q : array-like
+        quantile levels between 0 and 1, 0 and 1 return the exact min and max
+
+    Returns
+    -------
+    np.ndarray
+        quantile values
+    """
+    values, weights = weighted_items(sketch)
+    q = np.asarray(q, dtype=float)
+    if sketch["n"] == 0:
+        return np.full(q.shape, np.nan)
+    ranks = np.cumsum(weights) / weights.sum()
+    result = values[np.minimum(np.searchsorted(ranks, q, side="left"), len(values) - 1)]
+    result = np.where(q <= 0, sketch["min"], result)
+    return np.where(q >= 1, sketch["max"], result)
+
+
+def box_stats(sketch, whis=1.5, max_fliers=200):
+    """
+    five-number summary and outliers of a sketch in the layout of matplotlib's bxp
+
+    Parameters
+    ----------
+    sketch : dict
+        sketch
+    whis : float, optional
+        whisker reach in interquartile ranges, by default 1.5
+    max_fliers : int, optional
+        largest number of outlier points kept, evenly spread over the outliers, by default 200
+
+    Returns
+    -------
+    dict
+        med, q1, q3, whislo, whishi, mean and fliers
+    """
+    values, weights = weighted_items(sketch)
+    q1, med, q3 = quantiles(sketch, [0.25, 0.5, 0.75])
+    low, high = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+    inside = values[(values >= low) & (values <= high)]
+    fliers = values[(values < low) | (values > high)]
+    if len(fliers) > max_fliers:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, max_fliers).astype(int)]
+    return {
+        "med": med,
+        "q1": q1,
+        "q3": q3,
+        "whislo": inside.min() if len(inside) else q1,
+        "whishi": inside.max() if len(inside) else q3,
+        "mean": np.average(values, weights=weights) if weights.sum() else np.nan,
+        "fliers": fliers,
+    }
+
+
+def build_sketches(
+    chunks, value_column, group_columns, k=K_DEFAULT, weight_column=None
+):
+    """
+    build one sketch per group in a single pass over chunks of rows
+
+    Parameters
+    ----------
+    chunks : iterable
+        dataframes with the value and group columns, e.g. from read_query_chunks
+    value_column : str
+        column holding the observations
+    group_columns : list
+        columns identifying the groups, e.g. ["source"]
+    k : int, optional
+        capacity of the top level, by default K_DEFAULT
+    weight_column : str, optional
+        column holding observation weights, by default None for unweighted sketches
+
+    Returns
+    -------
+    dict
+        group key tuple -> sketch
+    """
+    unit = 1.0 if weight_column is None else WEIGHT_UNIT
+    sketches = {}
+    for chunk in chunks:
+        for key, group in chunk.groupby(group_columns):
+            key = key if isinstance(key, tuple) else (key,)
+            update(
+                sketches.setdefault(key, new_sketch(k, unit)),
+                group[value_column],
+                None if weight_column is None else group[weight_column],
+            )
+    return sketches
+
+
+def sketches_to_frame(sketches, group_columns):
+    """
+    serialise sketches to a dataframe that can be stored as parquet or in the dataset store
+
+    Parameters
+    ----------
+    sketches : dict
+        group key tuple -> sketch, as returned by build_sketches
+    group_columns : list
+        names of the group key columns
+
+    Returns
+    -------
+    pd.DataFrame
+        group columns, value and weight of each item, with the exact min and max as
+        zero weight items; weights can be used directly by weighted plots
+    """
+    frames = []
+    for key, sketch in sketches.items():
+        values, weights = weighted_items(sketch)
+        frame = pd.DataFrame(
+            {
+                "value": values,
+                "weight": weights,
+                "k": sketch["k"],
+                "unit": sketch["unit"],
+            }
+        )
+        frames.append(frame.assign(**dict(zip(group_columns, key))))
+    columns = list(group_columns) + ["value", "weight", "k", "unit"]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def sketches_from_frame(df, group_columns):
+    """
+    rebuild the sketches serialised by sketches_to_frame
+
+    Returns
+    -------
+    dict
+        group key tuple -> sketch
+    """
+    sketches = {}
+    for key, group in df.groupby(group_columns, sort=False):
+        key = key if isinstance(key, tuple) else (key,)
+        sketch = new_sketch(k=int(group["k"].iloc[0]), unit=group["unit"].iloc[0])
+        items = group.loc[group["weight"] > 0]
+        level = np.log2(items["weight"] / sketch["unit"]).round().astype(int)
+        sketch["levels"] = [
+            items["value"].to_numpy()[level.to_numpy() == h]
+            for h in range(level.max() + 1 if len(level) else 0)
+        ]
+        sketch["n"] = int(round(items["weight"].sum() / sketch["unit"]))
+        sketch["min"] = group["value"].min()
+        sketch["max"] = group["value"].max()
+        sketches[key] = sketch
+    return sketches
+
+
+def stored_sketches(name, build_func, group_columns):
+    """
+    sketches of the model output stored per model version, built on first use
+
+    Parameters
+    ----------
+    name : str
+        name of the stored sketches
+    build_func : callable
+        function without arguments returning the sketches, see build_sketches
+    group_columns : list
+        names of the group key columns
+
+    Returns
+    -------
+    pd.DataFrame
+        serialised sketches, see sketches_to_frame
+    """
+    path = datastore_path("sketches", f"{name}_{model_version()}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    df = sketches_to_frame(build_func(), group_columns)
+    write_parquet(df, path)
+    return df
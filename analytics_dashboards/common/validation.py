@@ -0,0 +1,272 @@
+# data quality rules checked on every load of the events and model datasets:
+# all rules of a dataset are evaluated in one vectorized pass into a violation matrix,
+# rows failing a quarantine rule are set aside in the datastore before any downstream
+# stage sees them, and the violation counts of the canonical load of each dataset are
+# kept for the dashboard diagnostics
+
+import fnmatch
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import datastore_path, write_parquet
+
+# vcdb duration units convert_duration_to_days turns into a number of days
+DURATION_UNITS = ["Minutes", "Hours", "Days", "Weeks", "Months", "Years"]
+
+# dataset -> rule name -> check, columns and whether failing rows are quarantined,
+# column names may be glob patterns; datasets named after a registered query are
+# validated by run_query; rules the sql cohort filters already apply are reported only,
+# so row based and sql counts of the same cohort agree
+RULES = {
+    "f1k_events": {
+        "negative cost": {
+            "check": "negative",
+            "columns": ["*_millions_usd"],
+            "quarantine": True,
+        },
+        "end before start": {
+            "check": "before",
+            "columns": ["event_end_date", "event_start_date"],
+            "quarantine": True,
+        },
+        "missing start date": {
+            "check": "null",
+            "columns": ["event_start_date"],
+            "quarantine": True,
+        },
+        "missing sic": {
+            "check": "null",
+            "columns": ["company_sic"],
+            "quarantine": False,
+        },
+    },
+    "vcdb_availability": {
+        "no duration unit": {
+            "check": "not_in",
+            "columns": ["attribute_availability_duration_unit"],
+            "values": DURATION_UNITS,
+            "quarantine": True,
+        },
+        "negative duration": {
+            "check": "negative",
+            "columns": ["attribute_availability_duration_value"],
+            "quarantine": True,
+        },
+    },
+    "model_event_severity": {
+        "negative cost": {
+            "check": "negative",
+            "columns": ["event_impact", "gu_*"],
+            "quarantine": True,
+        },
+        "missing impact": {
+            "check": "null",
+            "columns": ["event_impact"],
+            "quarantine": True,
+        },
+        "missing sic": {"check": "null", "columns": ["sic"], "quarantine": False},
+    },
+    "model_event_duration": {
+        "negative duration": {
+            "check": "negative",
+            "columns": ["duration"],
+            "quarantine": True,
+        },
+        "missing duration": {
+            "check": "null",
+            "columns": ["duration"],
+            "quarantine": True,
+        },
+    },
+}
+
+# model_events checks computed by the database over the whole table,
+# see the model_events_quality query: result column -> rule name
+MODEL_EVENTS_CHECKS = {
+    "negative_impact": "negative cost",
+    "missing_impact": "missing impact",
+    "invalid_duration": "negative or missing duration",
+    "ratio_out_of_range": "cost ratio outside [0, 1]",
+    "negative_data_scale": "negative data scale",
+}
+
+REPORT_COLUMNS = ["dataset", "rule", "rows", "violations", "percent", "quarantine"]
+
+
+def check_negative(df, columns, rule):
+    return (df[columns] < 0).to_numpy().any(axis=1)
+
+
+def check_null(df, columns, rule):
+    return df[columns].isna().to_numpy().any(axis=1)
+
+
+def check_before(df, columns, rule):
+    later, earlier = (pd.to_datetime(df[column], errors="coerce") for column in columns)
+    return (later < earlier).to_numpy()
+
+
+def check_not_in(df, columns, rule):
+    return ~df[columns].isin(rule["values"]).to_numpy().any(axis=1)
+
+
+# check name -> function of the frame, the rule columns and the rule returning a
+# boolean violation mask
+CHECKS = {
+    "negative": check_negative,
+    "null": check_null,
+    "before": check_before,
+    "not_in": check_not_in,
+}
+
+
+def rule_columns(df, rule):
+    """
+    columns of a frame matched by the column patterns of a rule
+
+    Returns
+    -------
+    list
+        matching columns, None if a pattern matches no column
+    """
+    columns = []
+    for pattern in rule["columns"]:
+        matched = fnmatch.filter(df.columns, pattern)
+        if not matched:
+            return None
+        columns.extend(matched)
+    return columns
+
+
+def violations(df, dataset):
+    """
+    evaluate all rules of a dataset on a frame, rules whose columns are missing are skipped
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        loaded dataset
+    dataset : str
+        key of RULES
+
+    Returns
+    -------
+    pd.DataFrame
+        one boolean column per rule, True where a row violates the rule
+    """
+    masks = {}
+    for name, rule in RULES[dataset].items():
+        columns = rule_columns(df, rule)
+        if columns is not None:
+            masks[name] = CHECKS[rule["check"]](df, columns, rule)
+    return pd.DataFrame(masks, index=df.index, dtype=bool)
+
+
+def validation_path(dataset, name):
+    """
+    returns the location of the stored report or quarantined rows of a dataset
+    """
+    return datastore_path("validation", f"{dataset}_{name}.parquet")
+
+
+def validate(df, dataset, store=True):
+    """
+    check a loaded dataset and quarantine the rows failing a quarantine rule
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        loaded dataset
+    dataset : str
+        key of RULES
+    store : bool, optional
+        store the report and the quarantined rows in the datastore, by default True;
+        only the canonical load of a dataset stores them, so off for chunks of a
+        streamed query and for loads of a subset such as a year range
+
+    Returns
+    -------
+    pd.DataFrame
+        rows passing every quarantine rule, reindexed from 0 when rows were quarantined
+    """
+    matrix = violations(df, dataset)
+    quarantine = [name for name in matrix.columns if RULES[dataset][name]["quarantine"]]
+    bad = matrix[quarantine].to_numpy().any(axis=1)
+    if store:
+        counts = matrix.sum()
+        report = pd.DataFrame(
+            {
+                "dataset": dataset,
+                "rule": list(counts.index) + ["quarantined rows"],
+                "rows": len(df),
+                "violations": list(counts.to_numpy()) + [int(bad.sum())],
+                "quarantine": [name in quarantine for name in counts.index] + [True],
+            }
+        )
+        report["percent"] = (100 * report["violations"] / max(len(df), 1)).round(2)
+        write_parquet(report[REPORT_COLUMNS], validation_path(dataset, "report"))
+        quarantine_path = validation_path(dataset, "quarantine")
+        if bad.any():
+            write_parquet(df.loc[bad], quarantine_path)
+        elif os.path.exists(quarantine_path):
+            os.remove(quarantine_path)
+    if not bad.any():
+        return df
+    return df.loc[~bad].reset_index(drop=True)
+
+
+def quarantined_rows(dataset):
+    """
+    returns the rows of a dataset quarantined by its canonical load, empty if none
+    """
+    path = validation_path(dataset, "quarantine")
+    return pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+
+
+def model_events_report():
+    """
+    violation counts of the model_events checks, counted by the database in one scan
+
+    Returns
+    -------
+    pd.DataFrame
+        REPORT_COLUMNS, the rows are reported but not quarantined
+    """
+    from analytics_dashboards.common.queries import run_query
+
+    counts = run_query("model_events_quality").iloc[0]
+    rows = int(counts["rows"])
+    report = pd.DataFrame(
+        {
+            "dataset": "model_events",
+            "rule": list(MODEL_EVENTS_CHECKS.values()),
+            "rows": rows,
+            "violations": [int(counts[column]) for column in MODEL_EVENTS_CHECKS],
+            "quarantine": False,
+        }
+    )
+    report["percent"] = (100 * report["violations"] / max(rows, 1)).round(2)
+    return report[REPORT_COLUMNS]
+
+
+def validation_report():
+    """
+    violation counts of the canonical load of every dataset and of the model_events checks
+
+    Returns
+    -------
+    pd.DataFrame
+        dataset, rule, rows checked, violations, percent of the rows and whether
+        the violating rows are quarantined
+    """
+    reports = [
+        pd.read_parquet(validation_path(dataset, "report"))
+        for dataset in RULES
+        if os.path.exists(validation_path(dataset, "report"))
+    ]
+    reports.append(model_events_report())
+    report = pd.concat(reports, ignore_index=True)
+    report["violations"] = report["violations"].astype(np.int64)
+    return report
@@ -1,48 +1,628 @@
-import matplotlib as mpl
+from functools import partial
+
 import panel as pn
-import plotly.graph_objects as go
-import seaborn as sns
-from matplotlib.figure import Figure
 
-from analytics_dashboards.common.get_data import set_colours
-from analytics_dashboards.event_duration import event_duration_plot_data
+from analytics_dashboards import (data_records_impacted, event_severity,
+                                  events_annual_frequency, events_per_year,
+                                  exceedance, frequency_annual_breach,
+                                  severity_fitting, signal_detection)
+from analytics_dashboards.common.f1k_sync import (STORE_REVENUE_FLOOR,
+                                                  f1k_table, store_entities)
+from analytics_dashboards.common.get_data import (filter_f1k_table,
+                                                  model_version, set_colours)
+from analytics_dashboards.common.queries import F1K_DEFAULTS
+from analytics_dashboards.common.shared_store import get_dataset
+from analytics_dashboards.common.sketches import box_stats, sketches_from_frame
+from analytics_dashboards.common.validation import validation_report
+from analytics_dashboards.event_duration import (duration_gof_data,
+                                                 event_duration_sketches,
+                                                 events_duration_data)
 from analytics_dashboards.event_severity import (bi_costs, extortion_costs,
+                                                 join_cost_component_datasets,
                                                  liability_costs,
                                                  model_cost_plot_data,
+                                                 model_cost_split,
                                                  overall_severity_plot_data,
                                                  privacy_costs,
-                                                 regulatory_costs)
+                                                 regulatory_costs,
+                                                 severity_ci_data,
+                                                 severity_gof_data)
 from analytics_dashboards.events_annual_frequency import (
-    box_plot_data, confidentiality_events_cia_sankey_plot_data,
+    box_plot_data, box_plot_sketches,
+    confidentiality_events_cia_sankey_plot_data,
     confidentiality_events_sankey_plot_data,
     confidentiality_model_cia_sankey_plot_data,
-    confidentiality_model_sankey_plot_data, model_cia_barplot_data,
-    model_version)
+    confidentiality_model_sankey_plot_data, frequency_ci_data,
+    model_cia_barplot_data)
 from analytics_dashboards.events_per_year import events_per_year_plot_data
-from analytics_dashboards.exposure_comparison import (division_sic_data,
-                                                      geographic_data,
-                                                      join_datasets, sic_data)
+from analytics_dashboards.exposure_comparison import (event_exposure_data,
+                                                      exposure_data,
+                                                      join_datasets,
+                                                      model_exposure_data,
+                                                      revenue_gof_data,
+                                                      reweighted_mix_data)
 from analytics_dashboards.frequency_annual_breach import \
     overall_frequency_plot_data
 
 
-def cache_plot_data(df, data_name):
+def cache_plot_data(data_func, data_name):
     """
-    cache data for plotting
+    cache data for plotting, the data is only loaded if it is not already cached
+    in this process or in the dataset store shared between worker processes
 
     Parameters
     ----------
-    df : pd.DataFrame
-        data to cache
+    data_func : callable
+        function without arguments that loads the data to cache
     data_name : str
         identifier for cached data
     """
-    if data_name not in pn.state.cache.keys():
-        pn.state.cache[data_name] = df.copy()
-        return df
-    else:
-        df_copy = pn.state.cache[data_name]
-    return df_copy
+    return get_dataset(name=data_name, data_func=data_func)
+
+
+def gof_table_pane(gof_data):
+    """
+    table of the goodness of fit statistics of a dashboard section
+
+    Parameters
+    ----------
+    gof_data : pd.DataFrame
+        output of goodness_of_fit.gof_table
+
+    Returns
+    -------
+    panel.pane.DataFrame
+        panel table pane
+    """
+    return pn.pane.DataFrame(gof_data, index=False, width=1100)
+
+
+def filter_widgets(f1k_data):
+    """
+    widgets controlling the thresholds used to filter the cached plot data
+
+    Parameters
+    ----------
+    f1k_data : pd.DataFrame
+        cached fortune 1000 events table without date limits, used for the year bounds
+
+    Returns
+    -------
+    dict
+        panel widgets keyed by the parameter they control
+    """
+    first_year = int(f1k_data["year_start"].min())
+    last_year = int(f1k_data["year_start"].max())
+    return {
+        "revenue_floor": pn.widgets.IntInput(
+            name="minimum company revenue (USD millions)",
+            value=F1K_DEFAULTS["revenue_floor"],
+            start=STORE_REVENUE_FLOOR,
+            step=500,
+        ),
+        "year_range": pn.widgets.IntRangeSlider(
+            name="event start year",
+            start=first_year,
+            end=last_year,
+            value=(max(2010, first_year), min(2020, last_year)),
+        ),
+        "revenue_xlim": pn.widgets.IntInput(
+            name="revenue axis limit (USD millions)", value=100000, start=1, step=5000
+        ),
+        "duration_binwidth": pn.widgets.IntSlider(
+            name="duration bin width (days)", value=5, start=1, end=60
+        ),
+        "severity_minimum": pn.widgets.IntInput(
+            name="minimum event impact (USD)", value=1_000_000, start=0, step=100_000
+        ),
+        "cost_minimum": pn.widgets.IntInput(
+            name="minimum cost component (USD)", value=100_000, start=0, step=100_000
+        ),
+        "severity_limit": pn.widgets.IntInput(
+            name="maximum event impact (USD)",
+            value=100_000_000,
+            start=1_000_000,
+            step=1_000_000,
+        ),
+        "fit_measure": pn.widgets.Select(
+            name="fitted severity measure",
+            options=severity_fitting.MEASURES,
+            value="event_impact",
+        ),
+        "reweight_model": pn.widgets.Checkbox(
+            name="reweight the model to the events entity mix", value=False
+        ),
+    }
+
+
+def model_weighting(plot_data, reweight):
+    """
+    keep either the unweighted or the reweighted model rows of plot data, the rows of a
+    "<source> reweighted" source replace those of its source when reweighting
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        plot data with a source column
+    reweight : bool
+        show the model reweighted to the events entity mix
+
+    Returns
+    -------
+    pd.DataFrame
+        plot data with one set of model rows labelled with the unweighted source
+    """
+    reweighted = plot_data["source"].str.endswith(" reweighted")
+    if not reweight:
+        return plot_data.loc[~reweighted]
+    replaced = plot_data.loc[reweighted, "source"].str.replace(
+        " reweighted$", "", regex=True
+    )
+    plot_data = plot_data.loc[~plot_data["source"].isin(replaced.unique())]
+    return plot_data.assign(
+        source=plot_data["source"].str.replace(" reweighted$", "", regex=True)
+    )
+
+
+def weighting_view(plot_func, plot_data, reweight, **kwargs):
+    """
+    render plot data with the unweighted or the reweighted model, see model_weighting
+
+    Parameters
+    ----------
+    plot_func : callable
+        plotting function accepting plot_data
+    plot_data : pd.DataFrame
+        cached plot data with both sets of model rows
+    reweight : bool
+        show the model reweighted to the events entity mix
+    **kwargs
+        passed to plot_func
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        pane returned by plot_func
+    """
+    return plot_func(plot_data=model_weighting(plot_data, reweight), **kwargs)
+
+
+def exposure_revenue_view(revenue_floor, year_range, xlim, f1k_data, model_data):
+    """
+    re-filter the cached events and render the exposure revenue histogram
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    xlim : int
+        upper limit of the revenue axis
+    f1k_data : pd.DataFrame
+        cached fortune 1000 events table without date limits
+    model_data : pd.DataFrame
+        cached model exposure data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel histplot pane
+    """
+    df_events = event_exposure_data(
+        df_events_raw=filter_f1k_table(f1k_data, revenue_floor, year_range)
+    )
+    plot_data = join_datasets(df_model=model_data, df_events=df_events)
+    return event_exposure_revenue(plot_data=plot_data, xlim=xlim)
+
+
+def events_per_year_view(revenue_floor, year_range, model_data):
+    """
+    count the events of the synced aggregates and render the events per year bar plot
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    model_data : pd.DataFrame
+        cached model count of events by year
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    df_events = events_per_year.events_data(revenue_floor, year_range)
+    joined_data = events_per_year.join_datasets(
+        df_model=model_data, df_events=df_events
+    )
+    return events_per_year_bar_plot(
+        plot_data=events_per_year_plot_data(joined_data=joined_data)
+    )
+
+
+def exposure_view(revenue_floor, year_range, f1k_data, model_data, plot_func, section):
+    """
+    re-filter the cached events and render a section of the exposure comparison
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    f1k_data : pd.DataFrame
+        cached fortune 1000 events table without date limits
+    model_data : pd.DataFrame
+        cached model exposure data
+    plot_func : callable
+        plotting function accepting the section of the exposure data as plot_data
+    section : str
+        key of the exposure_comparison.exposure_data output
+
+    Returns
+    -------
+    panel.viewable.Viewable
+        pane returned by plot_func
+    """
+    exposure = exposure_data(
+        df_model=model_data,
+        df_events_raw=filter_f1k_table(f1k_data, revenue_floor, year_range),
+    )
+    return plot_func(plot_data=exposure[section])
+
+
+def revenue_gof_pane(plot_data):
+    """
+    table of the goodness of fit of the revenue of joined exposure data
+    """
+    return gof_table_pane(revenue_gof_data(plot_data))
+
+
+def data_records_view(
+    revenue_floor, year_range, f1k_data, model_histogram, plot_func, matched=False
+):
+    """
+    re-filter the cached events and render a data records impacted plot
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    f1k_data : pd.DataFrame
+        cached fortune 1000 events table without date limits
+    model_histogram : pd.DataFrame
+        cached output of data_records_impacted.model_records_histogram
+    plot_func : callable
+        plotting function accepting the records histogram
+    matched : bool, optional
+        also pass the quantile matched model records to plot_func, by default False
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        pane returned by plot_func
+    """
+    events_records = data_records_impacted.events_records_data(
+        filter_f1k_table(f1k_data, revenue_floor, year_range)
+    )
+    histogram = data_records_impacted.records_histogram(
+        events_records, df_model=model_histogram
+    )
+    if not matched:
+        return plot_func(histogram)
+    return plot_func(
+        histogram,
+        data_records_impacted.quantile_matched_data(histogram, events_records),
+    )
+
+
+def data_quality_view(revenue_floor, year_range, f1k_data, model_histogram):
+    """
+    re-filter the cached events and render the data records quality table
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    f1k_data : pd.DataFrame
+        cached fortune 1000 events table without date limits
+    model_histogram : pd.DataFrame
+        cached output of data_records_impacted.model_records_histogram
+
+    Returns
+    -------
+    panel.pane.DataFrame
+        panel table pane
+    """
+    quality = data_records_impacted.data_quality_table(
+        filter_f1k_table(f1k_data, revenue_floor, year_range),
+        df_model=model_histogram,
+    )
+    return pn.pane.DataFrame(quality, index=False, width=600)
+
+
+def breach_frequency_view(revenue_floor, year_range, reweight, model_data, plot_func):
+    """
+    count the events of the synced aggregates and render an annual breach frequency
+    plot, see weighting_view
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    reweight : bool
+        show the model reweighted to the events entity mix
+    model_data : pd.DataFrame
+        cached output of frequency_annual_breach.model_data
+    plot_func : callable
+        plotting function accepting the overall frequency plot data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        pane returned by plot_func
+    """
+    joined_data = frequency_annual_breach.join_datasets(
+        df_events=frequency_annual_breach.events_data(revenue_floor, year_range),
+        df_model=model_data,
+    )
+    return weighting_view(plot_func, overall_frequency_plot_data(joined_data), reweight)
+
+
+def breach_frequency_ci_view(revenue_floor, year_range, model_data):
+    """
+    bootstrap confidence intervals of the annual breach frequency of the filtered events
+    and the cached model runs
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    model_data : pd.DataFrame
+        cached output of frequency_annual_breach.model_data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel confidence interval pane
+    """
+    ci_data = frequency_annual_breach.frequency_ci_data(
+        df_events=frequency_annual_breach.events_data(revenue_floor, year_range),
+        df_model=model_data,
+    )
+    return confidence_interval_plot(ci_data, x="source", hue="confidentiality")
+
+
+def cohort_frequency_view(revenue_floor, year_range, by, model_data):
+    """
+    render the annual event frequency per entity of a cohort breakdown, see
+    frequency_annual_breach.cohort_frequency_plot_data
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    by : str
+        "sic_division" or "revenue_band"
+    model_data : pd.DataFrame
+        cached output of frequency_annual_breach.model_cohort_data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    plot_data = frequency_annual_breach.cohort_frequency_plot_data(
+        by, revenue_floor, year_range, df_model=model_data
+    )
+    return event_frequency_cohort_barplot(plot_data, by=by)
+
+
+def annual_frequency_view(revenue_floor, year_range, reweight, model_data):
+    """
+    count the events of the synced aggregates and render the annual frequency box plot,
+    see weighting_view
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    reweight : bool
+        show the model reweighted to the events entity mix
+    model_data : pd.DataFrame
+        cached output of events_annual_frequency.model_data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel boxplot pane
+    """
+    plot_data = box_plot_data(
+        df_events=events_annual_frequency.events_data(revenue_floor, year_range),
+        df_model=model_data,
+    )
+    return weighting_view(
+        events_annual_frequency_boxplot, box_plot_sketches(plot_data), reweight
+    )
+
+
+def annual_frequency_ci_view(revenue_floor, year_range, model_data):
+    """
+    bootstrap confidence intervals of the mean and median annual frequency of the
+    filtered events years and the cached model entities
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    model_data : pd.DataFrame
+        cached output of events_annual_frequency.model_data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel confidence interval pane
+    """
+    plot_data = box_plot_data(
+        df_events=events_annual_frequency.events_data(revenue_floor, year_range),
+        df_model=model_data,
+    )
+    return confidence_interval_plot(frequency_ci_data(plot_data))
+
+
+def exceedance_view(revenue_floor, year_range, f1k_data, entities, model):
+    """
+    recompute the empirical exceedance of the filtered events and render the
+    exceedance curves and return period losses against the model
+
+    Parameters
+    ----------
+    revenue_floor : int
+        minimum company revenue in millions of USD
+    year_range : tuple
+        inclusive (first, last) event start years
+    f1k_data : pd.DataFrame
+        cached fortune 1000 events table without date limits
+    entities : pd.DataFrame
+        cached fortune 1000 entities, the company count is the denominator
+    model : dict
+        cached model exceedance statistics
+
+    Returns
+    -------
+    panel.Tabs
+        aep and oep curves and the return period table
+    """
+    events = exceedance.events_exceedance(
+        df_events=filter_f1k_table(f1k_data, revenue_floor, year_range),
+        n_companies=int(
+            (entities["company_revenue_millions_usd"] >= revenue_floor).sum()
+        ),
+        year_range=year_range,
+    )
+    plot_data = exceedance.exceedance_plot_data(model=model, events=events)
+    return pn.Tabs(
+        ("aggregate exceedance (aep)", exceedance_curve_plot(plot_data, curve="aep")),
+        ("occurrence exceedance (oep)", exceedance_curve_plot(plot_data, curve="oep")),
+        (
+            "return period losses (USD millions)",
+            pn.pane.DataFrame(
+                exceedance.return_period_table(model=model, events=events),
+                index=False,
+                width=900,
+            ),
+        ),
+    )
+
+
+def severity_fit_view(measure, cohort_data, fits):
+    """
+    render the fitted severity densities and parameter tables of a measure
+
+    Parameters
+    ----------
+    measure : str
+        event impact or cost component column
+    cohort_data : pd.DataFrame
+        cached output of severity_fitting.cohort_data()
+    fits : pd.DataFrame
+        cached output of severity_fitting.fit_cohorts()
+
+    Returns
+    -------
+    panel.Tabs
+        density plot and parameter table
+    """
+    return pn.Tabs(
+        (
+            "fitted densities",
+            severity_fit_plot(
+                cohort_data.loc[cohort_data["measure"] == measure],
+                severity_fitting.density_plot_data(fits, measure),
+            ),
+        ),
+        (
+            "fit parameters",
+            pn.pane.DataFrame(
+                severity_fitting.parameter_table(fits, measure),
+                index=False,
+                width=1100,
+            ),
+        ),
+    )
+
+
+def severity_view(minimum, limit, plot_func, data_func, base_data, reweight=False):
+    """
+    re-filter cached severity data to an impact range and render it, the model rows
+    are weighted to the events entity mix when reweighting
+
+    Parameters
+    ----------
+    minimum : float
+        exclusive lower bound of the impact
+    limit : float
+        inclusive upper bound of the impact
+    plot_func : callable
+        severity plotting function
+    data_func : callable
+        severity data function accepting minimum, limit and the cached base data
+    base_data : pd.DataFrame
+        cached unfiltered severity data with a weight column
+    reweight : bool, optional
+        use the entity weights of the model rows, by default False
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel histplot pane
+    """
+    plot_data = data_func(minimum, limit, base_data)
+    if not reweight:
+        plot_data = plot_data.assign(weight=1.0)
+    return plot_func(plot_data=plot_data, limit=limit)
+
+
+def sketch_box_plot(ax, sketch_data, vert=True):
+    """
+    draw one box per source from the five-number summaries and outliers of its sketch
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        axes to draw on
+    sketch_data : pd.DataFrame
+        serialised sketches per source, see sketches.sketches_to_frame
+    vert : bool, optional
+        vertical boxes, by default True
+    """
+    import seaborn as sns
+
+    sketches = sketches_from_frame(sketch_data, ["source"])
+    stats = [dict(box_stats(sketch), label=key[0]) for key, sketch in sketches.items()]
+    boxes = ax.bxp(stats, vert=vert, patch_artist=True, showfliers=True)
+    for patch, color in zip(boxes["boxes"], sns.color_palette()):
+        patch.set_facecolor(color)
+    if not vert:
+        # first source on top, as seaborn draws horizontal boxes
+        ax.invert_yaxis()
 
 
 def event_duration_box_plot(plot_data):
@@ -52,23 +632,18 @@ def event_duration_box_plot(plot_data):
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        duration sketches per source, see event_duration.event_duration_sketches
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel boxplot pane
     """
+    from matplotlib.figure import Figure
 
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
-    sns.boxplot(
-        data=plot_data,
-        x="duration",
-        y="source",
-        orient="h",
-        ax=ax,
-    )
+    sketch_box_plot(ax, plot_data, vert=False)
     ax.set_xlabel("duration(days)")
     mpl_boxplot_pane = pn.pane.Matplotlib(fig)
     return mpl_boxplot_pane
@@ -81,19 +656,24 @@ def event_duration_ecdf_plot(plot_data):
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        duration sketches per source, see event_duration.event_duration_sketches
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel ecdf pane
     """
+    import matplotlib as mpl
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
     sns.ecdfplot(
         data=plot_data,
-        x="duration",
+        x="value",
         hue="source",
+        weights="weight",
         stat="proportion",
         ax=ax,
     )
@@ -104,184 +684,486 @@ def event_duration_ecdf_plot(plot_data):
     return mpl_ecdf_pane
 
 
-def event_duration_hist_plot(plot_data):
+def event_duration_hist_plot(plot_data, binwidth=5):
+    """
+    histogram plots comparing event duration in days between model and events data
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        duration sketches per source, see event_duration.event_duration_sketches
+    binwidth : float, optional
+        width of the histogram bins in days, by default 5
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel histplot pane
+    """
+    import matplotlib as mpl
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots(1, 1)
+    sns.histplot(
+        data=plot_data,
+        x="value",
+        hue="source",
+        weights="weight",
+        stat="probability",
+        binwidth=binwidth,
+        alpha=0.2,
+        common_norm=False,
+        ax=ax,
+    )
+    ax.axvspan(xmin=15, xmax=23, alpha=0.2, color="grey", linestyle="dashed", lw=1)
+    ax.annotate(
+        "avg duration of downtime after a ransomware attack(Coveware): 15-23 days",
+        xy=(23, 0.4),
+        xytext=(30, 0.4),
+        xycoords="data",
+        bbox=dict(boxstyle="round", fc="none", ec="gray"),
+        arrowprops=dict(arrowstyle="->"),
+        wrap=True,
+    )
+    ax.set_xlabel("duration(days)")
+    ax.xaxis.set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.0f}"))
+    mpl_histplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_histplot_pane
+
+
+def event_exposure_revenue(plot_data, xlim=100000):
+    """
+    histogram plot comparing revenue of companies in model and events data
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        data to be plotted
+    xlim : float, optional
+        upper limit of the revenue axis, by default 100000
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel histplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots(1, 1)
+    sns.histplot(
+        data=plot_data,
+        x="revenue",
+        hue="source",
+        common_norm=False,
+        stat="probability",
+        ax=ax,
+    )
+    ax.set_xlim(-1, xlim)
+    mpl_histplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_histplot_pane
+
+
+def event_exposure_sic_count(plot_data):
+    """
+    bar plot comparing count of entities by sic name in model and events data
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        data to be plotted
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 7))
+    ax = fig.subplots(1, 1)
+    sns.barplot(
+        data=plot_data,
+        x="Code Desc. Short",
+        y="entity_count_normalised",
+        hue="source",
+        ax=ax,
+    )
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=60)
+    mpl_barplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_barplot_pane
+
+
+def event_exposure_sic_division_count(plot_data):
+    """
+    bar plot comparing count of entities by sic division in model and events data
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        data to be plotted
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots(1, 1)
+    sns.barplot(
+        data=plot_data,
+        x="Division Desc.",
+        y="entity_count_normalised",
+        hue="source",
+        ax=ax,
+    )
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=60)
+    mpl_barplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_barplot_pane
+
+
+def event_exposure_geography(plot_data):
+    """
+    bar plot comparing count of entities by geography in model and events data
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        data to be plotted
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots(1, 1)
+    sns.barplot(
+        data=plot_data,
+        x="geography",
+        y="entity_count_normalised",
+        hue="source",
+        ax=ax,
+    )
+    ax.set_xlim(-0.5, 10.5)
+    mpl_barplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_barplot_pane
+
+
+def event_exposure_reweighted_mix(plot_data):
+    """
+    bar plots comparing the entity share by SIC division and revenue band of the events,
+    the model and the model reweighted to the events entity mix
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        output of exposure_comparison.reweighted_mix_data
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 5))
+    axes = fig.subplots(1, 2)
+    for ax, variable in zip(axes, ["sic_division", "revenue_band"]):
+        sns.barplot(
+            data=plot_data.loc[plot_data["variable"] == variable],
+            x="level",
+            y="share",
+            hue="source",
+            ax=ax,
+        )
+        ax.set_xlabel(variable)
+        ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+    mpl_barplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_barplot_pane
+
+
+def events_per_year_bar_plot(plot_data):
+    """
+    bar plot showing the number of events per year
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        data to be plotted
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots(1, 1)
+    sns.barplot(data=plot_data, x="no_events", y="value", hue="source", ax=ax)
+    ax.set_xlim(-1, 10)
+    mpl_barplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_barplot_pane
+
+
+def data_records_hist_plot(plot_data):
     """
-    histogram plots comparing event duration in days between model and events data
+    histogram comparing the log10 data records impacted of the model and events data
 
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        output of data_records_impacted.records_histogram
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
     sns.histplot(
-        data=plot_data,
-        x="duration",
+        data=plot_data.loc[plot_data["data_type"] == "ALL"],
+        x="log10_records",
         hue="source",
+        weights="event_count",
         stat="probability",
-        binwidth=5,
+        binwidth=data_records_impacted.LOG_BIN_WIDTH,
         alpha=0.2,
         common_norm=False,
         ax=ax,
     )
-    ax.axvspan(xmin=15, xmax=23, alpha=0.2, color="grey", linestyle="dashed", lw=1)
-    ax.annotate(
-        "avg duration of downtime after a ransomware attack(Coveware): 15-23 days",
-        xy=(23, 0.4),
-        xytext=(30, 0.4),
-        xycoords="data",
-        bbox=dict(boxstyle="round", fc="none", ec="gray"),
-        arrowprops=dict(arrowstyle="->"),
-        wrap=True,
-    )
-    ax.set_xlabel("duration(days)")
-    ax.xaxis.set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.0f}"))
+    ax.set_xlabel("log10 data records impacted")
     mpl_histplot_pane = pn.pane.Matplotlib(fig)
     return mpl_histplot_pane
 
 
-def event_exposure_revenue(plot_data):
+def data_records_ecdf_plot(plot_data):
     """
-    histogram plot comparing revenue of companies in model and events data
+    ecdf comparing the log10 data records impacted of the model and events data
 
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        output of data_records_impacted.records_histogram
 
     Returns
     -------
     panel.pane.plot.Matplotlib
-        panel histplot pane
+        panel ecdf pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
-    sns.histplot(
-        data=plot_data,
-        x="revenue",
+    sns.ecdfplot(
+        data=plot_data.loc[plot_data["data_type"] == "ALL"],
+        x="log10_records",
         hue="source",
-        common_norm=False,
-        stat="probability",
+        weights="event_count",
+        stat="proportion",
         ax=ax,
     )
-    ax.set_xlim(-1, 100000)
-    mpl_histplot_pane = pn.pane.Matplotlib(fig)
-    return mpl_histplot_pane
+    ax.set_xlabel("log10 data records impacted")
+    ax.set_ylabel("probability")
+    mpl_ecdf_pane = pn.pane.Matplotlib(fig)
+    return mpl_ecdf_pane
 
 
-def event_exposure_sic_count(plot_data):
+def data_records_by_type_plot(plot_data):
     """
-    bar plot comparing count of entities by sic name in model and events data
+    histograms of the log10 data records impacted by compromised data type
 
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        output of data_records_impacted.records_histogram
 
     Returns
     -------
     panel.pane.plot.Matplotlib
-        panel barplot pane
+        panel histplot pane
     """
-    fig = Figure(figsize=(12, 7))
-    ax = fig.subplots(1, 1)
-    sns.barplot(
-        data=plot_data,
-        x="Code Desc. Short",
-        y="entity_count_normalised",
-        hue="source",
-        ax=ax,
-    )
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=60)
-    mpl_barplot_pane = pn.pane.Matplotlib(fig)
-    return mpl_barplot_pane
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(20, 5))
+    axes = fig.subplots(1, len(data_records_impacted.DATA_TYPES), sharey=True)
+    for ax, data_type in zip(axes, data_records_impacted.DATA_TYPES):
+        sns.histplot(
+            data=plot_data.loc[plot_data["data_type"] == data_type],
+            x="log10_records",
+            hue="source",
+            weights="event_count",
+            stat="probability",
+            binwidth=data_records_impacted.LOG_BIN_WIDTH,
+            alpha=0.2,
+            common_norm=False,
+            ax=ax,
+        )
+        ax.set_xlabel(f"log10 {data_type} data records impacted")
+    mpl_histplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_histplot_pane
 
 
-def event_exposure_sic_division_count(plot_data):
+def data_records_matched_plot(plot_data, matched_data):
     """
-    bar plot comparing count of entities by sic division in model and events data
+    events records impacted next to the quantile matched model records, and the data
+    scale factor the matching implies
 
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        output of data_records_impacted.records_histogram
+    matched_data : pd.DataFrame
+        output of data_records_impacted.quantile_matched_data
 
     Returns
     -------
     panel.pane.plot.Matplotlib
-        panel barplot pane
+        panel histplot pane
     """
-    fig = Figure(figsize=(8, 5))
-    ax = fig.subplots(1, 1)
-    sns.barplot(
-        data=plot_data,
-        x="Division Desc.",
-        y="entity_count_normalised",
+    import numpy as np
+    import pandas as pd
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    matched = pd.concat(
+        [
+            plot_data.loc[
+                (plot_data["source"] == "events") & (plot_data["data_type"] == "ALL"),
+                ["log10_records", "event_count", "source"],
+            ],
+            matched_data.assign(
+                log10_records=np.log10(matched_data["matched_records"]),
+                source="model matched",
+            )[["log10_records", "event_count", "source"]],
+        ],
+        ignore_index=True,
+    )
+    fig = Figure(figsize=(14, 5))
+    axes = fig.subplots(1, 2)
+    sns.histplot(
+        data=matched,
+        x="log10_records",
         hue="source",
-        ax=ax,
+        weights="event_count",
+        stat="probability",
+        binwidth=data_records_impacted.LOG_BIN_WIDTH,
+        alpha=0.2,
+        common_norm=False,
+        ax=axes[0],
     )
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=60)
-    mpl_barplot_pane = pn.pane.Matplotlib(fig)
-    return mpl_barplot_pane
+    axes[0].set_xlabel("log10 data records impacted")
+    sns.lineplot(
+        data=matched_data, x="log10_records", y="data_scale_factor", ax=axes[1]
+    )
+    axes[1].set_yscale("log")
+    axes[1].set_xlabel("log10 model data records impacted")
+    axes[1].set_ylabel("data scale factor")
+    mpl_histplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_histplot_pane
 
 
-def event_exposure_geography(plot_data):
+def exceedance_curve_plot(plot_data, curve="aep"):
     """
-    bar plot comparing count of entities by geography in model and events data
+    line plot of the exceedance probability against the loss on log scales
 
     Parameters
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    curve : str, optional
+        "aep" for the annual aggregate or "oep" for the annual occurrence loss, by default "aep"
 
     Returns
     -------
     panel.pane.plot.Matplotlib
-        panel barplot pane
+        panel line plot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
-    sns.barplot(
-        data=plot_data,
-        x="geography",
-        y="entity_count_normalised",
+    sns.lineplot(
+        data=plot_data.loc[plot_data[curve] > 0],
+        x="loss",
+        y=curve,
         hue="source",
+        drawstyle="steps-post",
         ax=ax,
     )
-    ax.set_xlim(-0.5, 10.5)
-    mpl_barplot_pane = pn.pane.Matplotlib(fig)
-    return mpl_barplot_pane
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("loss (USD)")
+    ax.set_ylabel("exceedance probability")
+    mpl_lineplot_pane = pn.pane.Matplotlib(fig)
+    return mpl_lineplot_pane
 
 
-def events_per_year_bar_plot(plot_data):
+def severity_fit_plot(values, densities):
     """
-    bar plot showing the number of events per year
+    histogram of the log10 values of the model and events with the fitted densities
 
     Parameters
     ----------
-    plot_data : pd.DataFrame
-        data to be plotted
+    values : pd.DataFrame
+        cohort data of one measure with value and source columns
+    densities : pd.DataFrame
+        output of severity_fitting.density_plot_data
 
     Returns
     -------
     panel.pane.plot.Matplotlib
-        panel barplot pane
+        panel histplot pane
     """
+    import numpy as np
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
-    sns.barplot(data=plot_data, x="no_events", y="value", hue="source", ax=ax)
-    ax.set_xlim(-1, 10)
-    mpl_barplot_pane = pn.pane.Matplotlib(fig)
-    return mpl_barplot_pane
+    sns.histplot(
+        x=np.log10(values["value"]),
+        hue=values["source"],
+        stat="density",
+        common_norm=False,
+        binwidth=0.1,
+        alpha=0.2,
+        ax=ax,
+    )
+    sns.lineplot(
+        data=densities,
+        x="log10_value",
+        y="density",
+        hue="source",
+        style="distribution",
+        ax=ax,
+    )
+    ax.set_xlabel("log10 value (USD)")
+    return pn.pane.Matplotlib(fig)
 
 
-def event_severity_overall_hist_plot(plot_data):
+def event_severity_overall_hist_plot(plot_data, limit=100_000_000):
     """
     histplot showing the overall event severity
 
@@ -289,13 +1171,17 @@ def event_severity_overall_hist_plot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
-    limit = 100_000_000
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -304,6 +1190,7 @@ def event_severity_overall_hist_plot(plot_data):
         x="event_impact",
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -314,7 +1201,7 @@ def event_severity_overall_hist_plot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_annotated_overall_hist_plot(plot_data):
+def event_severity_annotated_overall_hist_plot(plot_data, limit=100_000_000):
     """
     annotated histplot showing the overall event severity
 
@@ -322,13 +1209,17 @@ def event_severity_annotated_overall_hist_plot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
-    limit = 100_000_000
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -337,6 +1228,7 @@ def event_severity_annotated_overall_hist_plot(plot_data):
         x="event_impact",
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -354,7 +1246,7 @@ def event_severity_annotated_overall_hist_plot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_liability_histplot(plot_data):
+def event_severity_liability_histplot(plot_data, limit=100_000_000):
     """
     liability cost component histplot
 
@@ -362,14 +1254,18 @@ def event_severity_liability_histplot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     param = "gu_liability"
-    limit = 100_000_000
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -378,6 +1274,7 @@ def event_severity_liability_histplot(plot_data):
         x=param,
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -388,7 +1285,7 @@ def event_severity_liability_histplot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_regulatory_histplot(plot_data):
+def event_severity_regulatory_histplot(plot_data, limit=100_000_000):
     """
     regulatory cost component histplot
 
@@ -396,14 +1293,18 @@ def event_severity_regulatory_histplot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     param = "gu_regulatory"
-    limit = 100_000_000
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -412,6 +1313,7 @@ def event_severity_regulatory_histplot(plot_data):
         x=param,
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -422,7 +1324,7 @@ def event_severity_regulatory_histplot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_privacy_histplot(plot_data):
+def event_severity_privacy_histplot(plot_data, limit=100_000_000):
     """
     privacy cost component histplot
 
@@ -430,14 +1332,18 @@ def event_severity_privacy_histplot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     param = "gu_privacy"
-    limit = 100_000_000
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -446,6 +1352,7 @@ def event_severity_privacy_histplot(plot_data):
         x=param,
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -456,7 +1363,7 @@ def event_severity_privacy_histplot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_bi_histplot(plot_data):
+def event_severity_bi_histplot(plot_data, limit=100_000_000):
     """
     business interruption cost component histplot
 
@@ -464,14 +1371,18 @@ def event_severity_bi_histplot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     param = "gu_bi"
-    limit = 100_000_000
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -480,6 +1391,7 @@ def event_severity_bi_histplot(plot_data):
         x=param,
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -490,7 +1402,7 @@ def event_severity_bi_histplot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_extortion_histplot(plot_data):
+def event_severity_extortion_histplot(plot_data, limit=100_000_000):
     """
     extortion cost component histplot
 
@@ -498,14 +1410,18 @@ def event_severity_extortion_histplot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     param = "gu_extortion"
-    limit = 100_000_000
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -514,6 +1430,7 @@ def event_severity_extortion_histplot(plot_data):
         x=param,
         hue="source",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=0.5,
         common_norm=False,
@@ -524,7 +1441,7 @@ def event_severity_extortion_histplot(plot_data):
     return mpl_histplot_pane
 
 
-def event_severity_model_costs_histplot(plot_data):
+def event_severity_model_costs_histplot(plot_data, limit=100_000_000):
     """
     histplot showing the split of model cost components
 
@@ -532,13 +1449,17 @@ def event_severity_model_costs_histplot(plot_data):
     ----------
     plot_data : pd.DataFrame
         data to be plotted
+    limit : float, optional
+        upper bound of the plotted impact, sets the bin width, by default 100_000_000
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel histplot pane
     """
-    limit = 100_000_000
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     bins = 30
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
@@ -547,6 +1468,7 @@ def event_severity_model_costs_histplot(plot_data):
         x="value",
         hue="cost_component",
         stat="probability",
+        weights="weight",
         binwidth=limit / bins,
         alpha=1,
         common_norm=True,
@@ -572,6 +1494,9 @@ def event_frequency_overall_barplot(plot_data):
     panel.pane.plot.Matplotlib
         panel barplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
     sns.barplot(
@@ -585,6 +1510,34 @@ def event_frequency_overall_barplot(plot_data):
     return mpl_barplot_pane
 
 
+def event_frequency_cohort_barplot(plot_data, by="sic_division"):
+    """
+    barplot showing the annual event frequency per entity by cohort
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        output of frequency_annual_breach.cohort_frequency_plot_data
+    by : str, optional
+        cohort column, by default "sic_division"
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel barplot pane
+    """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots(1, 1)
+    sns.barplot(data=plot_data, x=by, y="frequency", hue="source", ax=ax)
+    ax.tick_params(axis="x", labelrotation=30)
+    ax.set_ylabel("events per entity-year")
+    fig.tight_layout()
+    return pn.pane.Matplotlib(fig)
+
+
 def event_frequency_confidentiality_barplot(plot_data):
     """
     barplot showing the annual breach frequency for confidentiality events
@@ -599,6 +1552,9 @@ def event_frequency_confidentiality_barplot(plot_data):
     panel.pane.plot.Matplotlib
         panel barplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
     sns.barplot(
@@ -625,6 +1581,9 @@ def event_frequency_annotated_confidentiality_barplot(plot_data):
     panel.pane.plot.Matplotlib
         panel barplot pane
     """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
     sns.barplot(
@@ -661,21 +1620,74 @@ def events_annual_frequency_boxplot(plot_data):
     Parameters
     ----------
     plot_data : pd.DataFrame
-        data to be plotted
+        frequency sketches per source, see events_annual_frequency.box_plot_sketches
 
     Returns
     -------
     panel.pane.plot.Matplotlib
         panel boxplot pane
     """
+    from matplotlib.figure import Figure
+
     fig = Figure(figsize=(8, 5))
     ax = fig.subplots(1, 1)
-    sns.boxplot(data=plot_data, x="source", y="frequency", ax=ax)
+    sketch_box_plot(ax, plot_data)
+    ax.set_xlabel("source")
+    ax.set_ylabel("frequency")
     ax.set_title(model_version())
     mpl_barplot_pane = pn.pane.Matplotlib(fig)
     return mpl_barplot_pane
 
 
+def confidence_interval_plot(ci_data, x="statistic", hue="source", log_scale=False):
+    """
+    point estimates with their bootstrap confidence intervals as error bars
+
+    Parameters
+    ----------
+    ci_data : pd.DataFrame
+        estimate, lower and upper bound with the x and hue columns
+    x : str, optional
+        column on the x axis, by default "statistic"
+    hue : str, optional
+        column separating the series, by default "source"
+    log_scale : bool, optional
+        log scale y axis, by default False
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel error bar pane
+    """
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots(1, 1)
+    categories = list(dict.fromkeys(ci_data[x]))
+    series = list(dict.fromkeys(ci_data[hue]))
+    width = 0.6 / len(series)
+    for i, (name, group) in enumerate(ci_data.groupby(hue, sort=False)):
+        positions = np.array([categories.index(value) for value in group[x]])
+        ax.errorbar(
+            positions - 0.3 + width * (i + 0.5),
+            group["estimate"],
+            yerr=[
+                group["estimate"] - group["lower"],
+                group["upper"] - group["estimate"],
+            ],
+            fmt="o",
+            capsize=4,
+            label=str(name),
+        )
+    ax.set_xticks(range(len(categories)))
+    ax.set_xticklabels(categories)
+    if log_scale:
+        ax.set_yscale("log")
+    ax.legend(title=hue)
+    return pn.pane.Matplotlib(fig)
+
+
 def events_annual_frequency_sankey_plot(plot_data):
     """
     sankey plot showing split of model data by confidentiality
@@ -690,6 +1702,8 @@ def events_annual_frequency_sankey_plot(plot_data):
     panel.pane.plotly.Plotly
         panel sankeyplot pane
     """
+    import plotly.graph_objects as go
+
     df_links = plot_data[0]
     label_dict = plot_data[1]
     fig = go.Figure(
@@ -722,6 +1736,8 @@ def events_annual_frequency_model_cia_barplot(plot_data):
     panel.pane.plotly.Plotly
         panel barplot pane
     """
+    import plotly.graph_objects as go
+
     fig = go.Figure(go.Bar(x=plot_data.index, y=plot_data.values))
 
     fig.update_layout(margin=dict(l=10, r=10, t=10, b=10), width=400, height=400)
@@ -729,131 +1745,384 @@ def events_annual_frequency_model_cia_barplot(plot_data):
     return plotly_pane
 
 
+def signal_control_plot(plot_data):
+    """
+    control chart of the event count of one series against the model expectation,
+    with the poisson control limits, the EWMA and the flagged periods
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame
+        statistics of one series and frequency, see signal_detection.signals
+
+    Returns
+    -------
+    panel.pane.plot.Matplotlib
+        panel line plot pane
+    """
+    from matplotlib.figure import Figure
+
+    colors = set_colours()
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots(1, 1)
+    ax.fill_between(
+        plot_data["period"],
+        plot_data["lcl"],
+        plot_data["ucl"],
+        step="post",
+        color=colors[2],
+        alpha=0.2,
+        label="poisson control limits",
+    )
+    ax.step(
+        plot_data["period"],
+        plot_data["expected"],
+        where="post",
+        color=colors[2],
+        label="model expectation",
+    )
+    ax.step(
+        plot_data["period"],
+        plot_data["event_count"],
+        where="post",
+        color=colors[0],
+        label="events",
+    )
+    ax.plot(plot_data["period"], plot_data["ewma"], color=colors[3], label="ewma")
+    flagged = plot_data.loc[plot_data["signal"]]
+    ax.scatter(
+        flagged["period"],
+        flagged["event_count"],
+        color=colors[7],
+        zorder=3,
+        label="signal",
+    )
+    ax.set_xlabel("period start")
+    ax.set_ylabel("event count")
+    ax.legend()
+    return pn.pane.Matplotlib(fig)
+
+
+def signal_view(frequency, series, stats):
+    """
+    render the control chart of a series and the most recent flagged periods
+
+    Parameters
+    ----------
+    frequency : str
+        "monthly" or "quarterly"
+    series : str
+        "dimension: level" of the series
+    stats : pd.DataFrame
+        cached output of signal_detection.signals()
+
+    Returns
+    -------
+    panel.Tabs
+        control chart and flagged periods table
+    """
+    dimension, level = series.split(": ", 1)
+    plot_data = stats.loc[
+        (stats["frequency"] == frequency)
+        & (stats["dimension"] == dimension)
+        & (stats["level"] == level)
+    ]
+    return pn.Tabs(
+        ("control chart", signal_control_plot(plot_data)),
+        (
+            "flagged periods",
+            pn.pane.DataFrame(
+                signal_detection.signal_table(stats, frequency),
+                index=False,
+                width=1100,
+            ),
+        ),
+    )
+
+
 def load_dashboard():
     """
     configure and serve dashboard
     """
+    import seaborn as sns
+
+    # filter widgets, changing a widget only re-filters the cached data
+    f1k_data = cache_plot_data(data_func=f1k_table, data_name="f1k_table")
+    widgets = filter_widgets(f1k_data=f1k_data)
+
     # event duration plots
+    events_duration = cache_plot_data(
+        data_func=events_duration_data, data_name="events_duration_data"
+    )
     event_duration_data = cache_plot_data(
-        df=event_duration_plot_data(), data_name="event_duration_plot_data"
+        data_func=partial(event_duration_sketches, events_duration),
+        data_name="event_duration_sketches",
     )
     colors = set_colours()
     sns.set_palette(sns.color_palette(colors))
-    event_duration_box_plot_pane = event_duration_box_plot(
-        plot_data=event_duration_data
+    bind_weighting = partial(
+        pn.bind, weighting_view, reweight=widgets["reweight_model"]
+    )
+    event_duration_box_plot_pane = bind_weighting(
+        plot_func=event_duration_box_plot, plot_data=event_duration_data
+    )
+    event_duration_ecdf_plot_pane = bind_weighting(
+        plot_func=event_duration_ecdf_plot, plot_data=event_duration_data
     )
-    event_duration_ecdf_plot_pane = event_duration_ecdf_plot(
-        plot_data=event_duration_data
+    event_duration_hist_plot_pane = bind_weighting(
+        plot_func=event_duration_hist_plot,
+        plot_data=event_duration_data,
+        binwidth=widgets["duration_binwidth"],
     )
-    event_duration_hist_plot_pane = event_duration_hist_plot(
-        plot_data=event_duration_data
+
+    event_duration_gof = cache_plot_data(
+        data_func=partial(duration_gof_data, events_duration),
+        data_name="event_duration_gof_data",
     )
 
     # event exposure plots
-    exposure_revenue_data = cache_plot_data(
-        df=join_datasets(), data_name="event_exposure_revenue_data"
+    exposure_model_data = cache_plot_data(
+        data_func=model_exposure_data, data_name="event_exposure_model_data"
     )
-    exposure_sic_data = cache_plot_data(
-        df=sic_data(), data_name="event_exposure_sic_data"
+    bind_exposure = partial(
+        pn.bind,
+        exposure_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        f1k_data=f1k_data,
+        model_data=exposure_model_data,
     )
-    exposure_division_sic_data = cache_plot_data(
-        df=division_sic_data(), data_name="event_exposure_division_sic_data"
+
+    event_exposure_revenue_hist_plot = pn.bind(
+        exposure_revenue_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        xlim=widgets["revenue_xlim"],
+        f1k_data=f1k_data,
+        model_data=exposure_model_data,
     )
-    exposure_geographic_data = cache_plot_data(
-        df=geographic_data(), data_name="event_exposure_geographic_data"
+    event_exposure_sic_count_bar_plot = bind_exposure(
+        plot_func=event_exposure_sic_count, section="sic"
     )
-
-    event_exposure_revenue_hist_plot = event_exposure_revenue(
-        plot_data=exposure_revenue_data
+    event_exposure_sic_division_bar_plot = bind_exposure(
+        plot_func=event_exposure_sic_division_count, section="division"
     )
-    event_exposure_sic_count_bar_plot = event_exposure_sic_count(
-        plot_data=exposure_sic_data
+    event_exposure_geography_bar_plot = bind_exposure(
+        plot_func=event_exposure_geography, section="geography"
     )
-    event_exposure_sic_division_bar_plot = event_exposure_sic_division_count(
-        plot_data=exposure_division_sic_data
+    exposure_gof_table = bind_exposure(plot_func=revenue_gof_pane, section="joined")
+    reweighted_mix = cache_plot_data(
+        data_func=reweighted_mix_data, data_name="exposure_reweighted_mix_data"
     )
-    event_exposure_geography_bar_plot = event_exposure_geography(
-        plot_data=exposure_geographic_data
+    event_exposure_reweighted_mix_plot = event_exposure_reweighted_mix(
+        plot_data=reweighted_mix
     )
 
     # events per year plot
-    events_per_year_data = cache_plot_data(
-        df=events_per_year_plot_data(), data_name="events_per_year_plot_data"
+    events_per_year_model = cache_plot_data(
+        data_func=events_per_year.model_data, data_name="events_per_year_model_data"
+    )
+    events_per_year_plot = pn.bind(
+        events_per_year_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        model_data=events_per_year_model,
     )
-    events_per_year_plot = events_per_year_bar_plot(plot_data=events_per_year_data)
 
     # event severity plots
-    overall_event_severity_data = cache_plot_data(
-        df=overall_severity_plot_data(), data_name="overall_severity_plot_data"
+    severity_joined_data = cache_plot_data(
+        data_func=event_severity.join_datasets, data_name="severity_joined_data"
+    )
+    severity_cost_data = cache_plot_data(
+        data_func=join_cost_component_datasets, data_name="severity_cost_data"
+    )
+    severity_model_cost_data = cache_plot_data(
+        data_func=model_cost_split, data_name="severity_model_cost_data"
+    )
+    bind_severity = partial(
+        pn.bind,
+        severity_view,
+        minimum=widgets["severity_minimum"],
+        reweight=widgets["reweight_model"],
+    )
+    bind_cost = partial(
+        pn.bind,
+        severity_view,
+        minimum=widgets["cost_minimum"],
+        reweight=widgets["reweight_model"],
     )
 
-    event_severity_liability_data = cache_plot_data(
-        df=liability_costs(), data_name="liability_costs"
+    event_severity_overall_plot = bind_severity(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_overall_hist_plot,
+        data_func=overall_severity_plot_data,
+        base_data=severity_joined_data,
     )
-    event_severity_regulatory_data = cache_plot_data(
-        df=regulatory_costs(), data_name="regulatory_costs"
+    event_severity_annotated_overall_plot = bind_severity(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_annotated_overall_hist_plot,
+        data_func=overall_severity_plot_data,
+        base_data=severity_joined_data,
     )
-    event_severity_privacy_data = cache_plot_data(
-        df=privacy_costs(), data_name="privacy_costs"
+    event_severity_liability_plot = bind_severity(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_liability_histplot,
+        data_func=liability_costs,
+        base_data=severity_cost_data,
     )
-    event_severity_bi_data = cache_plot_data(df=bi_costs(), data_name="bi_costs")
-    event_severity_extortion_data = cache_plot_data(
-        df=extortion_costs(), data_name="extortion_costs"
+    event_severity_regulatory_plot = bind_cost(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_regulatory_histplot,
+        data_func=regulatory_costs,
+        base_data=severity_cost_data,
     )
-    event_severity_model_costs_data = cache_plot_data(
-        df=model_cost_plot_data(), data_name="model_cost_plot_data"
+    event_severity_privacy_plot = bind_cost(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_privacy_histplot,
+        data_func=privacy_costs,
+        base_data=severity_cost_data,
     )
-
-    event_severity_overall_plot = event_severity_overall_hist_plot(
-        plot_data=overall_event_severity_data
+    event_severity_bi_plot = bind_cost(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_bi_histplot,
+        data_func=bi_costs,
+        base_data=severity_cost_data,
+    )
+    event_severity_extortion_plot = bind_cost(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_extortion_histplot,
+        data_func=extortion_costs,
+        base_data=severity_cost_data,
+    )
+    event_severity_model_costs_plot = bind_severity(
+        limit=widgets["severity_limit"],
+        plot_func=event_severity_model_costs_histplot,
+        data_func=model_cost_plot_data,
+        base_data=severity_model_cost_data,
+    )
+    severity_ci = cache_plot_data(
+        data_func=partial(severity_ci_data, severity_joined_data),
+        data_name="severity_ci_data",
     )
-    event_severity_annotated_overall_plot = event_severity_annotated_overall_hist_plot(
-        plot_data=overall_event_severity_data
+    event_severity_ci_plot = confidence_interval_plot(severity_ci, log_scale=True)
+    severity_gof = cache_plot_data(
+        data_func=partial(severity_gof_data, severity_joined_data, severity_cost_data),
+        data_name="severity_gof_data",
     )
-    event_severity_liability_plot = event_severity_liability_histplot(
-        plot_data=event_severity_liability_data
+    # severity distribution fits
+    severity_cohort_data = cache_plot_data(
+        data_func=severity_fitting.cohort_data, data_name="severity_cohort_data"
     )
-    event_severity_regulatory_plot = event_severity_regulatory_histplot(
-        plot_data=event_severity_regulatory_data
+    severity_fits = cache_plot_data(
+        data_func=partial(severity_fitting.fit_cohorts, severity_cohort_data),
+        data_name="severity_fits",
     )
-    event_severity_privacy_plot = event_severity_privacy_histplot(
-        plot_data=event_severity_privacy_data
+    severity_fit_plots = pn.bind(
+        severity_fit_view,
+        measure=widgets["fit_measure"],
+        cohort_data=severity_cohort_data,
+        fits=severity_fits,
     )
-    event_severity_bi_plot = event_severity_bi_histplot(
-        plot_data=event_severity_bi_data
+    # data records impacted plots
+    data_records_model = cache_plot_data(
+        data_func=data_records_impacted.model_records_histogram,
+        data_name="data_records_model_histogram",
     )
-    event_severity_extortion_plot = event_severity_extortion_histplot(
-        plot_data=event_severity_extortion_data
+    bind_data_records = partial(
+        pn.bind,
+        data_records_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        f1k_data=f1k_data,
+        model_histogram=data_records_model,
     )
-    event_severity_model_costs_plot = event_severity_model_costs_histplot(
-        plot_data=event_severity_model_costs_data
+    data_records_quality_table = pn.bind(
+        data_quality_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        f1k_data=f1k_data,
+        model_histogram=data_records_model,
+    )
+    # loss exceedance plots
+    f1k_entities = cache_plot_data(
+        data_func=partial(store_entities, STORE_REVENUE_FLOOR), data_name="f1k_entities"
+    )
+    model_exceedance = cache_plot_data(
+        data_func=exceedance.model_exceedance, data_name="model_exceedance"
+    )
+    exceedance_plots = pn.bind(
+        exceedance_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        f1k_data=f1k_data,
+        entities=f1k_entities,
+        model=model_exceedance,
     )
     # event frequency plots
-    event_frequency_data = cache_plot_data(
-        df=overall_frequency_plot_data(), data_name="overall_frequency_plot_data"
+    breach_frequency_model = cache_plot_data(
+        data_func=frequency_annual_breach.model_data,
+        data_name="breach_frequency_model_data",
     )
-    event_frequency_overall_plot = event_frequency_overall_barplot(
-        plot_data=event_frequency_data
+    bind_breach_frequency = partial(
+        pn.bind,
+        breach_frequency_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        reweight=widgets["reweight_model"],
+        model_data=breach_frequency_model,
     )
-    event_frequency_confidentiality_plot = event_frequency_confidentiality_barplot(
-        plot_data=event_frequency_data
+    event_frequency_overall_plot = bind_breach_frequency(
+        plot_func=event_frequency_overall_barplot
     )
-    event_frequency_annotated_confidentiality_plot = (
-        event_frequency_annotated_confidentiality_barplot(
-            plot_data=event_frequency_data
-        )
+    event_frequency_confidentiality_plot = bind_breach_frequency(
+        plot_func=event_frequency_confidentiality_barplot
     )
+    event_frequency_annotated_confidentiality_plot = bind_breach_frequency(
+        plot_func=event_frequency_annotated_confidentiality_barplot
+    )
+    event_frequency_ci_plot = pn.bind(
+        breach_frequency_ci_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        model_data=breach_frequency_model,
+    )
+    cohort_frequency_model = cache_plot_data(
+        data_func=frequency_annual_breach.model_cohort_data,
+        data_name="cohort_frequency_model_data",
+    )
+    event_frequency_by_cohort_plots = {
+        by: pn.bind(
+            cohort_frequency_view,
+            revenue_floor=widgets["revenue_floor"],
+            year_range=widgets["year_range"],
+            by=by,
+            model_data=cohort_frequency_model,
+        )
+        for by in ["sic_division", "revenue_band"]
+    }
     # events frequency confidentiality plots
-    events_annual_frequency_data = cache_plot_data(
-        df=box_plot_data(), data_name="event_annual_frequency_data"
+    annual_frequency_model = cache_plot_data(
+        data_func=events_annual_frequency.model_data,
+        data_name="annual_frequency_model_data",
     )
 
     events_annual_model_cia_barplot_data = cache_plot_data(
-        df=model_cia_barplot_data(), data_name="events_annual_model_cia_barplot_data"
+        data_func=model_cia_barplot_data,
+        data_name="events_annual_model_cia_barplot_data",
     )
 
-    events_annual_frequency_plot = events_annual_frequency_boxplot(
-        plot_data=events_annual_frequency_data
+    events_annual_frequency_plot = pn.bind(
+        annual_frequency_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        reweight=widgets["reweight_model"],
+        model_data=annual_frequency_model,
+    )
+    events_annual_frequency_ci_plot = pn.bind(
+        annual_frequency_ci_view,
+        revenue_floor=widgets["revenue_floor"],
+        year_range=widgets["year_range"],
+        model_data=annual_frequency_model,
     )
     events_annual_model_frequency_sankey_confidentiality_plot = (
         events_annual_frequency_sankey_plot(
@@ -880,8 +2149,42 @@ def load_dashboard():
     events_annual_model_cia_plot = events_annual_frequency_model_cia_barplot(
         plot_data=events_annual_model_cia_barplot_data,
     )
+    # signal detection, the stored statistics are brought up to date first
+    signal_data = cache_plot_data(
+        data_func=signal_detection.signals, data_name="signal_detection"
+    )
+    signal_frequency = pn.widgets.Select(
+        name="period", options=list(signal_detection.FREQUENCIES), value="quarterly"
+    )
+    signal_series = pn.widgets.Select(
+        name="series",
+        options=(signal_data["dimension"] + ": " + signal_data["level"])
+        .unique()
+        .tolist(),
+        value="all: all",
+    )
+    signal_plots = pn.bind(
+        signal_view,
+        frequency=signal_frequency,
+        series=signal_series,
+        stats=signal_data,
+    )
+    # data quality diagnostics, read after every dataset above was loaded and validated
+    data_validation = validation_report()
     template = pn.template.FastListTemplate(
         title="Analytics - Dashboard",
+        sidebar=[
+            pn.pane.Markdown("### Filters"),
+            widgets["revenue_floor"],
+            widgets["year_range"],
+            widgets["revenue_xlim"],
+            widgets["duration_binwidth"],
+            widgets["severity_minimum"],
+            widgets["cost_minimum"],
+            widgets["severity_limit"],
+            widgets["fit_measure"],
+            widgets["reweight_model"],
+        ],
         busy_indicator=pn.indicators.LoadingSpinner(
             width=50, height=50, value=True, color="primary", bgcolor="light"
         ),
@@ -896,6 +2199,7 @@ def load_dashboard():
                     ("box-plot", event_duration_box_plot_pane),
                     ("ecdf_plot", event_duration_ecdf_plot_pane),
                     ("histogram_plot", event_duration_hist_plot_pane),
+                    ("goodness of fit", gof_table_pane(event_duration_gof)),
                 )
             ),
             pn.pane.Markdown(
@@ -918,6 +2222,8 @@ def load_dashboard():
                         event_exposure_sic_division_bar_plot,
                     ),
                     ("entity count by geography", event_exposure_geography_bar_plot),
+                    ("goodness of fit", exposure_gof_table),
+                    ("reweighted entity mix", event_exposure_reweighted_mix_plot),
                 )
             ),
             pn.pane.Markdown(
@@ -944,8 +2250,44 @@ def load_dashboard():
                     ("bi costs", event_severity_bi_plot),
                     ("extortion costs", event_severity_extortion_plot),
                     ("model costs by component", event_severity_model_costs_plot),
+                    ("severity confidence intervals", event_severity_ci_plot),
+                    ("goodness of fit", gof_table_pane(severity_gof)),
+                )
+            ),
+            pn.pane.Markdown(
+                "### Severity Fits - lognormal, gpd tail and spliced fits of the event impact and cost components by cohort between the F-1000 using FQ model v2022.2.3 and events data",
+                width=1200,
+                style={"color": "#5451f7"},
+            ),
+            pn.Row(severity_fit_plots),
+            pn.pane.Markdown(
+                "### Data Records Impacted - comparison of the data records impacted per event overall and by compromised data type between the F-1000 using FQ model v2022.2.3 and events data",
+                width=1200,
+                style={"color": "#5451f7"},
+            ),
+            pn.Row(
+                pn.Tabs(
+                    ("histogram", bind_data_records(plot_func=data_records_hist_plot)),
+                    ("ecdf", bind_data_records(plot_func=data_records_ecdf_plot)),
+                    (
+                        "by compromised data type",
+                        bind_data_records(plot_func=data_records_by_type_plot),
+                    ),
+                    (
+                        "quantile matched data scale",
+                        bind_data_records(
+                            plot_func=data_records_matched_plot, matched=True
+                        ),
+                    ),
+                    ("data quality", data_records_quality_table),
                 )
             ),
+            pn.pane.Markdown(
+                "### Loss Exceedance - annual aggregate and occurrence loss exceedance per company-year between the F-1000 using FQ model v2022.2.3 and events data",
+                width=1200,
+                style={"color": "#5451f7"},
+            ),
+            pn.Row(exceedance_plots),
             pn.pane.Markdown(
                 "### Event Frequency - comparison of the frequency of annual breaches between the F-1000 using FQ model v2022.2.3 and events data",
                 width=1200,
@@ -962,6 +2304,15 @@ def load_dashboard():
                         "annual frequency non-confidentiality breaches",
                         event_frequency_annotated_confidentiality_plot,
                     ),
+                    ("frequency confidence intervals", event_frequency_ci_plot),
+                    (
+                        "frequency by sic division",
+                        event_frequency_by_cohort_plots["sic_division"],
+                    ),
+                    (
+                        "frequency by revenue band",
+                        event_frequency_by_cohort_plots["revenue_band"],
+                    ),
                 )
             ),
             pn.pane.Markdown(
@@ -972,6 +2323,10 @@ def load_dashboard():
             pn.Row(
                 pn.Tabs(
                     ("frequency box plot", events_annual_frequency_plot),
+                    (
+                        "frequency confidence intervals",
+                        events_annual_frequency_ci_plot,
+                    ),
                     (
                         "confidentiality model sankey plot",
                         events_annual_model_frequency_sankey_confidentiality_plot,
@@ -991,6 +2346,19 @@ def load_dashboard():
                     ("model cia bar plot", events_annual_model_cia_plot),
                 )
             ),
+            pn.pane.Markdown(
+                "### Signal Detection - monthly and quarterly event counts of the F-1000 by event type, SIC division and CIA flag against the frequency of FQ model v2022.2.3, with poisson control limits, EWMA and CUSUM",
+                width=1200,
+                style={"color": "#5451f7"},
+            ),
+            pn.Row(signal_frequency, signal_series),
+            pn.Row(signal_plots),
+            pn.pane.Markdown(
+                "### Diagnostics - data quality rule violations of the events and model datasets, rows of quarantine rules are left out of every section above",
+                width=1200,
+                style={"color": "#5451f7"},
+            ),
+            pn.Row(pn.pane.DataFrame(data_validation, index=False, width=900)),
         ],
         accent_base_color="#5451f7",
         header_background="#5451f7",
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import read_f1k_table
+from analytics_dashboards.common.queries import run_query
+
+# width of the records impacted bins in decades, see model_records_histogram
+LOG_BIN_WIDTH = 0.1
+
+# events compromised data types mapped to the model data splits, others are OTHER
+DATA_TYPE_MAP = {"PFI": "PCI", "PHI": "PHI", "PII": "PII"}
+
+DATA_TYPES = ["PCI", "PHI", "PII", "OTHER"]
+
+# quantile groups of the events whose medians the model records are matched to
+QUANTILE_GROUPS = 100
+
+# numbers and quoted items of the list valued strings, e.g. "[12 5000]" or "['PII' 'PHI']"
+NUMBER_PATTERN = r"(\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)"
+QUOTED_PATTERN = r"'([^']*)'"
+
+
+def parse_list_column(values, pattern):
+    """
+    unnest a column of list valued strings with one regex pass over the column
+
+    Parameters
+    ----------
+    values : pd.Series
+        list valued strings, missing values have no items
+    pattern : str
+        regex with one group matching an item, NUMBER_PATTERN or QUOTED_PATTERN
+
+    Returns
+    -------
+    pd.DataFrame
+        row (index label in values), position in the list and item
+    """
+    items = values.astype("string").str.extractall(pattern)[0]
+    return (
+        items.rename("item")
+        .rename_axis(["row", "position"])
+        .reset_index()
+        .astype({"item": object})
+    )
+
+
+def log_bins(values, bin_width=LOG_BIN_WIDTH):
+    """
+    log-spaced bin of records impacted values, as computed by model_records_histogram
+
+    Returns
+    -------
+    np.ndarray
+        bin number, NaN below one record
+    """
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bins = np.floor(np.log10(values) / bin_width)
+    return np.where(values >= 1, bins, np.nan)
+
+
+def events_records_data(df_events=None):
+    """
+    records impacted of each Advisen event, once for all data types and once for each
+    of its compromised data types
+
+    the first number of compromised_data_amount is the records impacted, events
+    without a number are left out
+
+    Parameters
+    ----------
+    df_events : pd.DataFrame, optional
+        already loaded fortune 1000 events table, read from the database if None
+
+    Returns
+    -------
+    pd.DataFrame
+        row, data_type ("ALL" or one of DATA_TYPES) and data_records_impacted
+    """
+    if df_events is None:
+        df_events = read_f1k_table()
+    df_events = df_events.reset_index(drop=True)
+    amounts = parse_list_column(df_events["compromised_data_amount"], NUMBER_PATTERN)
+    records = (
+        amounts.groupby("row")["item"]
+        .first()
+        .astype(float)
+        .rename("data_records_impacted")
+    )
+    types = parse_list_column(df_events["compromised_data_types"], QUOTED_PATTERN)
+    types["data_type"] = types["item"].map(DATA_TYPE_MAP).fillna("OTHER")
+    # events without compromised data types count as OTHER
+    untyped = pd.DataFrame(
+        {"row": df_events.index.difference(types["row"]), "data_type": "OTHER"}
+    )
+    data_types = pd.concat(
+        [
+            pd.DataFrame({"row": df_events.index, "data_type": "ALL"}),
+            types[["row", "data_type"]],
+            untyped,
+        ],
+        ignore_index=True,
+    ).drop_duplicates()
+    return data_types.merge(records, left_on="row", right_index=True)
+
+
+def model_records_histogram(bin_width=LOG_BIN_WIDTH):
+    """
+    histogram of the model records impacted on log-spaced bins, binned by the database
+
+    Parameters
+    ----------
+    bin_width : float, optional
+        bin width in decades, by default LOG_BIN_WIDTH
+
+    Returns
+    -------
+    pd.DataFrame
+        data_type, bin and event_count, events with fewer than one record have no bin
+    """
+    return run_query("model_records_histogram", bin_width=bin_width)
+
+
+def records_histogram(events_records=None, bin_width=LOG_BIN_WIDTH, df_model=None):
+    """
+    histogram of the records impacted on log-spaced bins, the model events are binned
+    by the database
+
+    Parameters
+    ----------
+    events_records : pd.DataFrame, optional
+        already loaded output of events_records_data(), loaded if None
+    bin_width : float, optional
+        bin width in decades, by default LOG_BIN_WIDTH
+    df_model : pd.DataFrame, optional
+        already loaded output of model_records_histogram(bin_width), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        source, data_type, log10_records (lower bin edge), event_count and share of the
+        events of the source and data type with at least one record
+    """
+    if events_records is None:
+        events_records = events_records_data()
+    events = (
+        events_records.assign(
+            bin=log_bins(events_records["data_records_impacted"], bin_width)
+        )
+        .groupby(["data_type", "bin"])
+        .size()
+        .rename("event_count")
+        .reset_index()
+    )
+    if df_model is None:
+        df_model = model_records_histogram(bin_width)
+    model = df_model.dropna(subset=["bin"])
+    histogram = pd.concat(
+        [events.assign(source="events"), model.assign(source="model")],
+        ignore_index=True,
+    )
+    histogram["log10_records"] = histogram["bin"] * bin_width
+    histogram["share"] = histogram["event_count"] / histogram.groupby(
+        ["source", "data_type"]
+    )["event_count"].transform("sum")
+    return histogram.sort_values(["source", "data_type", "bin"], ignore_index=True)[
+        ["source", "data_type", "log10_records", "event_count", "share"]
+    ]
+
+
+def quantile_matched_data(
+    histogram, events_records, quantile_groups=QUANTILE_GROUPS, bin_width=LOG_BIN_WIDTH
+):
+    """
+    match the model records impacted to the events by quantile: each model bin takes the
+    median of the events quantile group at its cumulative probability, found for all
+    bins with one searchsorted call
+
+    Parameters
+    ----------
+    histogram : pd.DataFrame
+        output of records_histogram()
+    events_records : pd.DataFrame
+        output of events_records_data()
+    quantile_groups : int, optional
+        number of events quantile groups, by default QUANTILE_GROUPS
+    bin_width : float, optional
+        bin width in decades of the histogram, by default LOG_BIN_WIDTH
+
+    Returns
+    -------
+    pd.DataFrame
+        model log10_records and event_count, matched_records and data_scale_factor, the
+        factor the model data scale would need to reproduce the matched records
+    """
+    events = events_records.loc[
+        (events_records["data_type"] == "ALL")
+        & (events_records["data_records_impacted"] >= 1),
+        "data_records_impacted",
+    ].to_numpy()
+    model = histogram.loc[
+        (histogram["source"] == "model") & (histogram["data_type"] == "ALL")
+    ].sort_values("log10_records", ignore_index=True)
+    group_levels = (np.arange(quantile_groups) + 0.5) / quantile_groups
+    medians = np.quantile(events, group_levels) if len(events) else np.nan
+    mid_cdf = (model["event_count"].cumsum() - model["event_count"] / 2) / model[
+        "event_count"
+    ].sum()
+    edges = np.arange(1, quantile_groups) / quantile_groups
+    groups = np.searchsorted(edges, mid_cdf, side="right")
+    model["matched_records"] = np.asarray(medians)[groups] if len(events) else np.nan
+    bin_centre = 10 ** (model["log10_records"] + bin_width / 2)
+    model["data_scale_factor"] = model["matched_records"] / bin_centre
+    return model[
+        ["log10_records", "event_count", "matched_records", "data_scale_factor"]
+    ]
+
+
+def data_quality_table(df_events=None, bin_width=LOG_BIN_WIDTH, df_model=None):
+    """
+    share of the events and model events without usable records impacted
+
+    Parameters
+    ----------
+    df_events : pd.DataFrame, optional
+        already loaded fortune 1000 events table, read from the database if None
+    bin_width : float, optional
+        bin width in decades of the model histogram, by default LOG_BIN_WIDTH
+    df_model : pd.DataFrame, optional
+        already loaded output of model_records_histogram(bin_width), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        events and model counts and shares in percent
+    """
+    if df_events is None:
+        df_events = read_f1k_table()
+    amounts = df_events["compromised_data_amount"].astype("string")
+    first_number = amounts.str.extract(NUMBER_PATTERN)[0].astype(float)
+    if df_model is None:
+        df_model = model_records_histogram(bin_width)
+    model = df_model.loc[df_model["data_type"] == "ALL"]
+    rows = [
+        ("events", "events", len(df_events)),
+        ("events", "no compromised data amount", amounts.isna().sum()),
+        (
+            "events",
+            "no number in the amount",
+            (amounts.notna() & first_number.isna()).sum(),
+        ),
+        ("events", "fewer than one record", (first_number < 1).sum()),
+        ("model", "events", model["event_count"].sum()),
+        (
+            "model",
+            "fewer than one record",
+            model.loc[model["bin"].isna(), "event_count"].sum(),
+        ),
+    ]
+    table = pd.DataFrame(rows, columns=["source", "check", "count"])
+    totals = table.groupby("source")["count"].transform("first")
+    table["percent"] = (100 * table["count"] / totals).round(2)
+    return table
@@ -0,0 +1,226 @@
+# entity resolution between the model entities and the fortune 1000 companies:
+# names are normalised, candidate pairs are blocked on SIC2, state and revenue band,
+# scored with the trigram similarity of their names and matched one to one; the match
+# table is stored per fingerprint of its inputs, so the per-company comparison of the
+# model frequency and the observed events is a join on run_id and company_instance_id
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  read_f1k_entities,
+                                                  read_f1k_table,
+                                                  write_parquet)
+from analytics_dashboards.common.queries import run_query
+from analytics_dashboards.common.record_linkage import (candidate_pairs,
+                                                        fingerprint,
+                                                        normalise_names,
+                                                        one_to_one,
+                                                        pair_similarity,
+                                                        trigram_matrices)
+from analytics_dashboards.exposure_comparison import (revenue_band, sic2_codes,
+                                                      simulation_years)
+
+# pairs are compared when they share any of these keys, i.e. two of the three attributes
+BLOCKING_KEYS = [
+    ["sic2", "state"],
+    ["sic2", "revenue_band"],
+    ["state", "revenue_band"],
+]
+
+ATTRIBUTES = ["sic2", "state", "revenue_band"]
+
+# share of the score given by the name similarity, the rest by the agreeing attributes
+NAME_WEIGHT = 0.8
+
+# lowest score of a match
+MATCH_THRESHOLD = 0.75
+
+# lowest name similarity of a match, agreeing attributes alone cannot lift a pair of
+# different names over MATCH_THRESHOLD
+MIN_NAME_SIMILARITY = 0.85
+
+MATCH_COLUMNS = [
+    "company_instance_id",
+    "company_name",
+    "run_id",
+    "entity_name",
+    "name_similarity",
+    "sic2_match",
+    "state_match",
+    "revenue_band_match",
+    "score",
+]
+
+
+def entity_tables(**params):
+    """
+    fortune 1000 companies and model entities with their normalised names and the
+    blocking attributes
+
+    Parameters
+    ----------
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    tuple
+        (companies with company_instance_id and company_name, model entities with
+        run_id and entity_name), both with name, sic2, state and revenue_band
+    """
+    entities = read_f1k_entities(**params)
+    companies = pd.DataFrame(
+        {
+            "company_instance_id": entities["company_instance_id"],
+            "company_name": entities["company_name"],
+            "sic2": sic2_codes(entities["company_sic"]),
+            "state": entities["company_state"],
+            "revenue_band": revenue_band(
+                entities["company_revenue_millions_usd"]
+            ).astype(str),
+        }
+    ).reset_index(drop=True)
+    model = run_query("model_entity_cohorts")[
+        ["run_id", "entity_name"] + ATTRIBUTES
+    ].reset_index(drop=True)
+    for df, column in [(companies, "company_name"), (model, "entity_name")]:
+        df["name"] = normalise_names(df[column])
+        df["sic2"] = df["sic2"].astype(float)
+    return companies, model
+
+
+def resolve_entities(
+    companies,
+    model,
+    threshold=MATCH_THRESHOLD,
+    min_name_similarity=MIN_NAME_SIMILARITY,
+):
+    """
+    match the fortune 1000 companies to the model entities
+
+    Parameters
+    ----------
+    companies, model : pd.DataFrame
+        output of entity_tables()
+    threshold : float, optional
+        lowest score of a match, by default MATCH_THRESHOLD
+    min_name_similarity : float, optional
+        lowest name similarity of a match, by default MIN_NAME_SIMILARITY
+
+    Returns
+    -------
+    pd.DataFrame
+        MATCH_COLUMNS, each company and model entity matched at most once
+    """
+    pairs = candidate_pairs(companies, model, BLOCKING_KEYS)
+    left_rows = pairs["left_row"].to_numpy(dtype=np.int64)
+    right_rows = pairs["right_row"].to_numpy(dtype=np.int64)
+    left, right = trigram_matrices(companies["name"], model["name"])
+    pairs["name_similarity"] = pair_similarity(left, right, left_rows, right_rows)
+    for attribute in ATTRIBUTES:
+        pairs[f"{attribute}_match"] = (
+            companies[attribute].to_numpy()[left_rows]
+            == model[attribute].to_numpy()[right_rows]
+        )
+    agreement = pairs[[f"{attribute}_match" for attribute in ATTRIBUTES]].mean(
+        axis="columns"
+    )
+    pairs["score"] = (
+        NAME_WEIGHT * pairs["name_similarity"] + (1 - NAME_WEIGHT) * agreement
+    )
+    pairs = pairs.loc[
+        (pairs["score"] >= threshold)
+        & (pairs["name_similarity"] >= min_name_similarity)
+    ]
+    pairs = pairs.assign(
+        company_instance_id=companies["company_instance_id"].to_numpy()[
+            pairs["left_row"]
+        ],
+        company_name=companies["company_name"].to_numpy()[pairs["left_row"]],
+        run_id=model["run_id"].to_numpy()[pairs["right_row"]],
+        entity_name=model["entity_name"].to_numpy()[pairs["right_row"]],
+    )
+    return one_to_one(pairs, "company_instance_id", "run_id")[MATCH_COLUMNS]
+
+
+def entity_matches(**params):
+    """
+    match table of the fortune 1000 companies and the model entities, stored per
+    fingerprint of both entity tables and the thresholds, and resolved again only when
+    one of them changes
+
+    Parameters
+    ----------
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    pd.DataFrame
+        MATCH_COLUMNS, see resolve_entities
+    """
+    companies, model = entity_tables(**params)
+    thresholds = pd.DataFrame(
+        {"score": [MATCH_THRESHOLD], "name_similarity": [MIN_NAME_SIMILARITY]}
+    )
+    digest = fingerprint(companies, model, thresholds)[:16]
+    path = datastore_path("entity_resolution", f"entity_matches_{digest}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    matches = resolve_entities(companies, model)
+    write_parquet(matches, path)
+    return matches
+
+
+def company_comparison(matches=None, year_range=(2010, 2020), **params):
+    """
+    annual event frequency of the model entity next to the observed events of the
+    matched fortune 1000 company
+
+    Parameters
+    ----------
+    matches : pd.DataFrame, optional
+        output of entity_matches(), loaded if None
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    pd.DataFrame
+        company_name, entity_name, score, observed_events, observed_frequency,
+        model_frequency and their ratio
+    """
+    if matches is None:
+        matches = entity_matches(**params)
+    n_years = year_range[1] - year_range[0] + 1
+    observed = (
+        read_f1k_table(year_range=year_range, **params)
+        .groupby("company_instance_id")
+        .size()
+        .rename("observed_events")
+    )
+    model = run_query("model_run_event_counts").set_index("run_id")["event_count"]
+    comparison = matches.join(observed, on="company_instance_id").join(
+        (model / simulation_years()).rename("model_frequency"), on="run_id"
+    )
+    comparison["observed_events"] = comparison["observed_events"].fillna(0)
+    comparison["observed_frequency"] = comparison["observed_events"] / n_years
+    comparison["frequency_ratio"] = (
+        comparison["observed_frequency"] / comparison["model_frequency"]
+    )
+    return comparison[
+        [
+            "company_name",
+            "entity_name",
+            "score",
+            "observed_events",
+            "observed_frequency",
+            "model_frequency",
+            "frequency_ratio",
+        ]
+    ]
@@ -0,0 +1,281 @@
+# deduplication of the incidents reported by both Advisen and VCDB:
+# both sources are reduced to victim name, industry (as SIC division), year and summary,
+# candidate pairs are blocked on victim and year or on industry and year and scored with
+# the trigram similarity of victim names and summaries; scored pairs are kept per row
+# hash of both sources, so a run only scores the rows added or changed since the last one
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  read_f1k_table,
+                                                  read_vcdb_events,
+                                                  write_parquet)
+from analytics_dashboards.common.record_linkage import (candidate_pairs,
+                                                        fingerprint,
+                                                        normalise_names,
+                                                        normalise_text,
+                                                        one_to_one,
+                                                        text_similarity)
+from analytics_dashboards.exposure_comparison import sic_division
+
+# two digit NAICS sectors of the VCDB victims -> SIC division of the Advisen companies
+NAICS_DIVISIONS = {
+    "11": "Agriculture",
+    "21": "Mining",
+    "22": "Utilities and Services",
+    "23": "Construction",
+    "31": "Manufacturing",
+    "32": "Manufacturing",
+    "33": "Manufacturing",
+    "42": "Wholesale Trade",
+    "44": "Retail Trade",
+    "45": "Retail Trade",
+    "48": "Utilities and Services",
+    "49": "Utilities and Services",
+    "51": "Services",
+    "52": "Finance, Insurance, And Real Estate",
+    "53": "Finance, Insurance, And Real Estate",
+    "54": "Services",
+    "55": "Services",
+    "56": "Services",
+    "61": "Services",
+    "62": "Services",
+    "71": "Services",
+    "72": "Services",
+    "81": "Services",
+    "92": "Public Administration",
+}
+
+# linkage columns of both sources, the row hash of these columns tells changed rows
+LINKAGE_COLUMNS = ["name", "industry", "year", "summary"]
+
+BLOCKING_KEYS = [["name", "year"], ["industry", "year"]]
+
+# shares of the score given by the victim name similarity, the summary similarity and
+# the industry agreement
+NAME_WEIGHT = 0.5
+SUMMARY_WEIGHT = 0.4
+INDUSTRY_WEIGHT = 0.1
+
+# lowest score of a duplicate
+MATCH_THRESHOLD = 0.75
+
+PAIR_COLUMNS = [
+    "event_id",
+    "incident_id",
+    "name_similarity",
+    "summary_similarity",
+    "industry_match",
+    "score",
+]
+
+
+def dedup_path(name):
+    """
+    returns the location of a file of the deduplication store
+    """
+    return datastore_path("event_dedup", name)
+
+
+def advisen_incidents():
+    """
+    fortune 1000 events of every year reduced to the linkage columns
+
+    Returns
+    -------
+    pd.DataFrame
+        event_id, LINKAGE_COLUMNS and the row_hash of the linkage columns
+    """
+    events = read_f1k_table(date_limits=False)
+    incidents = pd.DataFrame(
+        {
+            "event_id": events["event_id"].to_numpy(),
+            "name": normalise_names(events["company_name"]).to_numpy(),
+            "industry": sic_division(events["company_sic"]).to_numpy(),
+            "year": events["year_start"].to_numpy(dtype=float),
+            "summary": normalise_text(events["summary"]).to_numpy(),
+        }
+    )
+    return incidents.assign(row_hash=row_hashes(incidents))
+
+
+def vcdb_incidents():
+    """
+    every VCDB availability incident reduced to the linkage columns
+
+    Returns
+    -------
+    pd.DataFrame
+        incident_id, LINKAGE_COLUMNS and the row_hash of the linkage columns
+    """
+    vcdb = read_vcdb_events()
+    incidents = pd.DataFrame(
+        {
+            "incident_id": vcdb["incident_id"].to_numpy(),
+            "name": normalise_names(vcdb["victim_victim_id"]).to_numpy(),
+            "industry": vcdb["victim_industry"]
+            .astype(str)
+            .str[:2]
+            .map(NAICS_DIVISIONS)
+            .to_numpy(),
+            "year": vcdb["timeline_incident_year"].to_numpy(dtype=float),
+            "summary": normalise_text(vcdb["summary"]).to_numpy(),
+        }
+    )
+    return incidents.assign(row_hash=row_hashes(incidents))
+
+
+def row_hashes(incidents):
+    """
+    returns a hash per row of the linkage columns
+    """
+    return pd.util.hash_pandas_object(
+        incidents[LINKAGE_COLUMNS], index=False
+    ).to_numpy()
+
+
+def score_pairs(advisen, vcdb, threshold=MATCH_THRESHOLD):
+    """
+    score the blocked candidate pairs of Advisen events and VCDB incidents
+
+    Parameters
+    ----------
+    advisen, vcdb : pd.DataFrame
+        output of advisen_incidents() and vcdb_incidents(), or subsets of them
+    threshold : float, optional
+        lowest score of a kept pair, by default MATCH_THRESHOLD
+
+    Returns
+    -------
+    pd.DataFrame
+        PAIR_COLUMNS of the pairs scoring at least threshold
+    """
+    advisen = advisen.reset_index(drop=True)
+    vcdb = vcdb.reset_index(drop=True)
+    # victims without a name are only blocked on their industry
+    pairs = candidate_pairs(
+        advisen.replace({"name": {"": np.nan}}),
+        vcdb.replace({"name": {"": np.nan}}),
+        BLOCKING_KEYS,
+    )
+    if pairs.empty:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    left_rows = pairs["left_row"].to_numpy(dtype=np.int64)
+    right_rows = pairs["right_row"].to_numpy(dtype=np.int64)
+    pairs = pd.DataFrame(
+        {
+            "event_id": advisen["event_id"].to_numpy()[left_rows],
+            "incident_id": vcdb["incident_id"].to_numpy()[right_rows],
+            "name_similarity": text_similarity(
+                advisen["name"], vcdb["name"], left_rows, right_rows
+            ),
+            "summary_similarity": text_similarity(
+                advisen["summary"], vcdb["summary"], left_rows, right_rows
+            ),
+            "industry_match": advisen["industry"].to_numpy()[left_rows]
+            == vcdb["industry"].to_numpy()[right_rows],
+        }
+    )
+    pairs["score"] = (
+        NAME_WEIGHT * pairs["name_similarity"]
+        + SUMMARY_WEIGHT * pairs["summary_similarity"]
+        + INDUSTRY_WEIGHT * pairs["industry_match"]
+    )
+    return pairs.loc[pairs["score"] >= threshold, PAIR_COLUMNS].reset_index(drop=True)
+
+
+def split_scanned(incidents, id_column, scanned):
+    """
+    split the rows of a source into rows scanned by an earlier run and unchanged
+    since, and new or changed rows
+
+    Returns
+    -------
+    tuple
+        (unchanged rows, new or changed rows)
+    """
+    known = pd.MultiIndex.from_frame(scanned[[id_column, "row_hash"]])
+    unchanged = pd.MultiIndex.from_frame(incidents[[id_column, "row_hash"]]).isin(known)
+    return incidents.loc[unchanged], incidents.loc[~unchanged]
+
+
+def update_pairs(advisen, vcdb):
+    """
+    bring the stored scored pairs up to date with the current rows of both sources
+
+    pairs of rows that were removed or changed are dropped, then only the new or
+    changed rows of each source are scored against the rows of the other source
+
+    Parameters
+    ----------
+    advisen, vcdb : pd.DataFrame
+        output of advisen_incidents() and vcdb_incidents()
+
+    Returns
+    -------
+    pd.DataFrame
+        PAIR_COLUMNS of every pair scoring at least MATCH_THRESHOLD
+    """
+    pairs_path = dedup_path("pairs.parquet")
+    scanned_paths = {
+        "advisen": dedup_path("advisen_scanned.parquet"),
+        "vcdb": dedup_path("vcdb_scanned.parquet"),
+    }
+    if os.path.exists(pairs_path) and all(map(os.path.exists, scanned_paths.values())):
+        pairs = pd.read_parquet(pairs_path)
+        advisen_kept, advisen_new = split_scanned(
+            advisen, "event_id", pd.read_parquet(scanned_paths["advisen"])
+        )
+        vcdb_kept, vcdb_new = split_scanned(
+            vcdb, "incident_id", pd.read_parquet(scanned_paths["vcdb"])
+        )
+        pairs = pairs.loc[
+            pairs["event_id"].isin(advisen_kept["event_id"])
+            & pairs["incident_id"].isin(vcdb_kept["incident_id"])
+        ]
+    else:
+        pairs = pd.DataFrame(columns=PAIR_COLUMNS)
+        advisen_kept, advisen_new = advisen.iloc[:0], advisen
+        vcdb_kept, vcdb_new = vcdb.iloc[:0], vcdb
+    scored = [
+        pairs,
+        score_pairs(advisen, vcdb_new),
+        score_pairs(advisen_new, vcdb_kept),
+    ]
+    pairs = pd.concat([df for df in scored if len(df)] or [pairs], ignore_index=True)
+    # ordered by id so ties are matched alike by incremental and full runs
+    pairs = pairs.sort_values(["event_id", "incident_id"], ignore_index=True)
+    write_parquet(pairs, pairs_path)
+    write_parquet(advisen[["event_id", "row_hash"]], scanned_paths["advisen"])
+    write_parquet(vcdb[["incident_id", "row_hash"]], scanned_paths["vcdb"])
+    return pairs
+
+
+def event_duplicates():
+    """
+    Advisen events and VCDB incidents reporting the same incident, over every event
+    and the full VCDB availability table
+
+    the matches are stored per fingerprint of both sources and returned without any
+    scoring while the sources are unchanged, otherwise the stored pairs are updated
+    with the changed rows only, see update_pairs
+
+    Returns
+    -------
+    pd.DataFrame
+        PAIR_COLUMNS, each event and incident matched at most once
+    """
+    advisen = advisen_incidents()
+    vcdb = vcdb_incidents()
+    digest = fingerprint(
+        advisen[["event_id", "row_hash"]], vcdb[["incident_id", "row_hash"]]
+    )[:16]
+    path = dedup_path(f"duplicates_{digest}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    matches = one_to_one(update_pairs(advisen, vcdb), "event_id", "incident_id")
+    write_parquet(matches, path)
+    return matches
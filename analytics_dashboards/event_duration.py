@@ -1,22 +1,26 @@
 import numpy as np
 import pandas as pd
 
-from analytics_dashboards.common.get_data import (get_engine, read_f1k_table,
+from analytics_dashboards.common.get_data import (read_f1k_table,
                                                   read_vcdb_events)
+from analytics_dashboards.common.goodness_of_fit import (gof_table,
+                                                         model_distributions,
+                                                         sample_distribution)
+from analytics_dashboards.common.queries import iter_query, run_query
+from analytics_dashboards.common.sketches import (WEIGHT_UNIT, build_sketches,
+                                                  new_sketch,
+                                                  sketches_to_frame,
+                                                  stored_sketches, update)
+from analytics_dashboards.common.validation import validate
+from analytics_dashboards.event_dedup import event_duplicates
+from analytics_dashboards.exposure_comparison import entity_weights
 
 
 def model_duration_data():
     """
     returns the event duration from the model data
     """
-    query = """
-    select
-    event_duration/(60*24) as duration,
-    event_type as event_type
-    from
-    model_events
-    """
-    df = pd.read_sql(query, con=get_engine())
+    df = run_query("model_event_duration")
     df["source"] = "model"
     return df
 
@@ -78,7 +82,7 @@ def annotate_advisen_events():
     events["source"] = "Advisen"
     advisen_events = events.loc[
         events["annotated_availability_events"] == True,
-        ["availability_duration_days_fixed", "source"],
+        ["event_id", "availability_duration_days_fixed", "source"],
     ]
     return advisen_events
 
@@ -235,14 +239,20 @@ def annotate_vcdb_events():
     return vcdb_availability_duration_fixed
 
 
-def event_duration_plot_data():
+def events_duration_data(deduplicate=True):
     """
-    concatenates the model data to vcdb and advisen data
+    concatenates the annotated vcdb and advisen availability events
+
+    Parameters
+    ----------
+    deduplicate : bool, optional
+        drop the vcdb events reporting the same incident as one of the advisen events,
+        see event_dedup.event_duplicates, by default True
 
     Returns
     -------
     pd.DataFrame
-        data to be used for plotting
+        duration and source of the events
     """
     advisen_events = annotate_advisen_events()
     vcdb_events = annotate_vcdb_events()
@@ -256,11 +266,124 @@ def event_duration_plot_data():
                 left=2010, right=2020, inclusive="both"
             )
         ),
-        ["availability_duration_days", "source"],
+        ["incident_id", "availability_duration_days", "source"],
     ]
-    events_data = pd.concat([advisen_events, vcdb_events], ignore_index=True).rename(
-        columns={"availability_duration_days": "duration"}
-    )
+    if deduplicate:
+        duplicates = event_duplicates()
+        duplicates = duplicates.loc[
+            duplicates["event_id"].isin(advisen_events["event_id"]), "incident_id"
+        ]
+        vcdb_events = vcdb_events.loc[~vcdb_events["incident_id"].isin(duplicates)]
+    return pd.concat(
+        [
+            advisen_events.drop(columns="event_id"),
+            vcdb_events.drop(columns="incident_id"),
+        ],
+        ignore_index=True,
+    ).rename(columns={"availability_duration_days": "duration"})
+
+
+def event_duration_plot_data():
+    """
+    concatenates the model data to vcdb and advisen data
+
+    Returns
+    -------
+    pd.DataFrame
+        data to be used for plotting
+    """
+    events_data = events_duration_data()
     model_data = model_duration_data()[["duration", "source"]]
     plot_data = pd.concat([model_data, events_data], ignore_index=True)
     return plot_data
+
+
+def model_duration_sketches():
+    """
+    sketches of the model event duration, unweighted as "model" and weighted to the
+    events entity mix as "model reweighted", built in one pass over the streamed model
+    events and stored per model version
+
+    Returns
+    -------
+    pd.DataFrame
+        serialised sketches, see sketches_to_frame
+    """
+
+    def build():
+        weights = entity_weights().set_index("run_id")["weight"]
+        sketches = {
+            ("model",): new_sketch(),
+            ("model reweighted",): new_sketch(unit=WEIGHT_UNIT),
+        }
+        for chunk in iter_query("model_event_duration"):
+            chunk = validate(chunk, "model_event_duration", store=False)
+            update(sketches[("model",)], chunk["duration"])
+            update(
+                sketches[("model reweighted",)],
+                chunk["duration"],
+                chunk["run_id"].map(weights),
+            )
+        return sketches
+
+    return stored_sketches("model_duration_weighted", build, ["source"])
+
+
+def event_duration_sketches(events_data=None):
+    """
+    sketches of the event duration per source, the data behind the ecdf, box and
+    histogram plots
+
+    Parameters
+    ----------
+    events_data : pd.DataFrame, optional
+        already loaded output of events_duration_data(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        serialised sketches with source, value and weight columns
+    """
+    if events_data is None:
+        events_data = events_duration_data()
+    events = sketches_to_frame(
+        build_sketches([events_data], "duration", ["source"]), ["source"]
+    )
+    return pd.concat([model_duration_sketches(), events], ignore_index=True)
+
+
+def duration_gof_data(plot_data=None, model=None):
+    """
+    goodness of fit of the model event duration to the Advisen and VCDB durations
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame, optional
+        already loaded output of events_duration_data() or event_duration_plot_data(),
+        loaded if None
+    model : dict, optional
+        already loaded output of model_distributions(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        goodness of fit statistics per source
+    """
+    if plot_data is None:
+        plot_data = events_duration_data()
+    if model is None:
+        model = model_distributions()
+    return gof_table(
+        [
+            (
+                "duration",
+                source,
+                model["duration"],
+                sample_distribution(df["duration"]),
+                False,
+            )
+            for source, df in plot_data.loc[plot_data["source"] != "model"].groupby(
+                "source"
+            )
+        ]
+    )
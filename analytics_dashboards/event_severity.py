@@ -1,6 +1,12 @@
 import pandas as pd
 
-from analytics_dashboards.common.get_data import get_engine, read_f1k_table
+from analytics_dashboards.common.bootstrap import bootstrap_ci
+from analytics_dashboards.common.get_data import read_f1k_table
+from analytics_dashboards.common.goodness_of_fit import (gof_table,
+                                                         model_distributions,
+                                                         sample_distribution)
+from analytics_dashboards.common.queries import run_query
+from analytics_dashboards.exposure_comparison import entity_weights
 
 
 def events_data():
@@ -22,6 +28,7 @@ def events_data():
     )
     df_events["event_impact"] = df_events["total_cost_millions_usd"] * 1e6
     df_events["source"] = "events"
+    df_events["weight"] = 1.0
     return df_events
 
 
@@ -32,29 +39,13 @@ def model_data():
     Returns
     -------
     pd.DataFrame
-        event severity data from the model
-    """
-    query = """
-    select
-        model_events.run_id::text as entity,
-        model_entities.revenue_band,
-        model_events.confidentiality,
-        model_events.targeted_event_type,
-        gu_mean as event_impact,
-        event_type as event_type,
-        gu_bi_ratio * gu_mean as gu_bi,
-        gu_contingent_bi_ratio * gu_mean as gu_cbi,
-        gu_extortion_ratio * gu_mean as gu_extortion,
-        gu_liability_ratio * gu_mean as gu_liability,
-        gu_privacy_ratio * gu_mean as gu_privacy,
-        gu_regulatory_ratio * gu_mean as gu_regulatory
-    from
-        model_events
-    join
-        model_entities
-        on model_entities.run_id = model_events.run_id
-    """
-    df_model = pd.read_sql(query, con=get_engine())
+        event severity data from the model, weighted to the events entity mix,
+        see exposure_comparison.entity_weights
+    """
+    df_model = run_query("model_event_severity")
+    weights = entity_weights().set_index("run_id")["weight"]
+    weights.index = weights.index.astype(str)
+    df_model["weight"] = df_model["entity"].map(weights).fillna(0)
     df_model["source"] = "model"
     return df_model
 
@@ -90,36 +81,150 @@ def join_datasets():
     """
     df_events = events_data().copy()
     df_model = aggregate_model_event_types().copy()
-    common_cols = ["event_impact", "source"]
+    common_cols = ["event_impact", "source", "weight"]
     joined_data = pd.concat(
         [
             df_events.loc[df_events["impact_type_confidentiality"] == True][
                 common_cols
             ],
-            df_model.loc[df_model["confidentiality"] == 1][common_cols],
+            df_model.loc[df_model["confidentiality"] == 1][common_cols + ["entity"]],
         ],
         sort=False,
     ).reset_index()
     return joined_data
 
 
-def overall_severity_plot_data():
+def severity_ci_data(joined_data=None, **kwargs):
+    """
+    bootstrap confidence intervals of the mean, median and tail quantiles of the
+    confidentiality event impact, the mean of the model resamples whole runs
+
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already loaded output of join_datasets(), loaded from the database if None
+    **kwargs
+        passed to bootstrap_ci
+
+    Returns
+    -------
+    pd.DataFrame
+        source, statistic, estimate, lower and upper bound
+    """
+    if joined_data is None:
+        joined_data = join_datasets()
+    frames = []
+    for source, group in joined_data.groupby("source"):
+        ci = bootstrap_ci(
+            group["event_impact"],
+            statistics=("mean", "median", "q90", "q99"),
+            clusters=group["entity"] if source == "model" else None,
+            **kwargs,
+        )
+        frames.append(ci.assign(source=source))
+    return pd.concat(frames, ignore_index=True)
+
+
+def severity_gof_data(joined_data=None, cost_data=None, model=None):
+    """
+    goodness of fit of the model to the events confidentiality event impact and the
+    positive values of each cost component
+
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already loaded output of join_datasets(), loaded from the database if None
+    cost_data : pd.DataFrame, optional
+        already loaded output of join_cost_component_datasets(), loaded if None
+    model : dict, optional
+        already loaded output of model_distributions(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        goodness of fit statistics per measure
+    """
+    if joined_data is None:
+        joined_data = join_datasets()
+    if cost_data is None:
+        cost_data = join_cost_component_datasets()
+    if model is None:
+        model = model_distributions()
+    events_impact = joined_data.loc[joined_data["source"] == "events", "event_impact"]
+    comparisons = [
+        (
+            "event_impact",
+            "events",
+            model["event_impact"],
+            sample_distribution(events_impact),
+            True,
+        )
+    ]
+    events_costs = cost_data.loc[cost_data["source"] == "events"]
+    for column in [
+        "gu_liability",
+        "gu_regulatory",
+        "gu_privacy",
+        "gu_bi",
+        "gu_extortion",
+    ]:
+        costs = events_costs[column]
+        comparisons.append(
+            (
+                column,
+                "events",
+                model[column],
+                sample_distribution(costs[costs > 0]),
+                True,
+            )
+        )
+    return gof_table(comparisons)
+
+
+def filter_impact_range(df, param, minimum, limit):
+    """
+    keep the rows of a severity dataset that fall within an impact range
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        severity dataset
+    param : str
+        column containing the impact values
+    minimum : float
+        exclusive lower bound of the impact
+    limit : float
+        inclusive upper bound of the impact
+
+    Returns
+    -------
+    pd.DataFrame
+        filtered severity dataset
+    """
+    return df.loc[(df[param] <= limit) & (df[param] > minimum)]
+
+
+def overall_severity_plot_data(minimum=1_000_000, limit=100_000_000, joined_data=None):
     """
     generate overall severity plot data
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the event impact, by default 1_000_000
+    limit : float, optional
+        inclusive upper bound of the event impact, by default 100_000_000
+    joined_data : pd.DataFrame, optional
+        already loaded output of join_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         overall severity plot data
     """
-    minimum = 1_000_000
-    limit = 100_000_000
-    bins = 30
-    plot_data = join_datasets().copy()
-    plot_data = plot_data.loc[
-        (plot_data["event_impact"] <= limit) & (plot_data["event_impact"] > minimum)
-    ]
-    return plot_data
+    if joined_data is None:
+        joined_data = join_datasets()
+    return filter_impact_range(joined_data, "event_impact", minimum, limit)
 
 
 def cost_components():
@@ -175,6 +280,7 @@ def join_cost_component_datasets():
                     "gu_extortion",
                     "gu_privacy",
                     "source",
+                    "weight",
                 ]
             ].reset_index(),
             df_events_TP[
@@ -185,6 +291,7 @@ def join_cost_component_datasets():
                     "gu_extortion",
                     "gu_privacy",
                     "source",
+                    "weight",
                 ]
             ].reset_index(),
         ],
@@ -193,100 +300,119 @@ def join_cost_component_datasets():
     return df_costs
 
 
-def liability_costs():
+def liability_costs(minimum=1_000_000, limit=100_000_000, cost_data=None):
     """
     generate liability costs plot data
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the cost, by default 1_000_000
+    limit : float, optional
+        inclusive upper bound of the cost, by default 100_000_000
+    cost_data : pd.DataFrame, optional
+        already loaded output of join_cost_component_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         liability costs dataset
     """
-    minimum = 1_000_000
-    limit = 100_000_000
-    liability_costs_data = join_cost_component_datasets().copy()
-    param = "gu_liability"
-    plot_data = liability_costs_data.loc[
-        (liability_costs_data[param] <= limit) & (liability_costs_data[param] > minimum)
-    ]
-    return plot_data
+    if cost_data is None:
+        cost_data = join_cost_component_datasets()
+    return filter_impact_range(cost_data, "gu_liability", minimum, limit)
 
 
-def regulatory_costs():
+def regulatory_costs(minimum=100_000, limit=100_000_000, cost_data=None):
     """
     generate regulatory costs plot data
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the cost, by default 100_000
+    limit : float, optional
+        inclusive upper bound of the cost, by default 100_000_000
+    cost_data : pd.DataFrame, optional
+        already loaded output of join_cost_component_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         regulatory costs dataset
     """
-    minimum = 100_000
-    limit = 100_000_000
-    regulatory_costs_data = join_cost_component_datasets().copy()
-    param = "gu_regulatory"
-    plot_data = regulatory_costs_data.loc[
-        (regulatory_costs_data[param] <= limit)
-        & (regulatory_costs_data[param] > minimum)
-    ]
-    return plot_data
+    if cost_data is None:
+        cost_data = join_cost_component_datasets()
+    return filter_impact_range(cost_data, "gu_regulatory", minimum, limit)
 
 
-def privacy_costs():
+def privacy_costs(minimum=100_000, limit=100_000_000, cost_data=None):
     """
     generate privacy costs plot data
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the cost, by default 100_000
+    limit : float, optional
+        inclusive upper bound of the cost, by default 100_000_000
+    cost_data : pd.DataFrame, optional
+        already loaded output of join_cost_component_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         privacy costs dataset
     """
-    minimum = 100_000
-    limit = 100_000_000
-    privacy_costs_data = join_cost_component_datasets().copy()
-    param = "gu_privacy"
-    plot_data = privacy_costs_data.loc[
-        (privacy_costs_data[param] <= limit) & (privacy_costs_data[param] > minimum)
-    ]
-    return plot_data
+    if cost_data is None:
+        cost_data = join_cost_component_datasets()
+    return filter_impact_range(cost_data, "gu_privacy", minimum, limit)
 
 
-def bi_costs():
+def bi_costs(minimum=100_000, limit=100_000_000, cost_data=None):
     """
     generate business interruption costs plot data
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the cost, by default 100_000
+    limit : float, optional
+        inclusive upper bound of the cost, by default 100_000_000
+    cost_data : pd.DataFrame, optional
+        already loaded output of join_cost_component_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         business interruption costs dataset
     """
-    minimum = 100_000
-    limit = 100_000_000
-    bi_costs_data = join_cost_component_datasets().copy()
-    param = "gu_bi"
-    plot_data = bi_costs_data.loc[
-        (bi_costs_data[param] <= limit) & (bi_costs_data[param] > minimum)
-    ]
-    return plot_data
+    if cost_data is None:
+        cost_data = join_cost_component_datasets()
+    return filter_impact_range(cost_data, "gu_bi", minimum, limit)
 
 
-def extortion_costs():
+def extortion_costs(minimum=100_000, limit=100_000_000, cost_data=None):
     """
     generate extortion costs plot data
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the cost, by default 100_000
+    limit : float, optional
+        inclusive upper bound of the cost, by default 100_000_000
+    cost_data : pd.DataFrame, optional
+        already loaded output of join_cost_component_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         extortion costs dataset
     """
-    minimum = 100_000
-    limit = 100_000_000
-    extortion_costs_data = join_cost_component_datasets().copy()
-    param = "gu_extortion"
-    plot_data = extortion_costs_data.loc[
-        (extortion_costs_data[param] <= limit) & (extortion_costs_data[param] > minimum)
-    ]
-    return plot_data
+    if cost_data is None:
+        cost_data = join_cost_component_datasets()
+    return filter_impact_range(cost_data, "gu_extortion", minimum, limit)
 
 
 def model_cost_split():
@@ -309,27 +435,33 @@ def model_cost_split():
             "gu_privacy",
             "gu_regulatory",
             "event_impact",
+            "weight",
         ]
     ]
     df_model_cost = df_model_cost.melt(
-        id_vars="index", var_name="cost_component", value_name="value"
+        id_vars=["index", "weight"], var_name="cost_component", value_name="value"
     )
     return df_model_cost
 
 
-def model_cost_plot_data():
+def model_cost_plot_data(minimum=1_000_000, limit=100_000_000, model_cost_data=None):
     """
     generate plot data for model costs split
 
+    Parameters
+    ----------
+    minimum : float, optional
+        exclusive lower bound of the cost, by default 1_000_000
+    limit : float, optional
+        inclusive upper bound of the cost, by default 100_000_000
+    model_cost_data : pd.DataFrame, optional
+        already loaded output of model_cost_split(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         model costs split plot data
     """
-    minimum = 1_000_000
-    limit = 100_000_000
-    plot_data = model_cost_split().copy()
-    plot_data = plot_data.loc[
-        (plot_data["value"] <= limit) & (plot_data["value"] > minimum)
-    ]
-    return plot_data
+    if model_cost_data is None:
+        model_cost_data = model_cost_split()
+    return filter_impact_range(model_cost_data, "value", minimum, limit)
@@ -1,92 +1,146 @@
 import pandas as pd
 
-from analytics_dashboards.common.get_data import get_engine, read_f1k_table
-
-
-def model_version():
-    """
-    get the model version number
-
-    Returns
-    -------
-    str
-        model version number
-    """
-    query = """
-    select 
-    value 
-    from 
-    model_metadata 
-    where item = 'model_version'
+from analytics_dashboards.common.bootstrap import grouped_bootstrap_ci
+from analytics_dashboards.common.f1k_sync import event_counts, store_entities
+from analytics_dashboards.common.model_cube import rollup
+from analytics_dashboards.common.queries import F1K_DEFAULTS, run_query
+from analytics_dashboards.common.sketches import (build_sketches,
+                                                  sketches_to_frame)
+from analytics_dashboards.exposure_comparison import (entity_weights,
+                                                      simulation_years)
+
+
+def events_data(
+    revenue_floor=F1K_DEFAULTS["revenue_floor"], year_range=F1K_DEFAULTS["year_range"]
+):
     """
-    model_version = pd.read_sql(query, con=get_engine())
-    model_version = model_version.iloc[0][0]
-    return model_version
-
+    get the frequency of annual events per fortune 1000 entity from Advisen, counted
+    from the synced aggregates
 
-def events_data():
-    """
-    get the frequency of annual events from Advisen
+    Parameters
+    ----------
+    revenue_floor : int, optional
+        minimum company revenue in millions of USD, by default 2000
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
 
     Returns
     -------
     pd.DataFrame
         frequency of annual events from Advisen
     """
-
-    df_events = read_f1k_table()
-    df_events["year"] = df_events["event_start_date"].dt.year
-    df_events = (
-        (df_events.groupby("year").agg({"event_id": "count"}) / 1000)
-        .rename({"event_id": "frequency"}, axis="columns")
-        .reset_index()
+    df_events = event_counts(["year_start"], revenue_floor, year_range)
+    n_entities = len(store_entities(revenue_floor))
+    df_events = pd.DataFrame(
+        {
+            "year": df_events["year_start"],
+            "frequency": df_events["event_count"] / n_entities,
+        }
     )
     df_events["source"] = "events"
+    df_events["weight"] = 1.0
     return df_events
 
 
 def model_data():
     """
-    get the event frequency data from the model
+    get the annual event frequency of each model entity, one run per entity
 
     Returns
     -------
     pd.DataFrame
-        event frequency data from the model
-    """
-    query = """
-        select
-        run_id::text as entity,
-        count(*)::float/10000 as frequency,
-        'Model_events' as source
-    from
-        model_events
-    group by run_id::text
-    """
-    df_model = pd.read_sql(query, con=get_engine())
-    return df_model
+        event frequency data from the model, with the weight of each entity,
+        see exposure_comparison.entity_weights
+    """
+    df_model = rollup(["run_id"]).merge(entity_weights(), on="run_id", how="left")
+    df_model["weight"] = df_model["weight"].fillna(0)
+    df_model["entity"] = df_model["run_id"].astype(str)
+    df_model["frequency"] = df_model["event_count"] / simulation_years()
+    df_model["source"] = "Model_events"
+    return df_model[["entity", "frequency", "source", "weight"]]
 
 
-def box_plot_data():
+def box_plot_data(df_events=None, df_model=None):
     """
     join event data to model data with aggregated event types
 
+    Parameters
+    ----------
+    df_events : pd.DataFrame, optional
+        already loaded output of events_data(), loaded if None
+    df_model : pd.DataFrame, optional
+        already loaded output of model_data(), loaded if None
+
     Returns
     -------
     pd.DataFrame
         joined events and model datasets
     """
-    df_events = events_data().copy()
-    df_model = model_data().copy()
+    if df_events is None:
+        df_events = events_data()
+    if df_model is None:
+        df_model = model_data()
     df_plot = pd.concat(
         [
-            df_events[["year", "frequency", "source"]],
-            df_model[["entity", "frequency", "source"]],
+            df_events[["year", "frequency", "source", "weight"]],
+            df_model[["entity", "frequency", "source", "weight"]],
         ]
     )
     return df_plot
 
 
+def box_plot_sketches(plot_data=None):
+    """
+    sketches of the annual frequency per source, the data behind the frequency box plot
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame, optional
+        already loaded output of box_plot_data(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        serialised sketches with source, value and weight columns, the model is
+        sketched a second time as "<source> reweighted" with the entity weights
+    """
+    if plot_data is None:
+        plot_data = box_plot_data()
+    sketches = build_sketches([plot_data], "frequency", ["source"])
+    model = plot_data.loc[plot_data["source"] != "events"]
+    reweighted = build_sketches(
+        [model.assign(source=model["source"] + " reweighted")],
+        "frequency",
+        ["source"],
+        weight_column="weight",
+    )
+    return sketches_to_frame({**sketches, **reweighted}, ["source"])
+
+
+def frequency_ci_data(plot_data=None, **kwargs):
+    """
+    bootstrap confidence intervals of the mean and median annual frequency of the
+    events years and the model entities
+
+    Parameters
+    ----------
+    plot_data : pd.DataFrame, optional
+        already loaded output of box_plot_data(), loaded if None
+    **kwargs
+        passed to bootstrap_ci
+
+    Returns
+    -------
+    pd.DataFrame
+        source, statistic, estimate, lower and upper bound
+    """
+    if plot_data is None:
+        plot_data = box_plot_data()
+    return grouped_bootstrap_ci(
+        plot_data, "frequency", statistics=("mean", "median"), **kwargs
+    )
+
+
 def model_data_by_cost_component():
     """
     get the event frequency by cost component from the model
@@ -94,21 +148,18 @@ def model_data_by_cost_component():
     Returns
     -------
     pd.DataFrame
-        event frequency data from the model by cost component
-    """
-    query = """
-        select
-        confidentiality,
-        availability,
-        integrity,
-        extortion
-        event_type,
-        targeted_event_type,
-        1 as count
-    from
-        model_events
-    """
-    df_model = pd.read_sql(query, con=get_engine())
+        event frequency data from the model by cost component, count holds the number of events
+    """
+    df_model = rollup(
+        [
+            "confidentiality",
+            "availability",
+            "integrity",
+            "extortion",
+            "event_type",
+            "targeted_event_type",
+        ]
+    ).rename({"event_count": "count"}, axis="columns")
     return df_model
 
 
@@ -121,17 +172,7 @@ def event_data_by_cost_component():
     pd.DataFrame
         event frequency data from Advisen by cost component
     """
-    query = """
-    select
-        impact_type_confidentiality,
-        impact_type_availability,
-        impact_type_integrity,
-        event_type,
-        1 as count
-    from
-        data_sources_events
-    """
-    df_events = pd.read_sql(query, con=get_engine())
+    df_events = run_query("event_cost_components")
     return df_events
 
 
@@ -320,7 +361,7 @@ def build_sankey(index_cols, target_col, df):
 def confidentiality_model_sankey_plot_data(
     index_cols=["confidentiality", "targeted_event_type"],
     target_col="count",
-    df=model_labels(),
+    df=None,
 ):
     """
     generate data to use for the model confidentiality sankey plot
@@ -332,13 +373,15 @@ def confidentiality_model_sankey_plot_data(
     target_col : str, optional
        field to use as the target , by default 'count'
     df : pd.DataFrame, optional
-        dataframe with model labels, by default model_labels()
+        dataframe with model labels, model_labels() if None
 
     Returns
     -------
     tuple
         tuple of processed dataframe and dictionary of labels
     """
+    if df is None:
+        df = model_labels()
     df_links, label_dict = build_sankey(index_cols, target_col, df)
     return df_links, label_dict
 
@@ -346,7 +389,7 @@ def confidentiality_model_sankey_plot_data(
 def confidentiality_events_sankey_plot_data(
     index_cols=["impact_type_confidentiality", "event_type"],
     target_col="count",
-    df=map_event_types(),
+    df=None,
 ):
     """
     generate data to use for the event confidentiality sankey plot
@@ -358,13 +401,15 @@ def confidentiality_events_sankey_plot_data(
     target_col : str, optional
        field to use as the target, by default 'count'
     df : pd.DataFrame, optional
-        dataframe with model labels, by default map_event_types()
+        dataframe with model labels, map_event_types() if None
 
     Returns
     -------
     tuple
         tuple of processed dataframe and dictionary of labels
     """
+    if df is None:
+        df = map_event_types()
     df_links, label_dict = build_sankey(index_cols, target_col, df)
     return df_links, label_dict
 
@@ -372,7 +417,7 @@ def confidentiality_events_sankey_plot_data(
 def confidentiality_model_cia_sankey_plot_data(
     index_cols=["confidentiality", "availability", "integrity"],
     target_col="count",
-    df=model_cia(),
+    df=None,
 ):
     """
       generate data to use for the model cia confidentiality sankey plot
@@ -384,13 +429,15 @@ def confidentiality_model_cia_sankey_plot_data(
      target_col : str, optional
          field to use as the target, by default "count"
      df : pd.DataFrame, optional
-         dataframe with model labels, by default model_cia()
+         dataframe with model labels, model_cia() if None
 
      Returns
      -------
     tuple
          tuple of processed dataframe and dictionary of labels
     """
+    if df is None:
+        df = model_cia()
     df_links, label_dict = build_sankey(index_cols, target_col, df)
     return df_links, label_dict
 
@@ -402,7 +449,7 @@ def confidentiality_events_cia_sankey_plot_data(
         "impact_type_integrity",
     ],
     target_col="count",
-    df=events_cia(),
+    df=None,
 ):
     """
       generate data to use for the events cia confidentiality sankey plot
@@ -414,13 +461,15 @@ def confidentiality_events_cia_sankey_plot_data(
      target_col : str, optional
          field to use as the target, by default "count"
      df : pd.DataFrame, optional
-         dataframe with model labels, by default events_cia()
+         dataframe with model labels, events_cia() if None
 
      Returns
      -------
     tuple
          tuple of processed dataframe and dictionary of labels
     """
+    if df is None:
+        df = events_cia()
     df_links, label_dict = build_sankey(index_cols, target_col, df)
     return df_links, label_dict
 
@@ -435,7 +484,10 @@ def model_cia_barplot_data():
         dataframe with normalized model cia data
     """
     df_model = model_data_by_cost_component().copy()
-    cia_bar_model = df_model[
-        ["confidentiality", "availability", "integrity"]
-    ].sum() / len(df_model)
+    cia_bar_model = (
+        df_model[["confidentiality", "availability", "integrity"]]
+        .mul(df_model["count"], axis="index")
+        .sum()
+        / df_model["count"].sum()
+    )
     return cia_bar_model
@@ -1,25 +1,31 @@
 import pandas as pd
 
-from analytics_dashboards.common.get_data import get_engine, read_f1k_table
+from analytics_dashboards.common.f1k_sync import event_counts
+from analytics_dashboards.common.model_cube import rollup
+from analytics_dashboards.common.queries import F1K_DEFAULTS
 
 
-def events_data():
+def events_data(
+    revenue_floor=F1K_DEFAULTS["revenue_floor"], year_range=F1K_DEFAULTS["year_range"]
+):
     """
-    get the count of events by year from Advisen
+    get the count of events by year from Advisen, counted from the synced aggregates
+
+    Parameters
+    ----------
+    revenue_floor : int, optional
+        minimum company revenue in millions of USD, by default 2000
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
 
     Returns
     -------
     pd.DataFrame
         count of events by year
     """
-    df_events = read_f1k_table()
-    df_events["year"] = df_events["event_start_date"].dt.year
-    df_events_byyear = (
-        df_events.groupby(["year", "company_name"])
-        .agg({"event_id": "count"})
-        .reset_index()
-    )
-    df_events_byyear.rename({"event_id": "no_events"}, axis="columns", inplace=True)
+    df_events_byyear = event_counts(
+        ["year_start", "company_name"], revenue_floor, year_range
+    ).rename({"year_start": "year", "event_count": "no_events"}, axis="columns")
     df_events_byyear["source"] = "events"
     return df_events_byyear
 
@@ -33,48 +39,59 @@ def model_data():
     pd.DataFrame
         count of events by year
     """
-    query = """
-    select
-    year_x as year,
-    run_id::text as company_name,
-    count(*)::float as no_events,
-    'model' as source
-    from 
-    model_events
-    group by run_id::text, year_x
-    """
-    df_model_byyear = pd.read_sql(query, con=get_engine())
+    df_model_byyear = rollup(["year_x", "run_id"]).rename(
+        {"year_x": "year", "run_id": "company_name", "event_count": "no_events"},
+        axis="columns",
+    )
+    df_model_byyear["company_name"] = df_model_byyear["company_name"].astype(str)
+    df_model_byyear["no_events"] = df_model_byyear["no_events"].astype(float)
+    df_model_byyear["source"] = "model"
     return df_model_byyear
 
 
-def join_datasets():
+def join_datasets(df_model=None, df_events=None):
     """
     joined event and model data
 
+    Parameters
+    ----------
+    df_model : pd.DataFrame, optional
+        already loaded output of model_data(), loaded from the database if None
+    df_events : pd.DataFrame, optional
+        already loaded output of events_data(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         returns the joined event and model dataset
     """
-    df_model = model_data()
-    df_events = events_data()
+    if df_model is None:
+        df_model = model_data()
+    if df_events is None:
+        df_events = events_data()
     joined_data = pd.concat([df_model, df_events]).reset_index()
     joined_data["no_events"] = joined_data["no_events"].astype(int)
     return joined_data
 
 
-def events_per_year_plot_data():
+def events_per_year_plot_data(joined_data=None):
     """
     generate count fo events plot data
 
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already loaded output of join_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         events per year plot data
     """
+    if joined_data is None:
+        joined_data = join_datasets()
     df_by_year_summary = (
-        join_datasets()
-        .groupby(["source", "no_events"])
+        joined_data.groupby(["source", "no_events"])
         .agg({"company_name": "count"})
         .reset_index()
     )
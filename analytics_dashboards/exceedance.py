@@ -0,0 +1,345 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  filter_f1k_table,
+                                                  model_version,
+                                                  read_f1k_table,
+                                                  write_parquet)
+from analytics_dashboards.common.queries import run_query
+from analytics_dashboards.exposure_comparison import (exposure_totals,
+                                                      simulation_years)
+
+RETURN_PERIODS = [2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+# simulation years aggregated per query, bounds the memory used by the engine
+CHUNK_YEARS = 1000
+
+# log-spaced loss bin edges in USD used for the pooled exceedance curves
+LOSS_BINS = np.logspace(3, 12, 9 * 20 + 1)
+
+LOSS_COLUMNS = {"aep": "aggregate_loss", "oep": "occurrence_loss"}
+
+# version of the stored model results, raised when their computation changes
+RESULTS_FORMAT = 2
+
+# exceedance results already loaded in this process, keyed by model version
+_results = {}
+
+
+def loss_histogram(losses):
+    """
+    count losses per LOSS_BINS bin, losses above the last edge are counted in the last bin
+    and losses below the first edge are dropped, as they exceed none of the edges
+
+    Parameters
+    ----------
+    losses : array-like
+        losses in USD
+
+    Returns
+    -------
+    np.ndarray
+        count per bin
+    """
+    losses = np.asarray(losses, dtype=float)
+    losses = losses[losses >= LOSS_BINS[0]]
+    bins = np.searchsorted(LOSS_BINS, losses, side="right") - 1
+    bins = np.minimum(bins, len(LOSS_BINS) - 2)
+    return np.bincount(bins, minlength=len(LOSS_BINS) - 1)
+
+
+def top_losses(df, column, k):
+    """
+    keep the k largest annual losses of each run
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        annual losses with a run_id column
+    column : str
+        loss column
+    k : int
+        number of losses kept per run
+
+    Returns
+    -------
+    pd.DataFrame
+        run_id and loss, sorted by run and descending loss
+    """
+    df = df[["run_id", column]].sort_values(
+        ["run_id", column], ascending=[True, False], ignore_index=True
+    )
+    return df.loc[df.groupby("run_id").cumcount() < k]
+
+
+def return_period_losses(
+    top, column, n_years, return_periods=RETURN_PERIODS, run_ids=None
+):
+    """
+    loss of each run at each return period, the n_years / return_period largest annual loss
+
+    Parameters
+    ----------
+    top : pd.DataFrame
+        largest annual losses per run as returned by top_losses
+    column : str
+        loss column
+    n_years : int
+        simulated years per run
+    return_periods : list, optional
+        return periods in years, by default RETURN_PERIODS
+    run_ids : array-like, optional
+        every run, runs without losses get 0 losses, by default the runs of top
+
+    Returns
+    -------
+    pd.DataFrame
+        run_id, return_period and loss, 0 when the run has fewer loss years than the rank
+    """
+    top = top.assign(rank=top.groupby("run_id").cumcount() + 1)
+    ranks = pd.DataFrame(
+        {
+            "return_period": return_periods,
+            "rank": [max(n_years // rp, 1) for rp in return_periods],
+        }
+    )
+    if run_ids is None:
+        run_ids = top["run_id"].unique()
+    grid = pd.MultiIndex.from_product(
+        [run_ids, ranks["return_period"]],
+        names=["run_id", "return_period"],
+    ).to_frame(index=False)
+    grid = grid.merge(ranks, on="return_period")
+    losses = grid.merge(top, on=["run_id", "rank"], how="left")
+    losses[column] = losses[column].fillna(0)
+    return losses[["run_id", "return_period", column]]
+
+
+def compute_model_exceedance(n_years=None, chunk_years=CHUNK_YEARS, run_ids=None):
+    """
+    aggregate and occurrence exceedance statistics from model_events, the simulation
+    years are aggregated by the database in chunks and merged
+
+    Parameters
+    ----------
+    n_years : int, optional
+        simulated years per run, by default the largest year_x of model_events
+    chunk_years : int, optional
+        simulation years per chunk, by default CHUNK_YEARS
+    run_ids : array-like, optional
+        every model run, by default the runs of model_entities; runs without any
+        event count as run-years without loss
+
+    Returns
+    -------
+    dict
+        curves: pooled exceedance probability per loss bin edge,
+        return_periods: aep and oep loss per run and return period,
+        aal: average annual loss per run
+    """
+    if n_years is None:
+        n_years = simulation_years()
+    if run_ids is None:
+        run_ids = run_query("model_run_ids")["run_id"]
+    run_ids = pd.Index(run_ids).unique()
+    k = n_years // min(RETURN_PERIODS)
+    histograms = {
+        curve: np.zeros(len(LOSS_BINS) - 1, dtype=np.int64) for curve in LOSS_COLUMNS
+    }
+    tops = {curve: [] for curve in LOSS_COLUMNS}
+    totals = []
+    for first in range(1, n_years + 1, chunk_years):
+        last = min(first + chunk_years - 1, n_years)
+        chunk = run_query("model_annual_losses", cached=False, year_range=(first, last))
+        totals.append(chunk.groupby("run_id")["aggregate_loss"].sum())
+        for curve, column in LOSS_COLUMNS.items():
+            histograms[curve] += loss_histogram(chunk[column])
+            tops[curve] = [top_losses(pd.concat(tops[curve] + [chunk]), column, k)]
+
+    totals = pd.concat(totals).groupby(level=0).sum()
+    # runs without any event have no annual loss rows but count with zero losses
+    run_ids = run_ids.append(totals.index).unique()
+    aal = (
+        totals.reindex(run_ids, fill_value=0)
+        .div(n_years)
+        .rename("aal")
+        .rename_axis("run_id")
+        .reset_index()
+    )
+    n_run_years = len(run_ids) * n_years
+    curves = pd.DataFrame({"loss": LOSS_BINS[:-1]})
+    for curve, histogram in histograms.items():
+        # share of run-years with a loss in or above each bin, years without events count as no loss
+        curves[curve] = histogram[::-1].cumsum()[::-1] / n_run_years
+    return_periods = return_period_losses(
+        tops["aep"][0], "aggregate_loss", n_years, run_ids=run_ids
+    ).merge(
+        return_period_losses(
+            tops["oep"][0], "occurrence_loss", n_years, run_ids=run_ids
+        ),
+        on=["run_id", "return_period"],
+    )
+    return {"curves": curves, "return_periods": return_periods, "aal": aal}
+
+
+def exceedance_path(version, name):
+    """
+    returns the location of a stored exceedance result for a model version
+    """
+    return datastore_path("exceedance", f"{name}_{version}_{RESULTS_FORMAT}.parquet")
+
+
+def model_exceedance():
+    """
+    get the model exceedance statistics for the current model version, computed on first use
+
+    Returns
+    -------
+    dict
+        curves, return_periods and aal as returned by compute_model_exceedance
+    """
+    version = model_version()
+    if version not in _results:
+        paths = {
+            name: exceedance_path(version, name)
+            for name in ["curves", "return_periods", "aal"]
+        }
+        if all(os.path.exists(path) for path in paths.values()):
+            _results[version] = {
+                name: pd.read_parquet(path) for name, path in paths.items()
+            }
+        else:
+            results = compute_model_exceedance()
+            for name, df in results.items():
+                write_parquet(df, paths[name])
+            _results[version] = results
+    return _results[version]
+
+
+def events_exceedance(df_events=None, n_companies=None, year_range=(2010, 2020)):
+    """
+    empirical exceedance statistics of the fortune 1000 company-years from Advisen
+
+    Parameters
+    ----------
+    df_events : pd.DataFrame, optional
+        already loaded fortune 1000 events table, read from the database if None
+    n_companies : int, optional
+        number of companies in the cohort, by default the fortune 1000 entity count
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
+
+    Returns
+    -------
+    dict
+        curves: exceedance probability per loss bin edge,
+        return_periods: aep and oep loss per return period over all company-years,
+        aal: average annual loss per company
+    """
+    if df_events is None:
+        df_events = read_f1k_table(date_limits=False)
+    if n_companies is None:
+        n_companies = exposure_totals(year_range=year_range)["events"]["entities"]
+    df_events = filter_f1k_table(df_events, year_range=year_range)
+    n_years = year_range[1] - year_range[0] + 1
+    n_company_years = n_companies * n_years
+
+    company_years = (
+        df_events.assign(loss=df_events["total_cost_millions_usd"].fillna(0) * 1e6)
+        .groupby(["company_instance_id", "year_start"])["loss"]
+        .agg(aggregate_loss="sum", occurrence_loss="max")
+    )
+    curves = pd.DataFrame({"loss": LOSS_BINS[:-1]})
+    return_periods = pd.DataFrame({"return_period": RETURN_PERIODS})
+    for curve, column in LOSS_COLUMNS.items():
+        losses = np.sort(company_years[column].to_numpy())[::-1]
+        exceeding = len(losses) - np.searchsorted(
+            losses[::-1], LOSS_BINS[:-1], side="left"
+        )
+        curves[curve] = exceeding / n_company_years
+        ranks = np.maximum(n_company_years // return_periods["return_period"], 1)
+        return_periods[column] = [
+            losses[rank - 1] if rank <= len(losses) else 0.0 for rank in ranks
+        ]
+    aal = company_years["aggregate_loss"].sum() / n_company_years
+    return {"curves": curves, "return_periods": return_periods, "aal": aal}
+
+
+def exceedance_plot_data(model=None, events=None):
+    """
+    model and events exceedance curves in long format
+
+    Parameters
+    ----------
+    model : dict, optional
+        output of model_exceedance(), loaded if None
+    events : dict, optional
+        output of events_exceedance(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        loss, aep, oep and source, bins without exceedances are dropped
+    """
+    if model is None:
+        model = model_exceedance()
+    if events is None:
+        events = events_exceedance()
+    curves = pd.concat(
+        [
+            model["curves"].assign(source="model"),
+            events["curves"].assign(source="events"),
+        ],
+        ignore_index=True,
+    )
+    return curves.loc[curves[["aep", "oep"]].max(axis="columns") > 0]
+
+
+def return_period_table(model=None, events=None):
+    """
+    return period losses of the model, mean and median over runs, next to the events
+
+    Parameters
+    ----------
+    model : dict, optional
+        output of model_exceedance(), loaded if None
+    events : dict, optional
+        output of events_exceedance(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        losses in USD millions per return period, with the average annual loss as the last row
+    """
+    if model is None:
+        model = model_exceedance()
+    if events is None:
+        events = events_exceedance()
+    by_period = model["return_periods"].groupby("return_period")
+    table = pd.DataFrame(
+        {
+            "model aep mean": by_period["aggregate_loss"].mean(),
+            "model aep median": by_period["aggregate_loss"].median(),
+            "model oep mean": by_period["occurrence_loss"].mean(),
+            "model oep median": by_period["occurrence_loss"].median(),
+            "events aep": events["return_periods"].set_index("return_period")[
+                "aggregate_loss"
+            ],
+            "events oep": events["return_periods"].set_index("return_period")[
+                "occurrence_loss"
+            ],
+        }
+    )
+    table.index = table.index.astype(str)
+    table.loc["aal"] = [
+        model["aal"]["aal"].mean(),
+        model["aal"]["aal"].median(),
+        np.nan,
+        np.nan,
+        events["aal"],
+        np.nan,
+    ]
+    return (table / 1e6).round(2).rename_axis("return period").reset_index()
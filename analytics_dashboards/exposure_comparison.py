@@ -1,20 +1,143 @@
 import os
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 
-from analytics_dashboards.common.get_data import get_engine, read_f1k_table
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  model_version,
+                                                  read_f1k_entities,
+                                                  read_f1k_table,
+                                                  write_parquet)
+from analytics_dashboards.common.goodness_of_fit import (gof_table,
+                                                         sample_distribution)
+from analytics_dashboards.common.queries import run_query
 
+# model revenue bands and their lower edges in USD millions, see f1k_entity_counts
+REVENUE_BANDS = {"2-5B": 2000, "5-10B": 5000, "10-50B": 10000, "50B+": 50000}
 
-def event_exposure_data():
+# post-stratification cells from the finest to the coarsest, an events entity is
+# counted in the finest cell that holds model entities
+WEIGHT_CELLS = [
+    ["sic2", "revenue_band", "state"],
+    ["sic2", "revenue_band"],
+    ["sic_division", "revenue_band"],
+    ["revenue_band"],
+]
+
+
+@lru_cache(maxsize=None)
+def sic_code_map():
+    """
+    load the SIC code map once per process
+
+    Returns
+    -------
+    pd.DataFrame
+        SIC code descriptions indexed by two digit SIC code
+    """
+    sic_map = pd.read_csv(
+        os.path.join(os.path.dirname(__file__), "..", "resources", "SIC_code_map.csv")
+    )
+    return sic_map.set_index("SIC Code")
+
+
+def sic2_codes(sic):
+    """
+    derive the leading two digits of SIC codes arithmetically
+
+    Parameters
+    ----------
+    sic : pd.Series
+        SIC codes, nulls are kept as NaN
+
+    Returns
+    -------
+    pd.Series
+        leading two digits of the SIC codes
+    """
+    valid = sic.notna()
+    codes = sic[valid].astype(np.int64).to_numpy()
+    n_digits = np.searchsorted(10 ** np.arange(1, 19), codes, side="right") + 1
+    sic2 = pd.Series(np.nan, index=sic.index)
+    sic2[valid] = codes // 10 ** np.maximum(n_digits - 2, 0)
+    return sic2
+
+
+def sic_division(sic, digits=4):
+    """
+    returns the SIC division description of SIC codes
+
+    Parameters
+    ----------
+    sic : pd.Series
+        full SIC codes, or their leading two digits when digits is 2
+    digits : int, optional
+        4 for full SIC codes, 2 for two digit codes, by default 4
+
+    Returns
+    -------
+    pd.Series
+        division description, NaN for unknown codes
+    """
+    divisions = sic_code_map()["Division Desc."]
+    divisions.index = divisions.index.astype(int)
+    sic2 = sic2_codes(sic) if digits == 4 else sic
+    return sic2.map(divisions)
+
+
+def revenue_band(revenue):
+    """
+    assign company revenues in USD millions to the model revenue bands
+    """
+    edges = list(REVENUE_BANDS.values()) + [np.inf]
+    return pd.cut(revenue, bins=edges, labels=list(REVENUE_BANDS), right=False)
+
+
+def entity_share(joined_data, column):
+    """
+    count entities by source and a grouping column, normalised within each source
+
+    Parameters
+    ----------
+    joined_data : pd.DataFrame
+        joined event and model exposure data
+    column : str
+        column to group the entities by
+
+    Returns
+    -------
+    pd.DataFrame
+        entity count and share of the source total by group
+    """
+    data = (
+        joined_data.groupby(["source", column])["company_name"]
+        .agg("count")
+        .reset_index()
+        .rename({"company_name": "entitiy_count"}, axis="columns")
+    )
+    data["source_total"] = data.groupby("source")["entitiy_count"].transform("sum")
+    data["entity_count_normalised"] = data["entitiy_count"] / data["source_total"]
+    return data
+
+
+def event_exposure_data(df_events_raw=None):
     """
     returns event exposure data from Advisen
 
+    Parameters
+    ----------
+    df_events_raw : pd.DataFrame, optional
+        already loaded fortune 1000 events table, read from the database if None
+
     Returns
     -------
     pd.DataFrame
         event exposure data from Advisen
     """
-    df_events_raw = read_f1k_table().sort_values("event_start_date", ascending=True)
+    if df_events_raw is None:
+        df_events_raw = read_f1k_table()
+    df_events_raw = df_events_raw.sort_values("event_start_date", ascending=True)
     df_events_filtered = (
         df_events_raw.groupby("company_name")
         .agg(
@@ -38,7 +161,7 @@ def event_exposure_data():
         },
         axis="columns",
     )
-    df_events["sic"] = df_events["sic"].apply(lambda x: str(int(x))[:2], 2).astype(int)
+    df_events["sic"] = sic2_codes(df_events["sic"])
     df_events["source"] = "data"
     return df_events
 
@@ -52,120 +175,383 @@ def model_exposure_data():
     pd.DataFrame
         event exposure data from model
     """
-    query = """
-    select
-    entity_name as company_name,
-    entity_revenue/1e6 as revenue,
-    sic_code as sic,
-    countries as geography
-    from
-    model_entities
-    """
-    df_model = pd.read_sql(query, con=get_engine())
+    df_model = run_query("model_entity_exposure")
     df_model["geography"] = df_model["geography"].str.replace("US-", "")
     df_model["source"] = "model"
     return df_model
 
 
-def join_datasets():
+def join_datasets(df_model=None, df_events=None):
     """
     joined event and model data
 
+    Parameters
+    ----------
+    df_model : pd.DataFrame, optional
+        already loaded output of model_exposure_data(), loaded from the database if None
+    df_events : pd.DataFrame, optional
+        already loaded output of event_exposure_data(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         returns the joined event and model dataset
     """
-    df_model = model_exposure_data()
-    df_events = event_exposure_data()
+    if df_model is None:
+        df_model = model_exposure_data()
+    if df_events is None:
+        df_events = event_exposure_data()
     joined_data = pd.concat([df_model, df_events]).reset_index()
     return joined_data
 
 
-def sic_data():
+def sic_data(joined_data=None):
     """
     creates event exposure data by sic code
 
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already computed output of join_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         event exposure data by sic code
     """
-    data_sic = (
-        join_datasets()
-        .groupby(["source", "sic"])["company_name"]
-        .agg("count")
-        .reset_index()
-    )
+    if joined_data is None:
+        joined_data = join_datasets()
+    data_sic = entity_share(joined_data, "sic")
     data_sic["sic"] = data_sic["sic"].astype(int)
-    data_sic.rename({"company_name": "entitiy_count"}, axis="columns", inplace=True)
-    sic_map = pd.read_csv(
-        os.path.join(os.path.dirname(__file__), "..", "resources", "SIC_code_map.csv")
-    )
-    data_sic = data_sic.merge(sic_map, how="left", left_on="sic", right_on="SIC Code")
-    data_sic["source_total"] = 0
-    data_sic.loc[data_sic["source"] == "data", "source_total"] = data_sic.loc[
-        data_sic["source"] == "data", "entitiy_count"
-    ].sum()
-    data_sic.loc[data_sic["source"] == "model", "source_total"] = data_sic.loc[
-        data_sic["source"] == "model", "entitiy_count"
-    ].sum()
-    data_sic["entity_count_normalised"] = (
-        data_sic["entitiy_count"] / data_sic["source_total"]
-    )
-    data_sic[["source", "entity_count_normalised"]].groupby("source").agg("sum")
-    return data_sic
+    return data_sic.join(sic_code_map(), on="sic")
 
 
-def division_sic_data():
+def division_sic_data(data_sic=None):
     """
     creates event exposure data by sic code division grouping
 
+    Parameters
+    ----------
+    data_sic : pd.DataFrame, optional
+        already computed output of sic_data(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         event exposure data by sic code division
     """
+    if data_sic is None:
+        data_sic = sic_data()
     data_sic_div = (
-        sic_data()
-        .groupby(["source", "Division Desc."])["entity_count_normalised"]
+        data_sic.groupby(["source", "Division Desc."])["entity_count_normalised"]
         .agg("sum")
         .reset_index()
     )
-    data_sic_div["Division Desc."].replace(
-        "Finance, Insurance, And Real Estate", "Finance & Property", inplace=True
+    data_sic_div["Division Desc."] = data_sic_div["Division Desc."].replace(
+        "Finance, Insurance, And Real Estate", "Finance & Property"
     )
     return data_sic_div
 
 
-def geographic_data():
+def geographic_data(joined_data=None):
     """
     creates event exposure data grouped by geography
 
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already computed output of join_datasets(), loaded from the database if None
+
     Returns
     -------
     pd.DataFrame
         event exposure data grouped by geography
     """
-    data_geo = (
-        join_datasets()
-        .groupby(["source", "geography"])["company_name"]
-        .agg("count")
+    if joined_data is None:
+        joined_data = join_datasets()
+    data_geo = entity_share(joined_data, "geography")
+    return data_geo.sort_values(["source", "entity_count_normalised"], ascending=False)
+
+
+def simulation_years():
+    """
+    returns the number of simulated years per model run
+    """
+    return int(run_query("model_simulation_years")["simulation_years"].iloc[0])
+
+
+def entity_counts(**params):
+    """
+    number of fortune 1000 and model entities by SIC division and revenue band,
+    counted by the database
+
+    Parameters
+    ----------
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    pd.DataFrame
+        source, sic_division, revenue_band and entities
+    """
+    counts = pd.concat(
+        [
+            run_query("f1k_entity_counts", **params).assign(source="events"),
+            run_query("model_entity_counts").assign(source="model"),
+        ],
+        ignore_index=True,
+    )
+    counts["sic_division"] = sic_division(counts["sic2"], digits=2).fillna("Unknown")
+    return (
+        counts.groupby(["source", "sic_division", "revenue_band"])["entities"]
+        .sum()
         .reset_index()
     )
-    data_geo.rename({"company_name": "entitiy_count"}, axis="columns", inplace=True)
-    data_geo["source_total"] = 0
-    data_geo.loc[data_geo["source"] == "data", "source_total"] = data_geo.loc[
-        data_geo["source"] == "data", "entitiy_count"
-    ].sum()
-    data_geo.loc[data_geo["source"] == "model", "source_total"] = data_geo.loc[
-        data_geo["source"] == "model", "entitiy_count"
-    ].sum()
-    data_geo["entity_count_normalised"] = (
-        data_geo["entitiy_count"] / data_geo["source_total"]
+
+
+def entity_years(by=(), year_range=(2010, 2020), **params):
+    """
+    exposure in entity-years: the fortune 1000 entities over the years of the events
+    and the model entities over the simulated years
+
+    Parameters
+    ----------
+    by : tuple, optional
+        breakdown columns, "sic_division" and/or "revenue_band", by default ()
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    pd.DataFrame
+        source, the breakdown columns, entities and entity_years
+    """
+    counts = entity_counts(**params)
+    years = {
+        "events": year_range[1] - year_range[0] + 1,
+        "model": simulation_years(),
+    }
+    counts["entity_years"] = counts["entities"] * counts["source"].map(years)
+    return (
+        counts.groupby(["source"] + list(by))[["entities", "entity_years"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def exposure_totals(year_range=(2010, 2020), **params):
+    """
+    total entities and entity-years per source
+
+    Returns
+    -------
+    dict
+        source -> {"entities": int, "entity_years": int}
+    """
+    totals = entity_years(year_range=year_range, **params).set_index("source")
+    return {
+        source: {key: int(value) for key, value in row.items()}
+        for source, row in totals.iterrows()
+    }
+
+
+def cohort_cells(**params):
+    """
+    post-stratification variables of the fortune 1000 and model entities
+
+    Parameters
+    ----------
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    tuple
+        (events entities, model entities with their run_id), both with sic2,
+        sic_division, revenue_band and state columns
+    """
+    entities = read_f1k_entities(**params)
+    df_events = pd.DataFrame(
+        {
+            "sic2": sic2_codes(entities["company_sic"]),
+            "revenue_band": revenue_band(
+                entities["company_revenue_millions_usd"]
+            ).astype(str),
+            "state": entities["company_state"],
+        }
     )
-    data_geo[["source", "entity_count_normalised"]].groupby("source").agg("sum")
-    data_geo.sort_values(
-        ["source", "entity_count_normalised"], ascending=False, inplace=True
+    df_model = run_query("model_entity_cohorts")
+    for df in [df_events, df_model]:
+        df["sic_division"] = sic_division(df["sic2"], digits=2).fillna("Unknown")
+    return df_events, df_model
+
+
+def compute_entity_weights(df_events, df_model, cells=WEIGHT_CELLS):
+    """
+    post-stratification weights making the model entity mix match the events entities
+
+    each events entity is assigned to the finest cell of cells that holds model entities,
+    the model entities of a cell share its events mass equally, and an entity collects
+    the mass of its cell at every level; events entities without any matching cell are
+    left out
+
+    Parameters
+    ----------
+    df_events : pd.DataFrame
+        events entities with the cell columns
+    df_model : pd.DataFrame
+        model entities with run_id and the cell columns
+    cells : list, optional
+        cell columns of each level from the finest to the coarsest, by default WEIGHT_CELLS
+
+    Returns
+    -------
+    pd.DataFrame
+        run_id and weight, weights average to 1
+    """
+    unassigned = df_events.assign(events=1)
+    weights = np.zeros(len(df_model))
+    for columns in cells:
+        model_cells = df_model.groupby(columns)["run_id"].count().rename("entities")
+        events = unassigned.merge(
+            model_cells, left_on=columns, right_index=True, how="left"
+        )
+        matched = events["entities"].notna().to_numpy()
+        mass = events.loc[matched].groupby(columns)["events"].sum() / model_cells
+        weights += (
+            df_model[columns]
+            .merge(mass.rename("mass"), left_on=columns, right_index=True, how="left")[
+                "mass"
+            ]
+            .fillna(0)
+            .to_numpy()
+        )
+        unassigned = unassigned.loc[~matched]
+    weights *= len(weights) / weights.sum()
+    return pd.DataFrame({"run_id": df_model["run_id"], "weight": weights})
+
+
+def entity_weights(**params):
+    """
+    post-stratification weights of the model entities, computed once per model version
+
+    Parameters
+    ----------
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    pd.DataFrame
+        run_id and weight, see compute_entity_weights
+    """
+    path = datastore_path("weights", f"entity_weights_{model_version()}.parquet")
+    if not params and os.path.exists(path):
+        return pd.read_parquet(path)
+    weights = compute_entity_weights(*cohort_cells(**params))
+    if not params:
+        write_parquet(weights, path)
+    return weights
+
+
+def reweighted_mix_data(weights=None, **params):
+    """
+    entity share by SIC division and revenue band of the events, the model and the
+    reweighted model
+
+    Parameters
+    ----------
+    weights : pd.DataFrame, optional
+        output of entity_weights(), loaded if None
+    **params
+        fortune 1000 cohort filters, see queries.ENTITY_FILTERS
+
+    Returns
+    -------
+    pd.DataFrame
+        source, variable, level and share
+    """
+    if weights is None:
+        weights = entity_weights(**params)
+    df_events, df_model = cohort_cells(**params)
+    df_model = df_model.merge(weights, on="run_id")
+    frames = [
+        df_events.assign(source="events", weight=1.0),
+        df_model.assign(source="model", weight=1.0),
+        df_model.assign(source="model reweighted"),
+    ]
+    data = pd.concat(frames, ignore_index=True)
+    shares = []
+    for column in ["sic_division", "revenue_band"]:
+        share = data.groupby(["source", column])["weight"].sum()
+        share = share / share.groupby(level="source").transform("sum")
+        shares.append(
+            share.rename("share")
+            .reset_index()
+            .rename(columns={column: "level"})
+            .assign(variable=column)
+        )
+    return pd.concat(shares, ignore_index=True)[
+        ["source", "variable", "level", "share"]
+    ]
+
+
+def revenue_gof_data(joined_data=None):
+    """
+    goodness of fit of the model entity revenue to the events entity revenue
+
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already loaded output of join_datasets(), loaded from the database if None
+
+    Returns
+    -------
+    pd.DataFrame
+        goodness of fit statistics
+    """
+    if joined_data is None:
+        joined_data = join_datasets()
+    revenue = joined_data.groupby("source")["revenue"]
+    return gof_table(
+        [
+            (
+                "revenue",
+                "data",
+                sample_distribution(revenue.get_group("model")),
+                sample_distribution(revenue.get_group("data")),
+                True,
+            )
+        ]
+    )
+
+
+def exposure_data(df_model=None, df_events_raw=None):
+    """
+    join the event and model exposure data once and derive all exposure aggregates from it
+
+    Parameters
+    ----------
+    df_model : pd.DataFrame, optional
+        already loaded output of model_exposure_data(), loaded from the database if None
+    df_events_raw : pd.DataFrame, optional
+        already loaded fortune 1000 events table, read from the database if None
+
+    Returns
+    -------
+    dict
+        joined exposure data and the sic, division and geography aggregates
+    """
+    joined_data = join_datasets(
+        df_model=df_model, df_events=event_exposure_data(df_events_raw=df_events_raw)
     )
-    return data_geo
+    data_sic = sic_data(joined_data=joined_data)
+    return {
+        "joined": joined_data,
+        "sic": data_sic,
+        "division": division_sic_data(data_sic=data_sic),
+        "geography": geographic_data(joined_data=joined_data),
+    }
@@ -1,42 +1,52 @@
 import pandas as pd
 
-from analytics_dashboards.common.get_data import get_engine, read_f1k_table
+from analytics_dashboards.common.bootstrap import bootstrap_ci
+from analytics_dashboards.common.f1k_sync import event_counts, store_entities
+from analytics_dashboards.common.model_cube import rollup
+from analytics_dashboards.common.queries import F1K_DEFAULTS, run_query
+from analytics_dashboards.exposure_comparison import (REVENUE_BANDS,
+                                                      entity_weights,
+                                                      exposure_totals,
+                                                      revenue_band, sic2_codes,
+                                                      sic_division,
+                                                      simulation_years)
 
 
-def events_data():
+def events_data(
+    revenue_floor=F1K_DEFAULTS["revenue_floor"], year_range=F1K_DEFAULTS["year_range"]
+):
     """
-    get the frequency of annual breach data from Advisen
+    get the frequency of annual breach data from Advisen, counted from the synced
+    aggregates
+
+    Parameters
+    ----------
+    revenue_floor : int, optional
+        minimum company revenue in millions of USD, by default 2000
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
 
     Returns
     -------
     pd.DataFrame
-        frequency of annual breach data from Advisen
-    """
-    event_cols = [
-        "event_id",
-        "event_start_date",
-        "impact_type_availability",
-        "impact_type_confidentiality",
-        "impact_type_extortion",
-        "impact_type_integrity",
-    ]
-    df_events = read_f1k_table()[event_cols]
-    df_events.rename(
-        {
-            "event_id": "",
-            "impact_type_availability": "availability",
-            "impact_type_confidentiality": "confidentiality",
-            "impact_type_extortion": "extortion",
-            "impact_type_integrity": "integrity",
-        },
-        axis="columns",
-        inplace=True,
+        frequency of annual breach data from Advisen, one row per year and impact types
+    """
+    impact_cols = {
+        "impact_type_availability": "availability",
+        "impact_type_confidentiality": "confidentiality",
+        "impact_type_extortion": "extortion",
+        "impact_type_integrity": "integrity",
+    }
+    df_events = event_counts(
+        ["year_start"] + list(impact_cols), revenue_floor, year_range
+    ).rename(dict(impact_cols, year_start="year"), axis="columns")
+    # each event adds one over the fortune 1000 entity-years
+    entity_years = len(store_entities(revenue_floor)) * (
+        year_range[1] - year_range[0] + 1
     )
-    # adjust columns
-    df_events["year"] = df_events["event_start_date"].dt.year
-    count_of_years = len(df_events["year"].unique())
-    df_events["frequency"] = 1 / count_of_years / 1000
+    df_events["frequency"] = df_events["event_count"] / entity_years
     df_events["source"] = "events"
+    df_events["weight"] = 1.0
     return df_events
 
 
@@ -47,36 +57,43 @@ def model_data():
     Returns
     -------
     pd.DataFrame
-        event frequency data from the model
-    """
-    query = """
-        select
-        run_id::text as entity,
-        'model' as source,
-        'model' as year,
-        confidentiality,
-        integrity,
-        availability,
-        extortion
-    from
-        model_events
-    """
-    df_model = pd.read_sql(query, con=get_engine())
-    df_model["frequency"] = 1 / 10000 / 1000
+        event frequency data from the model, with the weight of each run's entity,
+        see exposure_comparison.entity_weights
+    """
+    df_model = rollup(
+        ["run_id", "confidentiality", "integrity", "availability", "extortion"]
+    )
+    df_model = df_model.merge(entity_weights(), on="run_id", how="left")
+    df_model["weight"] = df_model["weight"].fillna(0)
+    df_model["entity"] = df_model["run_id"].astype(str)
+    df_model["source"] = "model"
+    df_model["year"] = "model"
+    df_model["frequency"] = (
+        df_model["event_count"] / exposure_totals()["model"]["entity_years"]
+    )
     return df_model
 
 
-def join_datasets():
+def join_datasets(df_events=None, df_model=None):
     """
     join event data to model data with aggregated event types
 
+    Parameters
+    ----------
+    df_events : pd.DataFrame, optional
+        already loaded output of events_data(), loaded if None
+    df_model : pd.DataFrame, optional
+        already loaded output of model_data(), loaded if None
+
     Returns
     -------
     pd.DataFrame
         joined events and model datasets
     """
-    df_events = events_data().copy()
-    df_model = model_data().copy()
+    if df_events is None:
+        df_events = events_data()
+    if df_model is None:
+        df_model = model_data()
     joined_data = pd.concat(
         [
             df_events[
@@ -88,6 +105,7 @@ def join_datasets():
                     "year",
                     "frequency",
                     "source",
+                    "weight",
                 ]
             ],
             df_model[
@@ -99,6 +117,7 @@ def join_datasets():
                     "year",
                     "frequency",
                     "source",
+                    "weight",
                 ]
             ],
         ]
@@ -106,16 +125,30 @@ def join_datasets():
     return joined_data
 
 
-def overall_frequency_plot_data():
+def overall_frequency_plot_data(joined_data=None):
     """
     generate overall frequency plot data
 
+    Parameters
+    ----------
+    joined_data : pd.DataFrame, optional
+        already loaded output of join_datasets(), loaded if None
+
     Returns
     -------
     pd.DataFrame
-        overall frequency plot data
+        overall frequency plot data, the model is added a second time as
+        "model reweighted" with its runs weighted to the events entity mix
     """
-    df_comb = join_datasets().copy()
+    if joined_data is None:
+        joined_data = join_datasets()
+    df_comb = joined_data.copy()
+    reweighted = df_comb.loc[df_comb["source"] == "model"]
+    reweighted = reweighted.assign(
+        source="model reweighted",
+        frequency=reweighted["frequency"] * reweighted["weight"],
+    )
+    df_comb = pd.concat([df_comb, reweighted], ignore_index=True)
     df_comb["availability"] = df_comb["availability"].astype(bool)
     df_comb["confidentiality"] = df_comb["confidentiality"].astype(bool)
     df_comb["extortion"] = df_comb["extortion"].astype(bool)
@@ -126,3 +159,153 @@ def overall_frequency_plot_data():
         .reset_index()
     )
     return df_plot
+
+
+def frequency_ci_data(df_events=None, df_model=None, **kwargs):
+    """
+    bootstrap confidence intervals of the overall frequency by confidentiality,
+    resampling the years of the events and the runs of the model
+
+    Parameters
+    ----------
+    df_events : pd.DataFrame, optional
+        already loaded output of events_data(), loaded from the database if None
+    df_model : pd.DataFrame, optional
+        already loaded output of model_data(), loaded if None
+    **kwargs
+        passed to bootstrap_ci
+
+    Returns
+    -------
+    pd.DataFrame
+        source, confidentiality and the estimate, lower and upper bound of the frequency
+    """
+    if df_events is None:
+        df_events = events_data()
+    if df_model is None:
+        df_model = model_data()
+    frames = []
+    for source, df, unit in [
+        ("events", df_events, "year"),
+        ("model", df_model, "run_id"),
+    ]:
+        # frequency of each year or run, the plotted frequency is their sum
+        unit_frequency = (
+            df.assign(confidentiality=df["confidentiality"].astype(bool))
+            .groupby([unit, "confidentiality"])["frequency"]
+            .sum()
+            .unstack(fill_value=0)
+        )
+        for confidentiality, values in unit_frequency.items():
+            ci = bootstrap_ci(values * len(values), statistics=("mean",), **kwargs)
+            frames.append(ci.assign(source=source, confidentiality=confidentiality))
+    return pd.concat(frames, ignore_index=True)
+
+
+def events_cohorts(df):
+    """
+    SIC2 code and revenue band of fortune 1000 entities or their event counts
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        frame with company_sic and company_revenue_millions_usd columns
+
+    Returns
+    -------
+    pd.DataFrame
+        sic2 and revenue_band, on the index of df
+    """
+    # the database counts the revenues below the lowest band in that band
+    revenue = df["company_revenue_millions_usd"].clip(lower=min(REVENUE_BANDS.values()))
+    return pd.DataFrame(
+        {
+            "sic2": sic2_codes(df["company_sic"]),
+            "revenue_band": revenue_band(revenue).astype(str),
+        }
+    )
+
+
+def model_cohort_data():
+    """
+    model event counts and exposure by SIC division and revenue band, counted by the
+    database once so the cohort breakdowns of the filtered events never query it
+
+    Returns
+    -------
+    pd.DataFrame
+        sic_division, revenue_band, event_count, entities and entity_years
+    """
+    counts = run_query("model_event_counts")
+    entities = run_query("model_entity_counts")
+    frames = []
+    for df, column in [(counts, "event_count"), (entities, "entities")]:
+        df = df.assign(
+            sic_division=sic_division(df["sic2"], digits=2).fillna("Unknown")
+        )
+        frames.append(df.groupby(["sic_division", "revenue_band"])[column].sum())
+    cohorts = pd.concat(frames, axis="columns").fillna(0).reset_index()
+    cohorts["entity_years"] = cohorts["entities"] * simulation_years()
+    return cohorts
+
+
+def cohort_frequency_plot_data(
+    by="sic_division",
+    revenue_floor=F1K_DEFAULTS["revenue_floor"],
+    year_range=F1K_DEFAULTS["year_range"],
+    df_model=None,
+):
+    """
+    annual event frequency per entity by SIC division or revenue band, the events and
+    entities are counted from the synced store and the model events and entities by
+    the database
+
+    Parameters
+    ----------
+    by : str, optional
+        "sic_division" or "revenue_band", by default "sic_division"
+    revenue_floor : int, optional
+        minimum company revenue of the events entities in millions of USD,
+        by default 2000
+    year_range : tuple, optional
+        inclusive (first, last) event start years, by default (2010, 2020)
+    df_model : pd.DataFrame, optional
+        output of model_cohort_data(), loaded if None
+
+    Returns
+    -------
+    pd.DataFrame
+        source, the breakdown column, event_count, entity_years and frequency
+    """
+    if df_model is None:
+        df_model = model_cohort_data()
+    events = event_counts(
+        ["company_sic", "company_revenue_millions_usd"], revenue_floor, year_range
+    )
+    events = events_cohorts(events).assign(event_count=events["event_count"])
+    entities = events_cohorts(store_entities(revenue_floor))
+    n_years = year_range[1] - year_range[0] + 1
+    for df in [events, entities]:
+        df["sic_division"] = sic_division(df["sic2"], digits=2).fillna("Unknown")
+    events_plot = pd.concat(
+        [
+            events.groupby(by)["event_count"].sum(),
+            entities.groupby(by).size().rename("entity_years") * n_years,
+        ],
+        axis="columns",
+    )
+    model_plot = df_model.groupby(by)[["event_count", "entity_years"]].sum()
+    df_plot = pd.concat(
+        [
+            df.rename_axis(by).reset_index().assign(source=source)
+            for source, df in [("events", events_plot), ("model", model_plot)]
+        ],
+        ignore_index=True,
+    )
+    # cohorts of entities without events count zero events, events of cohorts
+    # without entities have no exposure
+    df_plot = df_plot.dropna(subset=["entity_years"])
+    df_plot["event_count"] = df_plot["event_count"].fillna(0)
+    df_plot["entity_years"] = df_plot["entity_years"].astype(int)
+    df_plot["frequency"] = df_plot["event_count"] / df_plot["entity_years"]
+    return df_plot[["source", by, "event_count", "entity_years", "frequency"]]
@@ -0,0 +1,424 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.get_data import datastore_path, write_parquet
+from analytics_dashboards.event_severity import cost_components
+from analytics_dashboards.exposure_comparison import revenue_band, sic_division
+
+MEASURES = [
+    "event_impact",
+    "gu_liability",
+    "gu_regulatory",
+    "gu_privacy",
+    "gu_bi",
+    "gu_extortion",
+]
+
+# cohort variables, each is fitted separately next to the "all" cohort
+STRATA = ["revenue_band", "targeted_event_type", "sic_division"]
+
+DISTRIBUTIONS = ["lognormal", "gpd_tail", "spliced"]
+
+# quantile of a cohort above which the gpd tail is fitted
+TAIL_QUANTILE = 0.9
+
+# cohorts with fewer positive values are not fitted
+MIN_COHORT_SIZE = 50
+
+# the gpd tail and spliced fits are skipped for cohorts with fewer values above the
+# threshold, their rows are kept with NaN parameters
+MIN_TAIL_SIZE = 10
+
+FIT_COLUMNS = [
+    "distribution",
+    "n",
+    "mu",
+    "sigma",
+    "threshold",
+    "shape",
+    "scale",
+    "body_share",
+    "loglik",
+    "aic",
+]
+
+
+def cohort_data():
+    """
+    positive event impact and cost component values of the model and events in long format,
+    with the cohort variables of each event
+
+    the events have no targeted event type, so they are only stratified by revenue band
+    and SIC division
+
+    Returns
+    -------
+    pd.DataFrame
+        source, measure, value and the STRATA columns
+    """
+    df_events, df_model = cost_components()
+    df_events = df_events.assign(
+        revenue_band=revenue_band(df_events["company_revenue_millions_usd"]).astype(
+            str
+        ),
+        targeted_event_type=np.nan,
+        sic_division=sic_division(df_events["company_sic"]),
+    )
+    df_model = df_model.assign(sic_division=sic_division(df_model["sic"]))
+    frames = [
+        df[["source"] + STRATA + MEASURES].melt(
+            id_vars=["source"] + STRATA, var_name="measure", value_name="value"
+        )
+        for df in [df_events, df_model]
+    ]
+    data = pd.concat(frames, ignore_index=True)
+    return data.loc[data["value"] > 0].reset_index(drop=True)
+
+
+def lognormal_loglik(values, mu, sigma):
+    """
+    log-likelihood of values under a lognormal distribution
+    """
+    logs = np.log(values)
+    return np.sum(
+        -logs
+        - np.log(sigma)
+        - 0.5 * np.log(2 * np.pi)
+        - (logs - mu) ** 2 / (2 * sigma**2)
+    )
+
+
+def fit_truncated_lognormal(values, threshold):
+    """
+    maximum likelihood lognormal fit of values observed below a threshold
+
+    Returns
+    -------
+    tuple
+        (mu, sigma)
+    """
+    from scipy import optimize, stats
+
+    logs = np.log(values)
+    log_threshold = np.log(threshold)
+
+    def negative_loglik(params):
+        mu, log_sigma = params
+        sigma = np.exp(log_sigma)
+        truncation = stats.norm.logcdf((log_threshold - mu) / sigma)
+        return -(lognormal_loglik(values, mu, sigma) - len(values) * truncation)
+
+    start = [logs.mean(), np.log(max(logs.std(), 1e-6))]
+    result = optimize.minimize(negative_loglik, start, method="Nelder-Mead")
+    return result.x[0], np.exp(result.x[1])
+
+
+def fit_values(values, tail_quantile=TAIL_QUANTILE):
+    """
+    fit the lognormal, gpd tail and spliced distributions to a cohort by maximum likelihood
+
+    the gpd tail is fitted to the excesses over the tail_quantile threshold, and the spliced
+    distribution joins a lognormal truncated at the threshold to that gpd tail
+
+    cohorts with fewer than MIN_TAIL_SIZE values above the threshold, e.g. when the top
+    values are tied, or with a tied body get NaN gpd tail and spliced fits, and a fully
+    tied cohort gets a NaN lognormal fit as well
+
+    Parameters
+    ----------
+    values : np.ndarray
+        positive values of the cohort
+    tail_quantile : float, optional
+        quantile of the values used as tail threshold, by default TAIL_QUANTILE
+
+    Returns
+    -------
+    list
+        one dict of FIT_COLUMNS per distribution
+    """
+    from scipy import stats
+
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    logs = np.log(values)
+    mu, sigma = logs.mean(), logs.std()
+    if sigma > 0:
+        lognormal_ll = lognormal_loglik(values, mu, sigma)
+    else:
+        mu, sigma, lognormal_ll = np.nan, np.nan, np.nan
+
+    threshold = np.quantile(values, tail_quantile)
+    body, tail = values[values <= threshold], values[values > threshold]
+    body_share = len(body) / n
+
+    def fit(distribution, n_fitted, loglik, n_params, **params):
+        return dict(
+            dict.fromkeys(FIT_COLUMNS, np.nan),
+            distribution=distribution,
+            n=n_fitted,
+            loglik=loglik,
+            aic=2 * n_params - 2 * loglik,
+            **params,
+        )
+
+    lognormal = fit("lognormal", n, lognormal_ll, 2, mu=mu, sigma=sigma)
+    if len(tail) < MIN_TAIL_SIZE or body.std() == 0:
+        return [
+            lognormal,
+            fit("gpd_tail", len(tail), np.nan, 2, threshold=threshold),
+            fit("spliced", n, np.nan, 5, threshold=threshold, body_share=body_share),
+        ]
+
+    shape, _, scale = stats.genpareto.fit(tail - threshold, floc=0)
+    tail_ll = np.sum(stats.genpareto.logpdf(tail - threshold, shape, scale=scale))
+
+    body_mu, body_sigma = fit_truncated_lognormal(body, threshold)
+    body_ll = lognormal_loglik(body, body_mu, body_sigma) - len(
+        body
+    ) * stats.norm.logcdf((np.log(threshold) - body_mu) / body_sigma)
+    spliced_ll = (
+        body_ll
+        + tail_ll
+        + len(body) * np.log(body_share)
+        + len(tail) * np.log(1 - body_share)
+    )
+
+    return [
+        lognormal,
+        fit(
+            "gpd_tail",
+            len(tail),
+            tail_ll,
+            2,
+            threshold=threshold,
+            shape=shape,
+            scale=scale,
+            body_share=body_share,
+        ),
+        fit(
+            "spliced",
+            n,
+            spliced_ll,
+            5,
+            mu=body_mu,
+            sigma=body_sigma,
+            threshold=threshold,
+            shape=shape,
+            scale=scale,
+            body_share=body_share,
+        ),
+    ]
+
+
+def fingerprint(values):
+    """
+    returns a hash identifying the sorted values of a cohort
+    """
+    values = np.sort(np.asarray(values, dtype=np.float64))
+    digest = hashlib.sha1(values.tobytes())
+    digest.update(f"{TAIL_QUANTILE} {MIN_TAIL_SIZE}".encode())
+    return digest.hexdigest()
+
+
+def fits_path():
+    """
+    returns the location of the memoised fits
+    """
+    return datastore_path("severity_fits", "fits.parquet")
+
+
+def cohorts(data):
+    """
+    split the cohort data into the cohorts that are fitted
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        output of cohort_data()
+
+    Returns
+    -------
+    list
+        ((source, measure, stratum, level), values) of the cohorts with at least
+        MIN_COHORT_SIZE values
+    """
+    groups = []
+    for (source, measure), df in data.groupby(["source", "measure"]):
+        groups.append(((source, measure, "all", "all"), df["value"].to_numpy()))
+        for stratum in STRATA:
+            for level, group in df.groupby(stratum):
+                groups.append(
+                    ((source, measure, stratum, level), group["value"].to_numpy())
+                )
+    return [(key, values) for key, values in groups if len(values) >= MIN_COHORT_SIZE]
+
+
+def fit_cohorts(data=None, n_jobs=None):
+    """
+    fit the severity distributions of every cohort, fits of cohorts whose values were
+    already fitted are reused from the datastore
+
+    Parameters
+    ----------
+    data : pd.DataFrame, optional
+        output of cohort_data(), loaded if None
+    n_jobs : int, optional
+        worker processes, one cohort per task, by default the number of cpus
+
+    Returns
+    -------
+    pd.DataFrame
+        source, measure, stratum, level and FIT_COLUMNS per cohort and distribution
+    """
+    if data is None:
+        data = cohort_data()
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    path = fits_path()
+    memo = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+
+    cohort_list = [(key, fingerprint(values), values) for key, values in cohorts(data)]
+    known = set(memo["fingerprint"]) if len(memo) else set()
+    missing = {
+        digest: values for _, digest, values in cohort_list if digest not in known
+    }
+    if missing:
+        if n_jobs > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                results = list(pool.map(fit_values, missing.values()))
+        else:
+            results = [fit_values(values) for values in missing.values()]
+        new_fits = pd.DataFrame(
+            [
+                dict(row, fingerprint=digest)
+                for digest, rows in zip(missing, results)
+                for row in rows
+            ]
+        )
+        memo = pd.concat([memo, new_fits], ignore_index=True)
+        write_parquet(memo, path)
+
+    keys = pd.DataFrame(
+        [key + (digest,) for key, digest, _ in cohort_list],
+        columns=["source", "measure", "stratum", "level", "fingerprint"],
+    )
+    fits = keys.merge(memo, on="fingerprint").drop(columns="fingerprint")
+    return fits[["source", "measure", "stratum", "level"] + FIT_COLUMNS]
+
+
+def fitted_pdf(fit, x):
+    """
+    density of a fitted distribution, the gpd tail density is scaled by the tail share
+    and is NaN below the threshold
+
+    Parameters
+    ----------
+    fit : pd.Series
+        row of fit_cohorts()
+    x : np.ndarray
+        positive values
+
+    Returns
+    -------
+    np.ndarray
+        density at x
+    """
+    from scipy import stats
+
+    if fit["distribution"] == "lognormal":
+        return stats.lognorm.pdf(x, fit["sigma"], scale=np.exp(fit["mu"]))
+    tail = (1 - fit["body_share"]) * stats.genpareto.pdf(
+        x - fit["threshold"], fit["shape"], scale=fit["scale"]
+    )
+    if fit["distribution"] == "gpd_tail":
+        return np.where(x > fit["threshold"], tail, np.nan)
+    body = (
+        fit["body_share"]
+        * stats.lognorm.pdf(x, fit["sigma"], scale=np.exp(fit["mu"]))
+        / stats.lognorm.cdf(fit["threshold"], fit["sigma"], scale=np.exp(fit["mu"]))
+    )
+    return np.where(x <= fit["threshold"], body, tail)
+
+
+def density_plot_data(fits, measure, stratum="all", level="all", points=200):
+    """
+    fitted densities of a cohort on a log10 axis
+
+    Parameters
+    ----------
+    fits : pd.DataFrame
+        output of fit_cohorts()
+    measure : str
+        one of MEASURES
+    stratum : str, optional
+        cohort variable, by default "all"
+    level : str, optional
+        cohort level, by default "all"
+    points : int, optional
+        grid points, by default 200
+
+    Returns
+    -------
+    pd.DataFrame
+        log10_value, density of log10 values, source and distribution
+    """
+    cohort = fits.loc[
+        (fits["measure"] == measure)
+        & (fits["stratum"] == stratum)
+        & (fits["level"] == level)
+        & fits["loglik"].notna()
+    ]
+    log_x = np.linspace(3, 10, points)
+    x = 10**log_x
+    frames = [
+        pd.DataFrame(
+            {
+                "log10_value": log_x,
+                # density of log10(value) = density of value * value * ln(10)
+                "density": fitted_pdf(fit, x) * x * np.log(10),
+                "source": fit["source"],
+                "distribution": fit["distribution"],
+            }
+        )
+        for _, fit in cohort.iterrows()
+    ]
+    if not frames:
+        return pd.DataFrame(
+            columns=["log10_value", "density", "source", "distribution"]
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def parameter_table(fits, measure):
+    """
+    fitted parameters of all cohorts of a measure
+
+    Parameters
+    ----------
+    fits : pd.DataFrame
+        output of fit_cohorts()
+    measure : str
+        one of MEASURES
+
+    Returns
+    -------
+    pd.DataFrame
+        cohorts and rounded FIT_COLUMNS
+    """
+    table = fits.loc[fits["measure"] == measure].drop(columns="measure")
+    return table.round(
+        {
+            "mu": 3,
+            "sigma": 3,
+            "threshold": 0,
+            "shape": 3,
+            "scale": 0,
+            "body_share": 3,
+            "loglik": 1,
+            "aic": 1,
+        }
+    )
@@ -0,0 +1,601 @@
+# signal detection in the fortune 1000 events:
+# monthly and quarterly event counts and mean log10 costs of each series (all events,
+# event type, SIC division and CIA flag) are monitored against the model frequency and
+# severity with poisson control limits, an EWMA and a CUSUM; a run only adds the events
+# whose event_id no earlier run processed, including the back-filled history of a
+# company joining the list, and recomputes the statistics from the first period they
+# touch, starting from the EWMA and CUSUM state of the period before
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics_dashboards.common.f1k_sync import f1k_table
+from analytics_dashboards.common.get_data import (datastore_path,
+                                                  filter_f1k_table,
+                                                  model_version, write_parquet)
+from analytics_dashboards.common.queries import run_query
+from analytics_dashboards.exposure_comparison import (entity_counts,
+                                                      sic_division,
+                                                      simulation_years)
+
+# monitored period lengths: name -> pandas period frequency and length in years
+FREQUENCIES = {"monthly": ("M", 1 / 12), "quarterly": ("Q", 1 / 4)}
+
+CIA_FLAGS = ["confidentiality", "integrity", "availability"]
+
+# events impact columns of the CIA flags
+CIA_COLUMNS = {flag: f"impact_type_{flag}" for flag in CIA_FLAGS}
+
+# model targeted event types merged into the types the events are classified to,
+# model events without a targeted type are systemic
+MODEL_EVENT_TYPES = {
+    "service_provider_data_breach": "data_breach",
+    "service_provider_interruption": "interruption",
+}
+
+# smoothing of the EWMA and width of its control limits in standard deviations
+EWMA_LAMBDA = 0.2
+EWMA_WIDTH = 3.0
+
+# reference value and decision interval of the standardised CUSUM, in standard deviations
+CUSUM_K = 0.5
+CUSUM_H = 4.0
+
+# two-sided false alarm probability of the poisson control limits, as for 3 sigma limits
+POISSON_ALPHA = 0.0027
+
+CELL_COLUMNS = ["event_count", "cost_count", "log_cost_sum"]
+
+SERIES_COLUMNS = ["frequency", "dimension", "level"]
+
+FLAG_COLUMNS = ["poisson_flag", "ewma_flag", "cusum_flag", "severity_flag"]
+
+
+def signal_path(name):
+    """
+    returns the location of a file of the signal detection store
+    """
+    return datastore_path("signals", name)
+
+
+def load_state():
+    """
+    returns the model version of the last run, empty if it never ran
+    """
+    path = signal_path("state.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(signal_path("state.json"), "w") as f:
+        json.dump(state, f, default=str)
+
+
+def read_store(name):
+    """
+    returns a stored table, None if it does not exist
+    """
+    path = signal_path(f"{name}.parquet")
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def write_store(df, name):
+    write_parquet(df, signal_path(f"{name}.parquet"))
+
+
+def event_type_labels(event_type):
+    """
+    classify the Advisen event types into the model targeted event types
+
+    events with a data breach are data_breach, other events with an interruption or
+    ransomware are interruption, the remaining typed events are other
+
+    Parameters
+    ----------
+    event_type : pd.Series
+        list valued Advisen event types, e.g. "['Data Breach' 'Ransomware']"
+
+    Returns
+    -------
+    pd.Series
+        data_breach, interruption, other or unknown
+    """
+    text = event_type.astype("string")
+    labels = pd.Series("other", index=event_type.index)
+    labels[text.str.contains("Interruption|Ransomware", na=False)] = "interruption"
+    labels[text.str.contains("Data Breach", na=False)] = "data_breach"
+    labels[text.isna()] = "unknown"
+    return labels
+
+
+def series_levels(df, event_type, division, flags):
+    """
+    stack the rows of a table once per series they belong to
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        events or model counts
+    event_type : pd.Series
+        event type of each row
+    division : pd.Series
+        SIC division of each row
+    flags : dict
+        CIA flag -> boolean series of the rows with that impact
+
+    Returns
+    -------
+    pd.DataFrame
+        the rows of df with dimension and level columns
+    """
+    frames = [
+        df.assign(dimension="all", level="all"),
+        df.assign(dimension="event_type", level=event_type.to_numpy()),
+        df.assign(
+            dimension="sic_division", level=division.fillna("Unknown").to_numpy()
+        ),
+    ]
+    frames += [
+        df.loc[mask.to_numpy()].assign(dimension="cia", level=flag)
+        for flag, mask in flags.items()
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def event_cells(events):
+    """
+    event counts and log10 cost sums of the events per series and period
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        fortune 1000 events, see get_data.filter_f1k_table
+
+    Returns
+    -------
+    pd.DataFrame
+        SERIES_COLUMNS, period (start date) and CELL_COLUMNS
+    """
+    events = events.reset_index(drop=True)
+    cost = events["total_cost_millions_usd"].astype(float) * 1e6
+    rows = pd.DataFrame(
+        {
+            "date": pd.to_datetime(events["event_start_date"]).to_numpy(),
+            "event_count": 1,
+            "cost_count": (cost > 0).astype(int).to_numpy(),
+            "log_cost_sum": np.log10(cost.where(cost > 0)).fillna(0).to_numpy(),
+        }
+    ).dropna(subset=["date"])
+    index = rows.index
+    rows = series_levels(
+        rows,
+        event_type_labels(events["event_type"]).loc[index],
+        sic_division(events["company_sic"]).loc[index],
+        {
+            flag: events[column].loc[index].fillna(False).astype(bool)
+            for flag, column in CIA_COLUMNS.items()
+        },
+    )
+    frames = []
+    for frequency, (freq, _) in FREQUENCIES.items():
+        periods = rows["date"].dt.to_period(freq).dt.start_time
+        frames.append(
+            rows.assign(frequency=frequency, period=periods)
+            .groupby(SERIES_COLUMNS + ["period"])[CELL_COLUMNS]
+            .sum()
+            .reset_index()
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def add_cells(cells, new_cells):
+    """
+    add the cells of newly processed events to the stored cells
+    """
+    return (
+        pd.concat([cells, new_cells], ignore_index=True)
+        .groupby(SERIES_COLUMNS + ["period"])[CELL_COLUMNS]
+        .sum()
+        .reset_index()
+    )
+
+
+def model_baseline():
+    """
+    expected annual event count of the fortune 1000 cohort and log10 severity of each
+    series from the model: the model frequency per entity-year times the fortune 1000
+    entities, per SIC division for the SIC division series
+
+    Returns
+    -------
+    pd.DataFrame
+        dimension, level, annual_expected, severity_mean and severity_sd
+    """
+    counts = run_query("model_signal_counts")
+    counts = series_levels(
+        counts,
+        counts["targeted_event_type"].replace(MODEL_EVENT_TYPES).fillna("systemic"),
+        sic_division(counts["sic2"], digits=2),
+        {flag: counts[flag] == 1 for flag in CIA_FLAGS},
+    )
+    baseline = (
+        counts.groupby(["dimension", "level"])[
+            ["event_count", "cost_count", "log_cost_sum", "log_cost_sq_sum"]
+        ]
+        .sum()
+        .reset_index()
+    )
+    entities = entity_counts()
+    entities["sic_division"] = entities["sic_division"].fillna("Unknown")
+    totals = entities.groupby("source")["entities"].sum()
+    by_division = entities.groupby(["sic_division", "source"])["entities"].sum()
+    by_division = by_division.unstack(fill_value=0).reindex(
+        baseline["level"], fill_value=0
+    )
+    divisions = (baseline["dimension"] == "sic_division").to_numpy()
+    model_entities = np.where(
+        divisions, by_division["model"].to_numpy(), totals["model"]
+    )
+    events_entities = np.where(
+        divisions, by_division["events"].to_numpy(), totals["events"]
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = baseline["event_count"] / (model_entities * simulation_years())
+        mean = baseline["log_cost_sum"] / baseline["cost_count"]
+        variance = baseline["log_cost_sq_sum"] / baseline["cost_count"] - mean**2
+    baseline["annual_expected"] = np.where(model_entities > 0, rate, np.nan)
+    baseline["annual_expected"] *= events_entities
+    baseline["severity_mean"] = mean
+    baseline["severity_sd"] = np.sqrt(np.maximum(variance, 0))
+    return baseline[
+        ["dimension", "level", "annual_expected", "severity_mean", "severity_sd"]
+    ]
+
+
+def monitor(cells, baseline, frequency, periods, previous=None):
+    """
+    control statistics of every series over a run of consecutive periods, the EWMA and
+    CUSUM recursions are vectorized over the series and looped over the periods
+
+    Parameters
+    ----------
+    cells : pd.DataFrame
+        event cells of one frequency, see event_cells, periods without a cell count zero
+    baseline : pd.DataFrame
+        output of model_baseline(), series without a baseline get no control limits
+    frequency : str
+        key of FREQUENCIES
+    periods : pd.DatetimeIndex
+        start dates of the periods to compute
+    previous : pd.DataFrame, optional
+        statistics of the period before the first one, indexed by dimension and level,
+        the recursions start from the model expectation if None
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per series and period with the counts, the expected count and its
+        poisson limits, the EWMA and CUSUM statistics, the severity EWMA and the flags
+    """
+    from scipy import stats
+
+    period_years = FREQUENCIES[frequency][1]
+    series = pd.MultiIndex.from_frame(
+        cells[["dimension", "level"]]
+        .drop_duplicates()
+        .sort_values(["dimension", "level"])
+    )
+    matrix = {
+        column: cells.pivot_table(
+            index=["dimension", "level"],
+            columns="period",
+            values=column,
+            aggfunc="sum",
+            fill_value=0,
+        )
+        .reindex(index=series, columns=periods, fill_value=0)
+        .to_numpy(dtype=float)
+        for column in CELL_COLUMNS
+    }
+    base = baseline.set_index(["dimension", "level"]).reindex(series)
+    expected = base["annual_expected"].to_numpy() * period_years
+    severity_mean = base["severity_mean"].to_numpy()
+    severity_sd = base["severity_sd"].to_numpy()
+    sd = np.sqrt(expected)
+
+    if previous is None:
+        previous = pd.DataFrame(index=series)
+    previous = previous.reindex(series)
+    ewma = previous.get("ewma", pd.Series(np.nan, index=series)).to_numpy()
+    ewma = np.where(np.isnan(ewma), expected, ewma)
+    cusum_upper = previous.get("cusum_upper", pd.Series(0.0, index=series))
+    cusum_lower = previous.get("cusum_lower", pd.Series(0.0, index=series))
+    cusum_upper = cusum_upper.fillna(0).to_numpy()
+    cusum_lower = cusum_lower.fillna(0).to_numpy()
+    severity_ewma = previous.get("severity_ewma", pd.Series(np.nan, index=series))
+    severity_ewma = severity_ewma.fillna(pd.Series(severity_mean, index=series))
+    severity_ewma = severity_ewma.to_numpy()
+    severity_var = previous.get("severity_var", pd.Series(0.0, index=series))
+    severity_var = severity_var.fillna(0).to_numpy()
+
+    lam = EWMA_LAMBDA
+    rows = {
+        name: []
+        for name in [
+            "ewma",
+            "cusum_upper",
+            "cusum_lower",
+            "severity_ewma",
+            "severity_var",
+        ]
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for t in range(len(periods)):
+            counts = matrix["event_count"][:, t]
+            # series without a model expectation start their EWMA at their first count
+            ewma = np.where(np.isnan(ewma), counts, lam * counts + (1 - lam) * ewma)
+            z = (counts - expected) / sd
+            cusum_upper = np.maximum(0, cusum_upper + z - CUSUM_K)
+            cusum_lower = np.maximum(0, cusum_lower - z - CUSUM_K)
+            n = matrix["cost_count"][:, t]
+            costs = n > 0
+            severity_ewma = np.where(
+                costs,
+                lam * matrix["log_cost_sum"][:, t] / n + (1 - lam) * severity_ewma,
+                severity_ewma,
+            )
+            # variance of the EWMA of period means with n costs each
+            severity_var = np.where(
+                costs,
+                lam**2 * severity_sd**2 / n + (1 - lam) ** 2 * severity_var,
+                severity_var,
+            )
+            for name, values in [
+                ("ewma", ewma),
+                ("cusum_upper", cusum_upper),
+                ("cusum_lower", cusum_lower),
+                ("severity_ewma", severity_ewma),
+                ("severity_var", severity_var),
+            ]:
+                rows[name].append(values)
+
+    n_series, n_periods = len(series), len(periods)
+    result = pd.DataFrame(
+        {
+            "frequency": frequency,
+            "dimension": np.repeat(series.get_level_values(0), n_periods),
+            "level": np.repeat(series.get_level_values(1), n_periods),
+            "period": np.tile(periods, n_series),
+            "event_count": matrix["event_count"].ravel(),
+            "cost_count": matrix["cost_count"].ravel(),
+            "expected": np.repeat(expected, n_periods),
+        }
+    )
+    for name, values in rows.items():
+        result[name] = np.column_stack(values).ravel() if values else []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result["severity_mean"] = (
+            matrix["log_cost_sum"] / matrix["cost_count"]
+        ).ravel()
+    expected = result["expected"].to_numpy()
+    result["lcl"] = stats.poisson.ppf(POISSON_ALPHA / 2, expected)
+    result["ucl"] = stats.poisson.ppf(1 - POISSON_ALPHA / 2, expected)
+    ewma_width = EWMA_WIDTH * np.sqrt(expected * lam / (2 - lam))
+    result["ewma_lcl"] = expected - ewma_width
+    result["ewma_ucl"] = expected + ewma_width
+    result["poisson_flag"] = (result["event_count"] < result["lcl"]) | (
+        result["event_count"] > result["ucl"]
+    )
+    result["ewma_flag"] = (result["ewma"] < result["ewma_lcl"]) | (
+        result["ewma"] > result["ewma_ucl"]
+    )
+    result["cusum_flag"] = (result["cusum_upper"] > CUSUM_H) | (
+        result["cusum_lower"] > CUSUM_H
+    )
+    severity_width = EWMA_WIDTH * np.sqrt(result["severity_var"])
+    result["severity_flag"] = (severity_width > 0) & (
+        (result["severity_ewma"] - np.repeat(severity_mean, n_periods)).abs()
+        > severity_width
+    )
+    result["signal"] = result[FLAG_COLUMNS].any(axis="columns")
+    return result
+
+
+def update_signals(cells, new_cells, stats, baseline, frequency):
+    """
+    recompute the statistics of one frequency from the first period touched by the
+    new events, or from the first period when a new series appears
+
+    Parameters
+    ----------
+    cells : pd.DataFrame
+        all event cells, new events included
+    new_cells : pd.DataFrame
+        cells of the events added by this run
+    stats : pd.DataFrame or None
+        stored statistics, None to compute every period
+    baseline : pd.DataFrame
+        output of model_baseline()
+    frequency : str
+        key of FREQUENCIES
+
+    Returns
+    -------
+    tuple
+        (statistics of all periods, statistics of the recomputed periods)
+    """
+    freq = FREQUENCIES[frequency][0]
+    cells = cells.loc[cells["frequency"] == frequency]
+    new_cells = new_cells.loc[new_cells["frequency"] == frequency]
+    if cells.empty:
+        return stats, None
+    end = cells["period"].max()
+    start = cells["period"].min()
+    if stats is not None and len(stats):
+        stats = stats.loc[stats["frequency"] == frequency]
+        known = pd.MultiIndex.from_frame(stats[["dimension", "level"]])
+        current = pd.MultiIndex.from_frame(cells[["dimension", "level"]])
+        if current.isin(known).all():
+            if new_cells.empty:
+                return stats, None
+            # periods after the last computed one are recomputed even without events
+            following = (stats["period"].max().to_period(freq) + 1).start_time
+            start = min(new_cells["period"].min(), following)
+    else:
+        stats = None
+    kept = None if stats is None else stats.loc[stats["period"] < start]
+    previous = None
+    if kept is not None and len(kept):
+        previous = kept.sort_values("period").groupby(["dimension", "level"]).last()
+    periods = pd.period_range(start, end, freq=freq).start_time
+    recomputed = monitor(
+        cells.loc[cells["period"] >= start], baseline, frequency, periods, previous
+    )
+    if kept is None or kept.empty:
+        return recomputed, recomputed
+    return pd.concat([kept, recomputed], ignore_index=True), recomputed
+
+
+def run_signals(full=False):
+    """
+    process the fortune 1000 events added since the last run and update the stored
+    control statistics and flags
+
+    events whose event_id is not among the stored processed ids are added, so the
+    history of a company joining the list is counted although its ids are older than
+    the latest event; events changed or removed in the synced store are only taken
+    into account by a full run; a new model version recomputes every period against
+    the new baseline
+
+    Parameters
+    ----------
+    full : bool, optional
+        discard the stored counts and statistics and process every event, by default False
+
+    Returns
+    -------
+    dict
+        number of processed events, recomputed series-periods, signals among them and
+        the number of events processed by all runs
+    """
+    state = {} if full else load_state()
+    version = str(model_version())
+    cells = None if full else read_store("cells")
+    stats = None if full else read_store("signals")
+    processed = None if full else read_store("processed")
+    if processed is None:
+        # counts without the ids of their events cannot be updated, they are rebuilt
+        cells = None
+    if state.get("model_version") != version:
+        stats = None
+    # the store holds companies below the default revenue floor too
+    events = filter_f1k_table(f1k_table(), year_range=None)
+    if cells is None:
+        new_events = events
+    else:
+        new_events = events.loc[~events["event_id"].isin(processed["event_id"])]
+    new_cells = event_cells(new_events)
+    cells = new_cells if cells is None else add_cells(cells, new_cells)
+    baseline = model_baseline()
+
+    frames, recomputed = [], []
+    for frequency in FREQUENCIES:
+        df, changed = update_signals(cells, new_cells, stats, baseline, frequency)
+        if df is not None:
+            frames.append(df)
+        if changed is not None:
+            recomputed.append(changed)
+    stats = pd.concat(frames, ignore_index=True).sort_values(
+        SERIES_COLUMNS + ["period"], ignore_index=True
+    )
+    recomputed = pd.concat(recomputed) if recomputed else stats.iloc[:0]
+
+    processed = pd.concat(
+        [df for df in [processed, new_events[["event_id"]]] if df is not None],
+        ignore_index=True,
+    )
+    state["model_version"] = version
+    write_store(cells, "cells")
+    write_store(stats, "signals")
+    write_store(processed, "processed")
+    save_state(state)
+    return {
+        "events": len(new_events),
+        "periods": len(recomputed),
+        "signals": int(recomputed["signal"].sum()),
+        "processed": len(processed),
+    }
+
+
+def signals(run=True):
+    """
+    stored control statistics of every series and period
+
+    Parameters
+    ----------
+    run : bool, optional
+        process the events added since the last run first, by default True
+
+    Returns
+    -------
+    pd.DataFrame
+        output of monitor() for every frequency
+    """
+    if run or read_store("signals") is None:
+        run_signals()
+    return read_store("signals")
+
+
+def signal_table(stats, frequency="quarterly", last=20):
+    """
+    most recent flagged periods of a frequency
+
+    Parameters
+    ----------
+    stats : pd.DataFrame
+        output of signals()
+    frequency : str, optional
+        key of FREQUENCIES, by default "quarterly"
+    last : int, optional
+        number of flagged series-periods shown, by default 20
+
+    Returns
+    -------
+    pd.DataFrame
+        series, period, counts, expected count and the flags that fired
+    """
+    flagged = stats.loc[(stats["frequency"] == frequency) & stats["signal"]]
+    table = flagged.sort_values(["period", "dimension", "level"], ascending=False).head(
+        last
+    )
+    flags = pd.Series("", index=table.index)
+    for column in FLAG_COLUMNS:
+        flags += np.where(table[column], column.replace("_flag", " "), "")
+    table = table.assign(
+        period=table["period"].dt.strftime("%Y-%m"), flags=flags.str.strip()
+    )
+    return table[
+        ["dimension", "level", "period", "event_count", "expected", "ewma", "flags"]
+    ].round({"expected": 2, "ewma": 2})
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="detect shifts of the fortune 1000 events against the model"
+    )
+    parser.add_argument("--full", action="store_true", help="reprocess every event")
+    args = parser.parse_args()
+    print(run_signals(full=args.full))
+
+
+if __name__ == "__main__":
+    main()
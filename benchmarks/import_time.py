@@ -0,0 +1,80 @@
+# import time breakdown of the dashboard, from python -X importtime:
+
+import argparse
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def import_times(module):
+    """
+    import a module in a fresh interpreter and collect the -X importtime report
+
+    Parameters
+    ----------
+    module : str
+        module to import
+
+    Returns
+    -------
+    pd.DataFrame
+        self and cumulative import time in milliseconds per imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="import time breakdown from python -X importtime"
+    )
+    parser.add_argument("--module", default="analytics_dashboards.dashboard")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="exit with an error if the total import time exceeds this budget",
+    )
+    args = parser.parse_args()
+
+    df = import_times(args.module)
+    total_ms = df.loc[df["module"] == args.module, "cumulative_ms"].iloc[0]
+    print(f"import {args.module}: {total_ms:,.0f} ms")
+    print("\nslowest top level imports (cumulative):")
+    print(
+        df.loc[df["depth"] <= 1]
+        .nlargest(args.top, "cumulative_ms")
+        .to_string(index=False)
+    )
+    print("\nslowest modules (self):")
+    print(df.nlargest(args.top, "self_ms").to_string(index=False))
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        sys.exit(f"import time {total_ms:,.0f} ms exceeds {args.budget_ms:,.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
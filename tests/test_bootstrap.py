@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_dashboards.common.bootstrap import (bootstrap_ci,
+                                                   resampled_cluster_means,
+                                                   resampled_means,
+                                                   resampled_quantiles,
+                                                   statistic_quantile)
+
+N_RESAMPLES = 20_000
+
+
+def naive_quantiles(values, q, n_resamples, rng):
+    """
+    quantile of each resample drawn by materialising the resamples
+    """
+    draws = values[rng.integers(0, values.size, size=(n_resamples, values.size))]
+    return np.quantile(draws, q, axis=1, method="inverted_cdf")
+
+
+def frequencies(draws, support):
+    """
+    share of the draws equal to each value of the support
+    """
+    return pd.Series(draws).value_counts(normalize=True).reindex(support, fill_value=0)
+
+
+@pytest.mark.parametrize("q", [0.1, 0.5, 0.9, 0.99])
+def test_resampled_quantiles_match_naive_resampling(q):
+    values = np.sort(np.random.default_rng(0).lognormal(0, 1, 200))
+    drawn = resampled_quantiles(values, q, N_RESAMPLES, np.random.default_rng(1))
+    naive = naive_quantiles(values, q, N_RESAMPLES, np.random.default_rng(2))
+    # both draw order statistics of the sample, their distributions must agree
+    difference = frequencies(drawn, values) - frequencies(naive, values)
+    assert difference.abs().max() < 0.02
+
+
+def test_normal_approximation_of_large_sample_means(monkeypatch):
+    values = np.random.default_rng(3).exponential(1, 500)
+    exact = resampled_means(values, N_RESAMPLES, np.random.default_rng(4))
+    monkeypatch.setattr("analytics_dashboards.common.bootstrap.NORMAL_MIN_SIZE", 1)
+    normal = resampled_means(values, N_RESAMPLES, np.random.default_rng(4))
+    assert normal.mean() == pytest.approx(exact.mean(), rel=1e-2)
+    assert normal.std() == pytest.approx(exact.std(), rel=5e-2)
+
+
+def test_single_value_clusters_match_plain_means():
+    values = np.random.default_rng(5).normal(10, 2, 300)
+    plain = resampled_means(values, N_RESAMPLES, np.random.default_rng(6))
+    clustered = resampled_cluster_means(
+        values, np.ones(values.size), N_RESAMPLES, np.random.default_rng(6)
+    )
+    np.testing.assert_allclose(clustered, plain)
+
+
+def test_bootstrap_ci_covers_the_estimates():
+    values = np.random.default_rng(7).lognormal(0, 1, 1000)
+    ci = bootstrap_ci(np.append(values, np.nan), n_resamples=2000)
+    assert ci["statistic"].tolist() == ["mean", "median", "q90", "q99"]
+    assert (ci["lower"] <= ci["estimate"]).all()
+    assert (ci["estimate"] <= ci["upper"]).all()
+    assert ci["estimate"].iloc[0] == pytest.approx(values.mean())
+
+
+def test_bootstrap_ci_splits_resamples_over_workers():
+    values = np.random.default_rng(8).normal(size=500)
+    ci = bootstrap_ci(values, statistics=("mean",), n_resamples=4000, n_jobs=2)
+    single = bootstrap_ci(values, statistics=("mean",), n_resamples=4000)
+    assert ci["lower"].iloc[0] == pytest.approx(single["lower"].iloc[0], abs=0.02)
+    assert ci["upper"].iloc[0] == pytest.approx(single["upper"].iloc[0], abs=0.02)
+
+
+def test_statistic_quantile():
+    assert statistic_quantile("mean") is None
+    assert statistic_quantile("median") == 0.5
+    assert statistic_quantile("q99.5") == pytest.approx(0.995)
+    with pytest.raises(ValueError):
+        statistic_quantile("sd")
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from analytics_dashboards.common.record_linkage import normalise_names
+from analytics_dashboards.entity_resolution import (MATCH_THRESHOLD,
+                                                    resolve_entities)
+
+
+def entity_frames(company_names, entity_names):
+    """
+    companies and model entities in the layout of entity_tables, the i-th company
+    and entity agreeing on sic2, state and revenue band
+    """
+    attributes = {
+        "sic2": [20.0, 30.0, 73.0][: len(company_names)],
+        "state": ["CA", "NY", "TX"][: len(company_names)],
+        "revenue_band": ["2-5B", "5-10B", "10-25B"][: len(company_names)],
+    }
+    companies = pd.DataFrame(
+        {
+            "company_instance_id": range(1, len(company_names) + 1),
+            "company_name": company_names,
+            **attributes,
+        }
+    )
+    model = pd.DataFrame(
+        {"run_id": range(10, 10 + len(entity_names)), "entity_name": entity_names}
+    ).assign(**attributes)
+    for df, column in [(companies, "company_name"), (model, "entity_name")]:
+        df["name"] = normalise_names(df[column])
+    return companies, model
+
+
+def test_agreeing_attributes_do_not_match_different_names():
+    companies, model = entity_frames(
+        ["Acme Holdings Inc", "Globex Corp"], ["ACME Holdings", "Globe Corp"]
+    )
+    # the attributes alone lift the pair of different names over the threshold
+    scored = resolve_entities(companies, model, min_name_similarity=0)
+    globex = scored.loc[scored["company_name"] == "Globex Corp"]
+    assert (globex["score"] >= MATCH_THRESHOLD).all() and len(globex) == 1
+
+    matches = resolve_entities(companies, model)
+    assert matches[["company_name", "entity_name"]].values.tolist() == [
+        ["Acme Holdings Inc", "ACME Holdings"]
+    ]
+
+
+def test_names_differing_in_legal_form_match():
+    companies, model = entity_frames(
+        ["Initech Inc.", "Umbrella Corporation", "Hooli LLC"],
+        ["INITECH", "Umbrella Corp", "Hooli"],
+    )
+    matches = resolve_entities(companies, model).sort_values("company_instance_id")
+    assert matches["run_id"].tolist() == [10, 11, 12]
+    assert (matches["name_similarity"] > 0.99).all()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_dashboards import event_dedup
+from analytics_dashboards.common.record_linkage import one_to_one
+from analytics_dashboards.event_dedup import (PAIR_COLUMNS, row_hashes,
+                                              score_pairs, update_pairs)
+
+NAMES = ["acme", "globex", "initech", "umbrella", "hooli", "stark", "wayne", "wonka"]
+
+INDUSTRIES = ["Manufacturing", "Services", "Retail Trade"]
+
+WORDS = ["breach", "ransomware", "outage", "records", "exposed", "attackers", "servers"]
+
+
+def incidents(id_column, ids, seed):
+    """
+    synthetic incidents in the layout of advisen_incidents() and vcdb_incidents()
+    """
+    rng = np.random.default_rng(seed)
+    n = len(ids)
+    df = pd.DataFrame(
+        {
+            id_column: ids,
+            "name": rng.choice(NAMES + [""], n),
+            "industry": rng.choice(INDUSTRIES, n),
+            "year": rng.integers(2015, 2018, n).astype(float),
+            "summary": [" ".join(rng.choice(WORDS, 6)) for _ in range(n)],
+        }
+    )
+    return df.assign(row_hash=row_hashes(df))
+
+
+def copied(vcdb, advisen, rows):
+    """
+    report the given advisen incidents in the vcdb rows of the same position
+    """
+    vcdb = vcdb.copy()
+    for column in event_dedup.LINKAGE_COLUMNS:
+        vcdb.loc[rows, column] = advisen.loc[rows, column].to_numpy()
+    return vcdb.assign(row_hash=row_hashes(vcdb))
+
+
+def edited(df, rows, seed):
+    """
+    replace the summaries of some rows
+    """
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    df.loc[rows, "summary"] = [" ".join(rng.choice(WORDS, 6)) for _ in rows]
+    return df.assign(row_hash=row_hashes(df))
+
+
+@pytest.fixture(autouse=True)
+def dedup_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_dedup, "dedup_path", lambda name: str(tmp_path / name))
+
+
+def sorted_pairs(pairs):
+    return pairs.sort_values(["event_id", "incident_id"], ignore_index=True)[
+        PAIR_COLUMNS
+    ]
+
+
+def matches(pairs):
+    return one_to_one(sorted_pairs(pairs), "event_id", "incident_id").reset_index(
+        drop=True
+    )
+
+
+def test_incremental_update_matches_full_scoring():
+    advisen = incidents("event_id", np.arange(60), 0)
+    vcdb = copied(incidents("incident_id", np.arange(100, 150), 1), advisen, range(20))
+    update_pairs(advisen, vcdb)
+
+    # changed, removed and added rows on both sides
+    advisen = edited(advisen, [3, 25, 40], 2).drop(index=[7, 8])
+    advisen = pd.concat(
+        [advisen, incidents("event_id", np.arange(60, 70), 3)], ignore_index=True
+    )
+    vcdb = edited(vcdb, [1, 30], 4).drop(index=[12])
+    vcdb = pd.concat(
+        [vcdb, copied(incidents("incident_id", [200], 5), advisen, [0])],
+        ignore_index=True,
+    )
+
+    incremental = update_pairs(advisen, vcdb)
+    full = score_pairs(advisen, vcdb)
+    assert len(full) > 0
+    pd.testing.assert_frame_equal(
+        sorted_pairs(incremental), sorted_pairs(full), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(
+        matches(incremental), matches(full), check_dtype=False
+    )
+
+
+def test_unchanged_sources_keep_the_stored_pairs():
+    advisen = incidents("event_id", np.arange(40), 6)
+    vcdb = copied(incidents("incident_id", np.arange(100, 130), 7), advisen, range(10))
+    first = update_pairs(advisen, vcdb)
+    second = update_pairs(advisen, vcdb)
+    pd.testing.assert_frame_equal(first, second, check_dtype=False)
+
+
+def test_copied_incidents_are_matched():
+    advisen = incidents("event_id", np.arange(30), 8)
+    vcdb = copied(incidents("incident_id", np.arange(100, 130), 9), advisen, range(10))
+    matched = matches(update_pairs(advisen, vcdb))
+    matched = set(zip(matched["event_id"], matched["incident_id"]))
+    # victims without a name have no name similarity and score too low to match
+    named = advisen.index[:10][advisen["name"].iloc[:10] != ""]
+    assert len(named) > 0
+    assert {(row, 100 + row) for row in named} <= matched
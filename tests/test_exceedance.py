@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_dashboards import exceedance
+from analytics_dashboards.exceedance import (LOSS_BINS, RETURN_PERIODS,
+                                             compute_model_exceedance,
+                                             events_exceedance, loss_histogram)
+
+N_YEARS = 500
+
+# run 4 simulates no event at all
+RUN_IDS = [0, 1, 2, 3, 4]
+
+
+@pytest.fixture
+def annual_losses():
+    """
+    annual losses of a few runs, years without events are left out like in the
+    model_annual_losses query
+    """
+    rng = np.random.default_rng(0)
+    frames = []
+    for run_id in range(4):
+        years = np.sort(rng.choice(np.arange(1, N_YEARS + 1), 300, replace=False))
+        occurrence = rng.lognormal(14, 2, len(years))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "run_id": run_id,
+                    "year_x": years,
+                    "aggregate_loss": occurrence * rng.uniform(1, 3, len(years)),
+                    "occurrence_loss": occurrence,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def direct_return_period_loss(losses, n_years, return_period):
+    """
+    loss of a return period from all annual losses of a run, sorted descending with
+    the years without loss as zeros
+    """
+    losses = np.sort(np.concatenate([losses, np.zeros(n_years - len(losses))]))[::-1]
+    return losses[max(n_years // return_period, 1) - 1]
+
+
+def test_model_return_periods_match_a_direct_sort(annual_losses, monkeypatch):
+    def run_query(name, cached=True, year_range=None):
+        years = annual_losses["year_x"].between(*year_range)
+        return annual_losses.loc[years]
+
+    monkeypatch.setattr(exceedance, "run_query", run_query)
+    # chunks that do not divide the years, so the top losses are merged unevenly
+    result = compute_model_exceedance(n_years=N_YEARS, chunk_years=77, run_ids=RUN_IDS)
+
+    table = result["return_periods"].set_index(["run_id", "return_period"])
+    for run_id in RUN_IDS:
+        run = annual_losses.loc[annual_losses["run_id"] == run_id]
+        for return_period in RETURN_PERIODS:
+            for column in ["aggregate_loss", "occurrence_loss"]:
+                expected = direct_return_period_loss(
+                    run[column].to_numpy(), N_YEARS, return_period
+                )
+                assert table.loc[(run_id, return_period), column] == expected
+
+    aal = result["aal"].set_index("run_id")["aal"]
+    expected_aal = annual_losses.groupby("run_id")["aggregate_loss"].sum() / N_YEARS
+    expected_aal = expected_aal.reindex(RUN_IDS, fill_value=0)
+    pd.testing.assert_series_equal(aal, expected_aal, check_names=False)
+
+    n_run_years = len(RUN_IDS) * N_YEARS
+    for curve, column in [("aep", "aggregate_loss"), ("oep", "occurrence_loss")]:
+        losses = annual_losses[column].to_numpy()
+        expected_curve = [
+            (losses >= edge).sum() / n_run_years for edge in LOSS_BINS[:-1]
+        ]
+        np.testing.assert_allclose(result["curves"][curve], expected_curve)
+
+
+def test_events_return_periods_match_a_direct_sort():
+    rng = np.random.default_rng(1)
+    n = 400
+    events = pd.DataFrame(
+        {
+            "company_instance_id": rng.integers(0, 150, n),
+            "year_start": rng.integers(2010, 2021, n),
+            "company_revenue_millions_usd": 5000,
+            "total_cost_millions_usd": np.where(
+                rng.random(n) < 0.2, np.nan, rng.lognormal(0, 2, n)
+            ),
+        }
+    )
+    result = events_exceedance(events, n_companies=200, year_range=(2010, 2020))
+
+    company_years = events.assign(
+        loss=events["total_cost_millions_usd"].fillna(0) * 1e6
+    ).groupby(["company_instance_id", "year_start"])["loss"]
+    n_company_years = 200 * 11
+    for column, losses in [
+        ("aggregate_loss", company_years.sum()),
+        ("occurrence_loss", company_years.max()),
+    ]:
+        expected = [
+            direct_return_period_loss(losses.to_numpy(), n_company_years, rp)
+            for rp in RETURN_PERIODS
+        ]
+        np.testing.assert_array_equal(result["return_periods"][column], expected)
+    assert result["aal"] == pytest.approx(company_years.sum().sum() / n_company_years)
+
+
+def test_loss_histogram_drops_small_losses_and_clips_large_ones():
+    losses = np.array([0.0, 1.0, 1e3, 5e3, 5e3, 2e6, 1e13])
+    counts = loss_histogram(losses)
+    # losses below the first edge exceed no edge, losses above the last exceed all
+    assert counts.sum() == len(losses) - 2
+    assert counts[0] == 1 and counts[-1] == 1
+    inside = np.histogram(losses[2:-1], bins=LOSS_BINS)[0]
+    np.testing.assert_array_equal(counts[:-1], inside[:-1])
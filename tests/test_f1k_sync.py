@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_dashboards.common import f1k_sync
+from analytics_dashboards.common.f1k_sync import (aggregate_events,
+                                                  read_aggregates, read_store,
+                                                  sync_f1k)
+
+IMPACT_COLUMNS = [
+    "impact_type_confidentiality",
+    "impact_type_integrity",
+    "impact_type_availability",
+    "impact_type_extortion",
+]
+
+
+def synthetic_events(event_ids, company_ids, seed, updated_at="2021-01-01"):
+    """
+    events in the layout of data_sources_events, limited to the columns read by the
+    sync and its aggregates
+    """
+    rng = np.random.default_rng(seed)
+    n = len(event_ids)
+    events = pd.DataFrame(
+        {
+            "event_id": event_ids,
+            "company_instance_id": rng.choice(company_ids, n),
+            "event_start_date": (
+                pd.Timestamp("2012-01-01")
+                + pd.to_timedelta(rng.integers(0, 3000, n), unit="D")
+            ).strftime("%Y-%m-%d"),
+            "total_cost_millions_usd": rng.lognormal(0, 2, n),
+            "updated_at": pd.Timestamp(updated_at),
+        }
+    )
+    for column in IMPACT_COLUMNS:
+        events[column] = rng.random(n) < 0.4
+    return events
+
+
+class Database:
+    """
+    fortune 1000 entities and events answering the queries of the sync
+    """
+
+    def __init__(self, entities, events):
+        self.entities = entities
+        self.events = events
+
+    def listed_events(self):
+        listed = self.events["company_instance_id"].isin(
+            self.entities["company_instance_id"]
+        )
+        return self.events.loc[listed].reset_index(drop=True)
+
+    def run_query(self, name, cached=True, **params):
+        if name == "f1k_entities":
+            return self.entities.copy()
+        if name == "f1k_new_events":
+            return self.listed_events()
+        if name == "company_events":
+            events = self.events
+            selected = events["company_instance_id"].isin(params["company_ids"]) & (
+                events["event_id"] <= params["watermark"]
+            )
+            return events.loc[selected].reset_index(drop=True)
+        raise KeyError(name)
+
+    def read_query(self, query, params=None):
+        events = self.listed_events()
+        changed = (events["event_id"] > params["watermark"]) | (
+            events["updated_at"] > pd.Timestamp(params["updated_watermark"])
+        )
+        return events.loc[changed].reset_index(drop=True)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    entities = pd.DataFrame(
+        {"company_instance_id": np.arange(1, 31), "company_revenue_millions_usd": 5000}
+    )
+    # even ids, the history of a company joining the list later takes odd ids
+    events = synthetic_events(np.arange(2, 802, 2), np.arange(1, 31), 0)
+    database = Database(entities, events)
+    monkeypatch.setattr(f1k_sync, "run_query", database.run_query)
+    monkeypatch.setattr(f1k_sync, "read_query", database.read_query)
+    monkeypatch.setattr(
+        f1k_sync, "load_config", lambda: {"f1k_updated_at_column": "updated_at"}
+    )
+    monkeypatch.setattr(f1k_sync, "sync_path", lambda name: str(tmp_path / name))
+    return database
+
+
+def sorted_counts(df):
+    columns = f1k_sync.AGGREGATES["event_counts"]
+    return df.sort_values(columns, ignore_index=True)[columns + ["event_count"]]
+
+
+def test_incremental_sync_matches_full_aggregates(database):
+    sync_f1k()
+
+    events = database.events.copy()
+    # changed events, one of them now quarantined by a negative cost
+    changed = events["event_id"].isin([10, 20, 30, 40])
+    events.loc[changed, "updated_at"] = pd.Timestamp("2022-01-01")
+    events.loc[changed, "impact_type_extortion"] = ~events.loc[
+        changed, "impact_type_extortion"
+    ]
+    events.loc[events["event_id"] == 40, "total_cost_millions_usd"] = -1.0
+    # new events of listed companies and the earlier history of a company joining
+    added = synthetic_events(np.arange(802, 852), np.arange(1, 31), 1)
+    joined = synthetic_events(np.arange(1, 41, 2), [31], 2)
+    database.events = pd.concat([events, added, joined], ignore_index=True)
+    # a company leaving the list drops its events
+    database.entities = pd.concat(
+        [
+            database.entities.loc[database.entities["company_instance_id"] != 5],
+            pd.DataFrame(
+                {"company_instance_id": [31], "company_revenue_millions_usd": [3000]}
+            ),
+        ],
+        ignore_index=True,
+    )
+
+    summary = sync_f1k()
+    expected = database.listed_events()
+    stored = read_store("events")
+    assert sorted(stored["event_id"]) == sorted(expected["event_id"])
+    assert summary["changed"] > 0 and summary["removed"] > 0
+
+    incremental = read_aggregates()["event_counts"]
+    full = aggregate_events(expected)["event_counts"]
+    pd.testing.assert_frame_equal(sorted_counts(incremental), sorted_counts(full))
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from analytics_dashboards.common.goodness_of_fit import (compare_distributions,
+                                                         quantile_distribution,
+                                                         sample_distribution)
+
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(0)
+    # rounded so both samples have ties within and between them
+    return (
+        np.round(rng.lognormal(10, 1.5, 3000), -3),
+        np.round(rng.lognormal(10.3, 1.3, 1500), -3),
+    )
+
+
+def test_ks_matches_scipy(samples):
+    a, b = samples
+    result = compare_distributions(sample_distribution(a), sample_distribution(b))
+    assert result["ks"] == pytest.approx(stats.ks_2samp(a, b).statistic)
+    assert (result["n_a"], result["n_b"]) == (len(a), len(b))
+
+
+def test_wasserstein_matches_scipy(samples):
+    a, b = samples
+    result = compare_distributions(sample_distribution(a), sample_distribution(b))
+    assert result["wasserstein"] == pytest.approx(stats.wasserstein_distance(a, b))
+
+
+def test_log_scale_wasserstein_matches_scipy(samples):
+    a, b = samples
+    a, b = a[a > 0], b[b > 0]
+    result = compare_distributions(
+        sample_distribution(a), sample_distribution(b), log_scale=True
+    )
+    assert result["wasserstein"] == pytest.approx(
+        stats.wasserstein_distance(np.log10(a), np.log10(b))
+    )
+
+
+def test_quantiles_approximate_the_sample(samples):
+    a, b = samples
+    levels = (np.arange(2000) + 0.5) / 2000
+    quantiles = quantile_distribution(np.quantile(a, levels), len(a))
+    exact = compare_distributions(sample_distribution(a), sample_distribution(b))
+    approximate = compare_distributions(quantiles, sample_distribution(b))
+    assert approximate["n_a"] == pytest.approx(len(a))
+    assert approximate["ks"] == pytest.approx(exact["ks"], abs=1e-3)
+    assert approximate["wasserstein"] == pytest.approx(exact["wasserstein"], rel=2e-2)
+
+
+def test_anderson_darling_grows_with_the_shift():
+    rng = np.random.default_rng(1)
+    a = rng.normal(size=2000)
+    reference = sample_distribution(a)
+    statistics = [
+        compare_distributions(reference, sample_distribution(a + shift))
+        for shift in [0, 0.1, 0.5]
+    ]
+    statistics = [result["anderson_darling"] for result in statistics]
+    assert statistics[0] == pytest.approx(0)
+    assert statistics[0] < statistics[1] < statistics[2]
+
+
+def test_empty_sample_gives_nan():
+    result = compare_distributions(sample_distribution([np.nan]), ([1.0], [1.0]))
+    assert result["n_a"] == 0
+    assert np.isnan([result["ks"], result["wasserstein"]]).all()
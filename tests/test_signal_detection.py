@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_dashboards import signal_detection
+from analytics_dashboards.signal_detection import (FREQUENCIES, add_cells,
+                                                   event_cells, read_store,
+                                                   run_signals, update_signals)
+
+EVENT_TYPES = ["['Data Breach']", "['Network/Website Disruption']", "['Phishing']"]
+
+
+def synthetic_events(n, seed, sics=(2834, 6021, 7372), years=(2015, 2019)):
+    """
+    events in the layout of the fortune 1000 events table, limited to the columns
+    read by event_cells
+    """
+    rng = np.random.default_rng(seed)
+    days = (pd.Timestamp(f"{years[1]}-12-31") - pd.Timestamp(f"{years[0]}-01-01")).days
+    start = pd.Timestamp(f"{years[0]}-01-01") + pd.to_timedelta(
+        rng.integers(0, days, n), unit="D"
+    )
+    cost = rng.lognormal(0, 2, n)
+    cost[rng.random(n) < 0.3] = 0
+    events = pd.DataFrame(
+        {
+            "event_start_date": start.strftime("%Y-%m-%d"),
+            "total_cost_millions_usd": cost,
+            "event_type": rng.choice(EVENT_TYPES + [None], n),
+            "company_sic": rng.choice(sics, n),
+        }
+    )
+    for column in [
+        "impact_type_confidentiality",
+        "impact_type_integrity",
+        "impact_type_availability",
+    ]:
+        events[column] = rng.random(n) < 0.4
+    return events
+
+
+def constant_baseline(cells):
+    """
+    the same expectation for every series of the cells
+    """
+    baseline = cells[["dimension", "level"]].drop_duplicates()
+    return baseline.assign(annual_expected=12.0, severity_mean=6.0, severity_sd=1.0)
+
+
+def sorted_stats(stats):
+    return stats.sort_values(["dimension", "level", "period"], ignore_index=True)
+
+
+def assert_incremental_matches_full(old_events, new_events, frequency):
+    old_cells = event_cells(old_events)
+    new_cells = event_cells(new_events)
+    cells = add_cells(old_cells, new_cells)
+    baseline = constant_baseline(cells)
+    stored, _ = update_signals(old_cells, old_cells, None, baseline, frequency)
+    incremental, recomputed = update_signals(
+        cells, new_cells, stored, baseline, frequency
+    )
+    full, _ = update_signals(cells, cells, None, baseline, frequency)
+    pd.testing.assert_frame_equal(sorted_stats(incremental), sorted_stats(full))
+    return recomputed
+
+
+@pytest.mark.parametrize("frequency", list(FREQUENCIES))
+def test_new_periods_match_full_recompute(frequency):
+    old = synthetic_events(400, 0, years=(2015, 2018))
+    new = synthetic_events(80, 1, years=(2019, 2019))
+    recomputed = assert_incremental_matches_full(old, new, frequency)
+    # only the periods of the new events are recomputed
+    assert recomputed["period"].min() >= pd.Timestamp("2019-01-01")
+
+
+@pytest.mark.parametrize("frequency", list(FREQUENCIES))
+def test_late_events_match_full_recompute(frequency):
+    old = synthetic_events(400, 2, years=(2015, 2019))
+    late = synthetic_events(30, 3, years=(2017, 2017))
+    recomputed = assert_incremental_matches_full(old, late, frequency)
+    assert recomputed["period"].min() >= pd.Timestamp("2017-01-01")
+
+
+def test_new_series_match_full_recompute():
+    old = synthetic_events(300, 4, years=(2015, 2019))
+    new = synthetic_events(20, 5, sics=(1311,), years=(2019, 2019))
+    recomputed = assert_incremental_matches_full(old, new, "quarterly")
+    # a new series restarts every recursion from the first period
+    assert recomputed["period"].min() == pd.Timestamp("2015-01-01")
+
+
+def synced_events(events, event_ids, revenue):
+    """
+    synthetic events with the columns run_signals reads from the synced store
+    """
+    return events.assign(
+        event_id=event_ids,
+        company_revenue_millions_usd=revenue,
+        year_start=pd.to_datetime(events["event_start_date"]).dt.year,
+    )
+
+
+def test_company_joining_the_list_matches_full_run(tmp_path, monkeypatch):
+    old = synced_events(synthetic_events(300, 6), np.arange(1000, 1300), 5000)
+    # the history of a company joining the list has ids below the latest event
+    joined = synced_events(
+        synthetic_events(40, 7, sics=(1311,)), np.arange(500, 540), 3000
+    )
+    latest = synced_events(
+        synthetic_events(20, 8, years=(2019, 2019)), np.arange(1300, 1320), 5000
+    )
+    current = pd.concat([old, joined, latest], ignore_index=True)
+    baseline = constant_baseline(event_cells(current))
+    store = {"events": old}
+    monkeypatch.setattr(signal_detection, "f1k_table", lambda: store["events"])
+    monkeypatch.setattr(signal_detection, "model_baseline", lambda: baseline)
+    monkeypatch.setattr(signal_detection, "model_version", lambda: "v1")
+
+    monkeypatch.setattr(
+        signal_detection, "signal_path", lambda name: str(tmp_path / name)
+    )
+    run_signals()
+    store["events"] = current
+    summary = run_signals()
+    incremental = read_store("signals")
+    assert summary["events"] == len(joined) + len(latest)
+
+    (tmp_path / "full").mkdir()
+    monkeypatch.setattr(
+        signal_detection, "signal_path", lambda name: str(tmp_path / "full" / name)
+    )
+    run_signals(full=True)
+    pd.testing.assert_frame_equal(incremental, read_store("signals"))
@@ -0,0 +1,72 @@
+import numpy as np
+
+from analytics_dashboards.common.sketches import (WEIGHT_UNIT, merge,
+                                                  new_sketch, quantiles,
+                                                  update)
+
+LEVELS = np.linspace(0.01, 0.99, 99)
+
+# rank error allowed at K_DEFAULT, a few times the expected 1.7 / k
+MAX_RANK_ERROR = 0.015
+
+
+def rank_error(sorted_values, estimates, q):
+    """
+    largest distance between the quantile levels and the ranks of the estimates
+    """
+    low = np.searchsorted(sorted_values, estimates, side="left") / len(sorted_values)
+    high = np.searchsorted(sorted_values, estimates, side="right") / len(sorted_values)
+    return np.max(np.maximum(low - q, q - high).clip(0))
+
+
+def test_quantiles_within_rank_error():
+    values = np.random.default_rng(1).lognormal(10, 2, 200_000)
+    sketch = update(new_sketch(), values)
+    estimates = quantiles(sketch, LEVELS)
+    assert sketch["n"] == len(values)
+    assert rank_error(np.sort(values), estimates, LEVELS) < MAX_RANK_ERROR
+    assert quantiles(sketch, [0, 1]).tolist() == [values.min(), values.max()]
+
+
+def test_small_sketch_is_exact():
+    values = np.random.default_rng(2).normal(size=100)
+    # levels between the ranks of the values, away from floating point ties
+    q = (np.arange(100) + 0.5) / 100
+    estimates = quantiles(update(new_sketch(), values), q)
+    expected = np.quantile(values, q, method="inverted_cdf")
+    np.testing.assert_array_equal(estimates, expected)
+
+
+def test_merged_chunks_match_one_sketch():
+    values = np.random.default_rng(3).exponential(5, 100_000)
+    chunks = [update(new_sketch(), chunk) for chunk in np.array_split(values, 10)]
+    merged = merge(*chunks)
+    assert merged["n"] == len(values)
+    assert merged["min"] == values.min() and merged["max"] == values.max()
+    assert rank_error(np.sort(values), quantiles(merged, LEVELS), LEVELS) < (
+        MAX_RANK_ERROR
+    )
+
+
+def test_merge_keeps_inputs():
+    a = update(new_sketch(), np.arange(1000.0))
+    b = update(new_sketch(), np.arange(1000.0, 2000.0))
+    levels_a = [items.copy() for items in a["levels"]]
+    merge(a, b)
+    assert all(np.array_equal(x, y) for x, y in zip(a["levels"], levels_a))
+
+
+def test_weights_match_repeated_values():
+    rng = np.random.default_rng(4)
+    values = rng.normal(size=5000)
+    weights = rng.integers(1, 5, size=5000)
+    weighted = update(new_sketch(unit=WEIGHT_UNIT), values, weights)
+    repeated = np.sort(np.repeat(values, weights))
+    assert weighted["n"] * weighted["unit"] == weights.sum()
+    assert rank_error(repeated, quantiles(weighted, LEVELS), LEVELS) < MAX_RANK_ERROR
+
+
+def test_missing_values_are_dropped():
+    sketch = update(new_sketch(), [1.0, np.nan, 3.0])
+    assert sketch["n"] == 2
+    assert np.isnan(quantiles(new_sketch(), [0.5])).all()
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_dashboards.common import validation
+from analytics_dashboards.common.validation import (quarantined_rows, validate,
+                                                    violations)
+
+
+@pytest.fixture
+def events():
+    """
+    fortune 1000 events, each violating row breaks a single rule
+    """
+    return pd.DataFrame(
+        [
+            ("2019-01-01", "2019-01-10", 1.0, 5000.0, 7372),
+            ("2019-03-01", "2019-02-01", 2.0, 5000.0, 7372),
+            (None, "2019-04-10", 3.0, 5000.0, 7372),
+            ("2019-05-01", "2019-05-10", -4.0, 5000.0, 7372),
+            ("2019-06-01", "2019-06-10", 5.0, -1.0, 7372),
+            ("2019-07-01", None, 0.0, 5000.0, np.nan),
+        ],
+        columns=[
+            "event_start_date",
+            "event_end_date",
+            "total_cost_millions_usd",
+            "company_revenue_millions_usd",
+            "company_sic",
+        ],
+    )
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        validation,
+        "validation_path",
+        lambda dataset, name: str(tmp_path / f"{dataset}_{name}.parquet"),
+    )
+    return tmp_path
+
+
+def test_violations_of_each_rule(events):
+    matrix = violations(events, "f1k_events")
+    assert matrix.index.equals(events.index)
+    assert matrix.columns.tolist() == list(validation.RULES["f1k_events"])
+    # the cost pattern catches the revenue column as well
+    assert np.flatnonzero(matrix["negative cost"]).tolist() == [3, 4]
+    assert np.flatnonzero(matrix["end before start"]).tolist() == [1]
+    assert np.flatnonzero(matrix["missing start date"]).tolist() == [2]
+    assert np.flatnonzero(matrix["missing sic"]).tolist() == [5]
+
+
+def test_rules_of_missing_columns_are_skipped(events):
+    matrix = violations(
+        events.drop(columns=["event_end_date", "company_sic"]), "f1k_events"
+    )
+    assert matrix.columns.tolist() == ["negative cost", "missing start date"]
+    # a pattern matching no column skips the rule
+    matrix = violations(
+        events.drop(
+            columns=["total_cost_millions_usd", "company_revenue_millions_usd"]
+        ),
+        "f1k_events",
+    )
+    assert "negative cost" not in matrix.columns
+
+
+def test_quarantine_rules_drop_rows_and_report_only_rules_keep_them(events, stored):
+    valid = validate(events, "f1k_events")
+    # the row without a sic is only reported
+    pd.testing.assert_frame_equal(valid, events.iloc[[0, 5]].reset_index(drop=True))
+    # the quarantine is stored without the index of the loaded frame
+    pd.testing.assert_frame_equal(
+        quarantined_rows("f1k_events"), events.iloc[1:5].reset_index(drop=True)
+    )
+
+    report = pd.read_parquet(stored / "f1k_events_report.parquet")
+    assert report.columns.tolist() == validation.REPORT_COLUMNS
+    report = report.set_index("rule")
+    assert report["violations"].to_dict() == {
+        "negative cost": 2,
+        "end before start": 1,
+        "missing start date": 1,
+        "missing sic": 1,
+        "quarantined rows": 4,
+    }
+    assert not report.loc["missing sic", "quarantine"]
+    assert report.loc["negative cost", "quarantine"]
+
+
+def test_clean_load_removes_the_old_quarantine(events, stored):
+    validate(events, "f1k_events")
+    clean = events.iloc[[0]]
+    assert validate(clean, "f1k_events") is clean
+    assert quarantined_rows("f1k_events").empty
+
+
+def test_unstored_validation_writes_nothing(events, stored):
+    valid = validate(events, "f1k_events", store=False)
+    assert len(valid) == 2
+    assert list(stored.iterdir()) == []